@@ -0,0 +1,68 @@
+"""Importing a corpus: POST /api/notes per note vs POST /api/notes/bulk.
+
+    python benchmarks/bench_bulk.py                          # 100k notes
+    python benchmarks/bench_bulk.py --notes 1000000 --batch-sizes 1000 5000
+
+`single` posts --single-notes notes one request each (the only way in
+before the bulk endpoint) and reports its rate. `bulk` uploads --notes
+notes as one NDJSON body per batch size through the test client, on a
+emptied database each. Rates are notes per second; `eta_1m` is the time
+a million notes would take at that rate.
+"""
+
+import argparse
+import json
+import time
+
+from common import Corpus, load_app
+
+def rate(count, seconds):
+    per_second = count / seconds
+    return {'notes': count, 'seconds': round(seconds, 2), 'notes_per_s': round(per_second),
+            'eta_1m': f'{1_000_000 / per_second / 60:.1f} min'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--single-notes', type=int, default=2000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    args = parser.parse_args()
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0')
+    from src.models.note import Note, NoteChangeCounter, NoteTag, NoteTombstone, db
+
+    client = app.test_client()
+    corpus = Corpus(words_per_note=(20, 200), events=0.3)
+    notes = [corpus.note() for _ in range(max(args.notes, args.single_notes))]
+
+    def reset():
+        with app.app_context():
+            for model in (NoteTag, NoteTombstone, Note, NoteChangeCounter):
+                db.session.query(model).delete()
+            db.session.commit()
+
+    results = {}
+    reset()
+    start = time.perf_counter()
+    for note in notes[:args.single_notes]:
+        assert client.post('/api/notes', json=note).status_code == 201
+    results['single'] = rate(args.single_notes, time.perf_counter() - start)
+    print(json.dumps({'single': results['single']}))
+
+    body = ''.join(json.dumps(note) + '\n' for note in notes[:args.notes]).encode()
+    for batch_size in args.batch_sizes:
+        reset()
+        start = time.perf_counter()
+        response = client.post(f'/api/notes/bulk?batch_size={batch_size}', data=body,
+                               content_type='application/x-ndjson')
+        elapsed = time.perf_counter() - start
+        summary = response.get_json()
+        assert response.status_code == 200 and summary['created'] == args.notes, summary
+        results[f'bulk_{batch_size}'] = rate(args.notes, elapsed)
+        print(json.dumps({f'bulk_{batch_size}': results[f'bulk_{batch_size}']}))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
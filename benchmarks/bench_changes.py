@@ -0,0 +1,74 @@
+"""Catching up after remote edits: full list reload vs the change feed.
+
+    python benchmarks/bench_changes.py                   # 10k, 100k notes
+    python benchmarks/bench_changes.py --sizes 10000 100000 --edits 1 10 100 --repeat 10
+
+For each size the client's sync cursor is taken from a list page, then
+--edits notes are patched (and one deleted) behind its back. Catching up
+is timed, with response bytes, three ways through the test client:
+
+  reload_all   GET /api/notes?fields=summary - every note, what a client
+               that has scrolled the whole list must refetch
+  reload_page  GET /api/notes?limit=50&fields=summary - the first page only
+               (cheap, but misses edits further down)
+  changes      GET /api/notes/changes?since=<cursor>&fields=summary
+
+NOTE_CACHE=off, so every request reaches the database.
+"""
+
+import argparse
+import json
+import random
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--edits', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0')
+    from src.models.note import Note, db
+
+    client = app.test_client()
+    corpus = Corpus(words_per_note=(20, 100))
+    rng = random.Random(11)
+
+    def fetch(url):
+        return len(client.get(url).get_data())
+
+    results = []
+    for size in args.sizes:
+        seed_notes(app, size, corpus)
+        with app.app_context():
+            ids = [nid for (nid,) in db.session.query(Note.id)]
+        for edits in args.edits:
+            cursor = client.get('/api/notes?limit=50&fields=summary').get_json()['changes_cursor']
+            for note_id in rng.sample(ids, edits):
+                client.patch(f'/api/notes/{note_id}', json={'title': corpus.text(4)})
+            deleted = rng.choice(ids)
+            client.delete(f'/api/notes/{deleted}')
+            ids.remove(deleted)
+
+            urls = {
+                'reload_all': '/api/notes?fields=summary',
+                'reload_page': '/api/notes?limit=50&fields=summary',
+                'changes': f'/api/notes/changes?since={cursor}&fields=summary',
+            }
+            row = {'notes': size, 'edits': edits}
+            for name, url in urls.items():
+                row[name] = {'bytes': fetch(url), **summarize(time_calls(lambda: fetch(url), args.repeat))}
+            results.append(row)
+            print(json.dumps(row, indent=2))
+
+    print(json.dumps([{
+        'notes': r['notes'], 'edits': r['edits'],
+        **{k: f"p50 {r[k]['p50_ms']}ms, {r[k]['bytes']} bytes" for k in ('reload_all', 'reload_page', 'changes')},
+    } for r in results], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Concurrent autosave load: default engine vs the tuned profile (src/engine.py).
+
+    python benchmarks/bench_concurrent_writes.py
+    python benchmarks/bench_concurrent_writes.py --threads 16 --ops 200 --read-ratio 0.5
+
+Each profile runs in its own interpreter (engine options are read at
+import) against a fresh SQLite file. Worker threads each use their own test
+client and send what the editor sends while typing, a full-note PUT, mixed
+with GET /api/notes/<id> reads. The report shows throughput, latency and
+how many requests failed, e.g. with "database is locked".
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from common import Corpus, load_app, seed_notes, summarize
+
+
+def run_profile(args):
+    """Child process body: load the app under DB_PROFILE and hammer it."""
+    app = load_app(DB_PROFILE=args.profile)
+    from src.engine import describe
+    from src.models.note import db
+    corpus = seed_notes(app, args.notes, Corpus(seed=7, words_per_note=(100, 400)))
+    with app.app_context():
+        settings = describe(db.engine)
+
+    latencies = {'put': [], 'get': []}
+    errors = {}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.threads)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        local = {'put': [], 'get': []}
+        local_errors = {}
+        start_gate.wait()
+        for _ in range(args.ops):
+            note_id = rng.randint(1, args.notes)
+            kind = 'get' if rng.random() < args.read_ratio else 'put'
+            started = time.perf_counter()
+            if kind == 'put':
+                response = client.put(f'/api/notes/{note_id}', json={
+                    'title': corpus.text(4),
+                    'content': corpus.text(rng.randint(100, 400)),
+                })
+            else:
+                response = client.get(f'/api/notes/{note_id}')
+            local[kind].append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                body = response.get_json(silent=True) or {}
+                reason = str(body.get('error', response.status_code))[:60]
+                local_errors[reason] = local_errors.get(reason, 0) + 1
+        with lock:
+            for key in latencies:
+                latencies[key].extend(local[key])
+            for reason, count in local_errors.items():
+                errors[reason] = errors.get(reason, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = args.threads * args.ops
+    print(json.dumps({
+        'profile': args.profile,
+        'settings': settings,
+        'requests': total,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1),
+        'failed': sum(errors.values()),
+        'errors': errors,
+        'put': summarize(latencies['put']),
+        'get': summarize(latencies['get']),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=100, help='requests per thread')
+    parser.add_argument('--notes', type=int, default=200)
+    parser.add_argument('--read-ratio', type=float, default=0.3)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'tuned'])
+    parser.add_argument('--profile', help=argparse.SUPPRESS)  # child mode
+    args = parser.parse_args()
+
+    if args.profile:
+        return run_profile(args)
+
+    results = []
+    for profile in args.profiles:
+        cmd = [sys.executable, os.path.abspath(__file__), '--profile', profile,
+               '--threads', str(args.threads), '--ops', str(args.ops),
+               '--notes', str(args.notes), '--read-ratio', str(args.read_ratio)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith('{')]
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f'{profile} run failed:\n{proc.stderr[-2000:]}')
+        results.append(json.loads(lines[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
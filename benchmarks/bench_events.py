@@ -0,0 +1,75 @@
+"""Agenda queries: indexed event_at range vs scanning the string columns.
+
+    python benchmarks/bench_events.py                    # 10k, 100k notes
+    python benchmarks/bench_events.py --sizes 10000 100000 1000000 --repeat 10
+
+`scan` is how a client had to build an agenda before event_at: load every
+note's event_date/event_time, parse and filter in Python, sort, and keep
+the first page. `index` is GET /api/notes/events for the same month
+(first page of 100, then the page after it via next_cursor) through the
+test client. Half of the corpus notes carry an event.
+"""
+
+import argparse
+import json
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+FROM, TO = '2026-03-01', '2026-04-01'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0')
+    from src.agenda import parse_bound, parse_event_at
+    from src.models.note import Note, db
+
+    client = app.test_client()
+    corpus = Corpus(words_per_note=(20, 100), events=0.5)
+    start, end = parse_bound(FROM), parse_bound(TO)
+    url = f'/api/notes/events?from={FROM}&to={TO}&limit={args.limit}&fields=summary'
+
+    def scan():
+        with app.app_context():
+            hits = []
+            for note_id, event_date, event_time in db.session.query(Note.id, Note.event_date, Note.event_time):
+                if not event_date:
+                    continue
+                at = parse_event_at(event_date, event_time)
+                if start <= at < end:
+                    hits.append((at, note_id))
+            hits.sort()
+            return db.session.query(Note).filter(Note.id.in_([i for _, i in hits[:args.limit]])).all()
+
+    results = []
+    for size in args.sizes:
+        seed_notes(app, size, corpus)
+        first = client.get(url).get_json()
+        next_url = f"{url}&cursor={first['next_cursor']}" if first['next_cursor'] else url
+        row = {
+            'notes': size,
+            'first_page': {
+                'scan': summarize(time_calls(scan, args.repeat)),
+                'index': summarize(time_calls(lambda: client.get(url), args.repeat)),
+            },
+            'next_page': {
+                'index': summarize(time_calls(lambda: client.get(next_url), args.repeat)),
+            },
+        }
+        results.append(row)
+        print(json.dumps(row, indent=2))
+
+    print(json.dumps([{
+        'notes': r['notes'],
+        'first_page': f"{r['first_page']['scan']['p50_ms']}ms -> {r['first_page']['index']['p50_ms']}ms",
+        'next_page': f"{r['next_page']['index']['p50_ms']}ms",
+    } for r in results], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Check that streamed exports keep RSS flat as the note count grows.
+
+    python benchmarks/bench_export_memory.py --notes 100000
+    python benchmarks/bench_export_memory.py --notes 1000000 --skip-buffered
+
+Streams GET /api/notes/export through the test client without buffering and
+samples RSS while chunks arrive, then does the same for the buffered
+GET /api/notes list. The streamed run goes first because peak RSS never
+shrinks back within a process. Exits non-zero if streaming grows RSS by more
+than --max-growth-mb.
+"""
+
+import argparse
+import gc
+import json
+import sys
+
+from common import load_app, seed_notes
+
+
+def rss_mb():
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def consume(client, url):
+    """Read a response chunk by chunk; return (bytes, peak RSS growth in MB)."""
+    gc.collect()
+    baseline = rss_mb()
+    peak = baseline
+    total = 0
+    response = client.get(url, buffered=False)
+    for i, chunk in enumerate(response.response):
+        total += len(chunk)
+        if i % 16 == 0:
+            peak = max(peak, rss_mb())
+    response.close()
+    peak = max(peak, rss_mb())
+    return total, peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--max-growth-mb', type=float, default=64.0)
+    parser.add_argument('--skip-buffered', action='store_true',
+                        help='skip the buffered comparison (it needs RAM for the whole list)')
+    parser.add_argument('--db')
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    seed_notes(app, args.notes)
+    client = app.test_client()
+
+    results = []
+    for label, url in [('export-ndjson', '/api/notes/export'),
+                       ('export-json', '/api/notes/export?format=json')]:
+        size, growth = consume(client, url)
+        results.append({'mode': label, 'notes': args.notes, 'bytes': size, 'rss_growth_mb': round(growth, 1)})
+    if not args.skip_buffered:
+        size, growth = consume(client, '/api/notes')
+        results.append({'mode': 'buffered-list', 'notes': args.notes, 'bytes': size, 'rss_growth_mb': round(growth, 1)})
+
+    for row in results:
+        print(json.dumps(row))
+    worst = max(r['rss_growth_mb'] for r in results if r['mode'].startswith('export'))
+    if worst > args.max_growth_mb:
+        print(f'FAIL: streamed export grew RSS by {worst:.1f} MB (limit {args.max_growth_mb} MB)')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Bandwidth and latency of polling clients with and without HTTP caching.
+
+    python benchmarks/bench_http_cache.py
+    python benchmarks/bench_http_cache.py --notes 2000 --ticks 500 --edit-every 10
+
+A synthetic editor session: every tick the client refreshes the sidebar
+page (GET /api/notes?limit=50&fields=summary) and the open note, and every
+`--edit-every` ticks another tab edits a note. Two clients replay the same
+session:
+
+  plain        no validators, no Accept-Encoding (the old behaviour)
+  conditional  If-None-Match with the last ETag per URL, Accept-Encoding: gzip
+
+Bytes are response body plus header bytes as sent by the app.
+"""
+
+import argparse
+import json
+import random
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def header_bytes(response):
+    return sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+
+
+def run_session(app, args, conditional):
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    etags = {}
+    stats = {'requests': 0, 'bytes': 0, 'not_modified': 0, 'latency_ms': []}
+
+    def get(url):
+        headers = {}
+        if conditional:
+            headers['Accept-Encoding'] = 'gzip'
+            if url in etags:
+                headers['If-None-Match'] = etags[url]
+        holder = {}
+        stats['latency_ms'].extend(time_calls(lambda: holder.setdefault('r', client.get(url, headers=headers)), 1))
+        response = holder['r']
+        if response.headers.get('ETag'):
+            etags[url] = response.headers['ETag']
+        stats['requests'] += 1
+        stats['bytes'] += len(response.data) + header_bytes(response)
+        stats['not_modified'] += response.status_code == 304
+
+    label = 'conditional' if conditional else 'plain'  # titles must differ between runs
+    open_note = rng.randint(1, args.notes)
+    for tick in range(args.ticks):
+        if tick and tick % args.edit_every == 0:
+            # another tab edits something; sometimes the note we have open
+            target = open_note if rng.random() < 0.3 else rng.randint(1, args.notes)
+            client.patch(f'/api/notes/{target}', json={'title': f'edited {tick} by {label}'})
+        get(f'/api/notes?limit={args.page_size}&fields=summary')
+        get(f'/api/notes/{open_note}')
+
+    return {
+        'requests': stats['requests'],
+        'not_modified': stats['not_modified'],
+        'total_kb': round(stats['bytes'] / 1024, 1),
+        'bytes_per_request': round(stats['bytes'] / stats['requests']),
+        'latency': summarize(stats['latency_ms']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--edit-every', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = load_app()
+    seed_notes(app, args.notes, Corpus(words_per_note=(200, 800)))
+
+    results = {}
+    for name, conditional in (('plain', False), ('conditional', True)):
+        results[name] = run_session(app, args, conditional)
+    plain, cond = results['plain'], results['conditional']
+    results['bandwidth_saved_pct'] = round(100 * (1 - cond['total_kb'] / plain['total_kb']), 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
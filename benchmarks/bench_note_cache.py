@@ -0,0 +1,85 @@
+"""Read-heavy traffic with the note cache off vs on (src/note_cache.py).
+
+    python benchmarks/bench_note_cache.py
+    python benchmarks/bench_note_cache.py --notes 5000 --ops 5000 --write-every 50
+
+Replays the same request mix against each backend: GET /api/notes/<id> for
+a skewed set of hot notes, sidebar pages and searches, with an autosave
+PATCH every `--write-every` requests (each one invalidates). Reports
+latency per request kind and the cache's own hit rates.
+
+Backends are NOTE_CACHE values (`redis` needs NOTE_CACHE_URL), plus
+`fakeredis`: the redis backend's code on an in-process fakeredis server,
+for checking it without one (needs the redis and fakeredis packages).
+"""
+
+import argparse
+import json
+import random
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def run(app, args, corpus, backend):
+    from src.note_cache import init_note_cache
+
+    if backend == 'fakeredis':
+        import fakeredis
+        from src.cache import RedisCache
+        from src.note_cache import NOTE_CACHE_TTL, NoteCache
+        store = RedisCache(None, ttl=NOTE_CACHE_TTL, client=fakeredis.FakeRedis(decode_responses=True))
+        app.extensions['note_cache'] = NoteCache(store, 'redis')
+    else:
+        init_note_cache(app, backend)
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    terms = corpus.query_terms(20)
+    hot = list(range(1, args.notes + 1))
+    weights = [1.0 / rank for rank in range(1, args.notes + 1)]
+    latencies = {'note': [], 'list': [], 'search': [], 'write': []}
+
+    for i in range(args.ops):
+        if i and i % args.write_every == 0:
+            note_id = rng.choices(hot, weights)[0]
+            latencies['write'].extend(time_calls(lambda: client.patch(
+                f'/api/notes/{note_id}', json={'title': f'{backend} edit {i}'}), 1))
+            continue
+        roll = rng.random()
+        if roll < 0.75:
+            url = f'/api/notes/{rng.choices(hot, weights)[0]}'
+            kind = 'note'
+        elif roll < 0.95:
+            url = f'/api/notes?limit={args.page_size}&fields=summary'
+            kind = 'list'
+        else:
+            url = f'/api/notes/search?q={rng.choice(terms)}'
+            kind = 'search'
+        latencies[kind].extend(time_calls(lambda: client.get(url), 1))
+
+    with app.app_context():
+        from src.note_cache import get_note_cache
+        stats = get_note_cache().stats()
+    return {
+        'backend': backend,
+        'latency': {kind: summarize(samples) for kind, samples in latencies.items()},
+        'hit_rate': {kind: stats[kind]['hit_rate'] for kind in ('note', 'list', 'search')} if stats['store'] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=2000)
+    parser.add_argument('--ops', type=int, default=3000)
+    parser.add_argument('--write-every', type=int, default=25)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--backends', nargs='+', default=['off', 'memory'])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = load_app()
+    corpus = seed_notes(app, args.notes, Corpus(words_per_note=(100, 600)))
+    print(json.dumps([run(app, args, corpus, backend) for backend in args.backends], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Reorder latency: per-id loop vs set-based bulk reorder vs single-note move.
+
+    python benchmarks/bench_reorder.py                 # 10, 1k, 10k notes
+    python benchmarks/bench_reorder.py --sizes 100 5000 --repeat 5
+
+`legacy-loop` is the original implementation (Note.query.get + assignment
+per id, one commit). `bulk` is src.ordering.bulk_reorder over the full
+reversed order. `move` moves one note from the bottom to between the first
+two notes, which is what a drag-and-drop in the sidebar sends.
+"""
+
+import argparse
+import json
+
+from common import load_app, seed_notes, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1_000, 10_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = load_app()
+    from src.models.note import Note, db
+    from src.ordering import LIST_ORDER, bulk_reorder, move_note
+
+    def legacy_loop(order):
+        for idx, nid in enumerate(order):
+            note = Note.query.get(nid)
+            if note:
+                note.position = idx
+        db.session.commit()
+
+    def bulk(order):
+        bulk_reorder(db.session, order)
+        db.session.commit()
+
+    def move():
+        ids = [nid for (nid,) in db.session.query(Note.id).order_by(*LIST_ORDER).limit(2)]
+        last = db.session.query(Note.id).order_by(*LIST_ORDER).offset(size - 1).limit(1).scalar()
+        move_note(db.session, last, after_id=ids[0], before_id=ids[1])
+        db.session.commit()
+
+    for size in sorted(args.sizes):
+        seed_notes(app, size)
+        with app.app_context():
+            order = [nid for (nid,) in db.session.query(Note.id).order_by(Note.id.desc())]
+            bulk(list(reversed(order)))  # start from a gapped layout
+            for label, fn in [('legacy-loop', lambda: legacy_loop(order)),
+                              ('bulk', lambda: bulk(order)),
+                              ('move', move)]:
+                db.session.expunge_all()
+                samples = time_calls(fn, args.repeat)
+                print(json.dumps({'notes': size, 'mode': label, **summarize(samples)}))
+                bulk(list(reversed(order)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compare full-text search against the old LIKE scan at growing corpus sizes.
+
+    python benchmarks/bench_search.py                     # 10k, 100k, 1M notes
+    python benchmarks/bench_search.py --sizes 10000 50000 --queries 20
+
+Both backends query the same scratch database, so the only difference is the
+access path: FTS5 index lookup vs `LIKE '%q%'` over every row.
+"""
+
+import argparse
+import json
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--db', help='reuse/keep this SQLite file instead of a temp file')
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    from src.models.note import db
+    from src.search import LikeSearchBackend, get_search_backend
+
+    corpus = Corpus()
+    terms = corpus.query_terms(args.queries)
+    # Mix whole words with 3-letter prefixes, as typed in the search box.
+    queries = [t if i % 2 else t[:3] for i, t in enumerate(terms)]
+
+    results = []
+    for size in sorted(args.sizes):
+        seed_notes(app, size, corpus)
+        with app.app_context():
+            backends = [get_search_backend(), LikeSearchBackend()]
+            for backend in backends:
+                samples = []
+                for q in queries:
+                    samples += time_calls(lambda: backend.search(db.session, q, limit=50), args.repeat)
+                row = {'notes': size, 'backend': backend.name, **summarize(samples)}
+                results.append(row)
+                print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Semantic search latency and recall as the corpus grows.
+
+    python benchmarks/bench_semantic.py                  # 10k, 100k notes
+    python benchmarks/bench_semantic.py --sizes 10000 100000 300000 --queries 200
+
+Per size (notes added with Core inserts, so they have no embeddings yet):
+
+  build       the first query: embeds every note, stores the vectors and
+              loads the index (what the first search after migration 10
+              costs one owner)
+  exact       SemanticIndex.search latency, brute force
+  ivf<p>      the same through the IVF partition (built from --ivf-min
+              notes), scanning p lists (--probes)
+  http        GET /api/notes/semantic?q=...&fields=summary, NOTE_CACHE=off
+  update      PATCH a note, then query: the index replays one change
+
+Queries are --words uncommon words drawn from a random note;
+`self_recall` is how often that note is in the top --k, and `ivf_recall`
+the share of the exact top --k each IVF search also returns.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--words', type=int, default=4)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--probes', type=int, nargs='+', default=[16, 64])
+    parser.add_argument('--ivf-min', type=int, default=50_000)
+    args = parser.parse_args()
+
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0', SEMANTIC_IVF_MIN=args.ivf_min)
+    from src.models.note import Note, db
+    from src.semantic import get_semantic_index
+
+    client = app.test_client()
+    corpus = Corpus(words_per_note=(20, 100))
+    common_words = set(corpus.words[:200])
+    rng = random.Random(5)
+
+    results = []
+    for size in args.sizes:
+        seed_notes(app, size, corpus)
+        with app.app_context():
+            index = get_semantic_index()
+            ids = [nid for (nid,) in db.session.query(Note.id)]
+            start = time.perf_counter()
+            index.search(db.session, corpus.text(3), limit=args.k)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            queries = []
+            for note_id in rng.sample(ids, args.queries):
+                words = [w for w in dict.fromkeys(db.session.get(Note, note_id).content.split())
+                         if w not in common_words]
+                queries.append((note_id, ' '.join(rng.sample(words, min(args.words, len(words))))))
+
+            modes = {'exact': 0, **{f'ivf{p}': p for p in args.probes}}
+            found = dict.fromkeys(modes, 0)
+            overlap = dict.fromkeys(modes, 0)
+            timings = {mode: [] for mode in modes}
+            for note_id, query in queries:
+                exact = None
+                for mode, probes in modes.items():
+                    start = time.perf_counter()
+                    hits = [i for i, _ in index.search(db.session, query, limit=args.k, probes=probes)]
+                    timings[mode].append((time.perf_counter() - start) * 1000)
+                    found[mode] += note_id in hits
+                    exact = hits if exact is None else exact
+                    overlap[mode] += len(set(exact) & set(hits))
+
+        http = []
+        for _, query in queries[:20]:
+            http += time_calls(lambda: client.get(f'/api/notes/semantic?q={query}&fields=summary'), 3)
+        update = []
+        for note_id in rng.sample(ids, 10):
+            client.patch(f'/api/notes/{note_id}', json={'content': corpus.text(50)})
+            update += time_calls(lambda: client.get(f'/api/notes/semantic?q={queries[0][1]}'), 1)
+
+        row = {
+            'notes': size,
+            'build_ms': round(build_ms),
+            **{mode: summarize(samples) for mode, samples in timings.items()},
+            'http': summarize(http),
+            'update': summarize(update),
+            'self_recall': {mode: round(n / len(queries), 3) for mode, n in found.items()},
+            'ivf_recall': {mode: round(n / (len(queries) * args.k), 3) for mode, n in overlap.items()
+                           if mode != 'exact'},
+        }
+        results.append(row)
+        print(json.dumps(row, indent=2))
+
+    print(json.dumps([{
+        'notes': r['notes'], 'build': f"{r['build_ms']}ms",
+        **{k: f"p50 {v['p50_ms']}ms p95 {v['p95_ms']}ms" for k, v in r.items() if isinstance(v, dict) and 'p50_ms' in v},
+        'self_recall': r['self_recall'], 'ivf_recall': r['ivf_recall'],
+    } for r in results], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Serialization cost of a note list: ORM + to_dict() + stdlib json vs
+column tuples + orjson (and MessagePack).
+
+    python benchmarks/bench_serialization.py                  # 10k notes
+    python benchmarks/bench_serialization.py --sizes 10000 100000 --fields full summary --repeat 10
+
+For each size and field set the whole list (GET /api/notes order) is
+built and encoded in-process, timing the two halves separately:
+
+  orm_stdlib   Note objects, to_dict(), Flask's default JSON provider
+               (how GET /api/notes was served before src/serialization.py)
+  orm_orjson   Note objects, to_dict(), NoteJSONProvider on orjson
+  rows_stdlib  note_select() tuples, note_dicts(), NoteJSONProvider on
+               the standard library (the fallback without orjson)
+  rows_orjson  note_select() tuples, note_dicts(), orjson
+  rows_msgpack the same rows as MessagePack (when msgpack is installed)
+
+`build` is the query plus the per-row dicts, `encode` the response body.
+All modes share the engine, which parses the tags column with orjson when
+it is installed (src/engine.py). `http` is GET /api/notes[?fields=summary]
+through the test client with NOTE_CACHE=off and each NoteJSONProvider
+backend. Response sizes are in bytes.
+"""
+
+import argparse
+import json
+import time
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+FIELD_SETS = {'full': None, 'summary': 'summary'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000])
+    parser.add_argument('--fields', nargs='+', choices=sorted(FIELD_SETS), default=['full', 'summary'])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0')
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy.orm import load_only
+    from src import serialization
+    from src.models.note import Note, db
+    from src.ordering import LIST_ORDER
+    from src.serialization import NoteJSONProvider, note_dicts, note_select
+
+    client = app.test_client()
+    providers = {
+        'flask': DefaultJSONProvider(app),
+        'stdlib': NoteJSONProvider(app, use_orjson=False),
+        'orjson': NoteJSONProvider(app, use_orjson=True) if serialization.orjson is not None else None,
+    }
+
+    def orm_items(fields):
+        query = Note.query.filter(Note.owned_by(None)).order_by(*LIST_ORDER)
+        if fields is not None:
+            query = query.options(load_only(*(getattr(Note, c) for c in {'id', 'position', 'updated_at'} | set(fields))))
+        return [note.to_dict(fields) for note in query.all()]
+
+    def row_items(fields):
+        query = note_select(fields).where(Note.owned_by(None)).order_by(*LIST_ORDER)
+        return list(note_dicts(db.session.execute(query).tuples(), fields))
+
+    modes = {
+        'orm_stdlib': (orm_items, lambda items: providers['flask'].response(items).get_data()),
+        'orm_orjson': (orm_items, lambda items: providers['orjson'].dumps_bytes(items)),
+        'rows_stdlib': (row_items, lambda items: providers['stdlib'].dumps_bytes(items)),
+        'rows_orjson': (row_items, lambda items: providers['orjson'].dumps_bytes(items)),
+        'rows_msgpack': (row_items, serialization.packb),
+    }
+    if providers['orjson'] is None:
+        print('orjson is not installed; skipping the orjson modes')
+        del modes['orm_orjson'], modes['rows_orjson']
+    if serialization.msgpack is None:
+        print('msgpack is not installed; skipping rows_msgpack')
+        del modes['rows_msgpack']
+
+    results = []
+    for size in args.sizes:
+        seed_notes(app, size, Corpus(words_per_note=(20, 200)))
+        for field_set in args.fields:
+            fields = Note.SUMMARY_FIELDS if FIELD_SETS[field_set] else None
+            row = {'notes': size, 'fields': field_set}
+            with app.app_context():
+                for name, (build, encode) in modes.items():
+                    build_ms, encode_ms = [], []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        items = build(fields)
+                        built = time.perf_counter()
+                        body = encode(items)
+                        build_ms.append((built - start) * 1000)
+                        encode_ms.append((time.perf_counter() - built) * 1000)
+                        db.session.rollback()
+                    row[name] = {'bytes': len(body), 'build': summarize(build_ms), 'encode': summarize(encode_ms)}
+            url = '/api/notes' + ('?fields=summary' if FIELD_SETS[field_set] else '')
+            for name in ('stdlib', 'orjson'):
+                if providers[name] is None:
+                    continue
+                app.json = providers[name]
+                row[f'http_{name}'] = summarize(time_calls(lambda: client.get(url), args.repeat))
+            results.append(row)
+            print(json.dumps(row, indent=2))
+
+    print(json.dumps([{
+        'notes': r['notes'], 'fields': r['fields'],
+        **{k: f"build {v['build']['p50_ms']}ms + encode {v['encode']['p50_ms']}ms, {v['bytes']} bytes"
+           for k, v in r.items() if isinstance(v, dict) and 'build' in v},
+        **{k: f"p50 {v['p50_ms']}ms" for k, v in r.items() if k.startswith('http_')},
+    } for r in results], indent=2))
+
+
+if __name__ == '__main__':
+    main()
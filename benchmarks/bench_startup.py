@@ -0,0 +1,120 @@
+"""Cold-start cost: import time and time to the first response.
+
+    python benchmarks/bench_startup.py                  # eager vs lazy, 5 runs each
+    python benchmarks/bench_startup.py --runs 10 --top 15
+    python benchmarks/bench_startup.py --max-first-ms 1500   # exit 1 on regression
+
+Every run is a fresh interpreter importing `api/index.py` the way Vercel
+does, then serving GET /api/notes through the test client. Scenarios:
+
+  eager-fresh  STARTUP_MODE=eager on an empty database (first deploy)
+  eager        STARTUP_MODE=eager, schema stamp already current
+  lazy         STARTUP_MODE=lazy, schema work on the first request
+
+`process_ms` is wall time from spawning the interpreter to the first
+response. The slowest imports come from `python -X importtime`; modules in
+HEAVY_MODULES must not be imported at startup (openai is loaded on the
+first translation).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT_DIR, summarize
+
+HEAVY_MODULES = ('openai', 'httpx', 'numpy')
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+import runpy
+app = runpy.run_path({entry!r})['app']
+t1 = time.perf_counter()
+status = app.test_client().get('/api/notes').status_code
+t2 = time.perf_counter()
+print('RESULT ' + json.dumps({{
+    'import_ms': (t1 - t0) * 1000,
+    'first_request_ms': (t2 - t1) * 1000,
+    'status': status,
+    'heavy': [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+
+def run_child(env, importtime=False):
+    code = CHILD.format(root=ROOT_DIR, entry=os.path.join(ROOT_DIR, 'api', 'index.py'), heavy=HEAVY_MODULES)
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=ROOT_DIR)
+    process_ms = (time.perf_counter() - start) * 1000
+    lines = [l for l in proc.stdout.splitlines() if l.startswith('RESULT ')]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f'child failed ({proc.returncode}):\n{proc.stderr[-2000:]}')
+    result = json.loads(lines[-1][len('RESULT '):])
+    result['process_ms'] = process_ms
+    return result, proc.stderr
+
+
+def slowest_imports(stderr, top):
+    """Parse `-X importtime` output into the `top` largest self times (ms)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us) / 1000, int(cumulative_us) / 1000, name.strip()))
+    rows.sort(reverse=True)
+    return [{'module': n, 'self_ms': round(s, 2), 'cumulative_ms': round(c, 2)} for s, c, n in rows[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    parser.add_argument('--max-first-ms', type=float, default=None,
+                        help='fail if p50 process_ms of any scenario exceeds this')
+    args = parser.parse_args()
+
+    base_env = dict(os.environ, DATABASE_URL='')
+    scenarios = {}
+    regressions = []
+    for name, mode, fresh in (('eager-fresh', 'eager', True), ('eager', 'eager', False), ('lazy', 'lazy', False)):
+        fd, db_path = tempfile.mkstemp(prefix='notes-bench-startup-', suffix='.db')
+        os.close(fd)
+        env = dict(base_env, SQLITE_PATH=db_path, STARTUP_MODE=mode)
+        if not fresh:
+            run_child(env)  # stamp the schema once
+        samples = {'import_ms': [], 'first_request_ms': [], 'process_ms': []}
+        heavy = set()
+        for _ in range(args.runs):
+            if fresh:
+                os.remove(db_path)
+            result, _ = run_child(env)
+            heavy.update(result['heavy'])
+            for key in samples:
+                samples[key].append(result[key])
+        _, stderr = run_child(env, importtime=True)
+        os.remove(db_path)
+
+        scenarios[name] = {key: summarize(values) for key, values in samples.items()}
+        scenarios[name]['heavy_modules_imported'] = sorted(heavy)
+        scenarios[name]['slowest_imports'] = slowest_imports(stderr, args.top)
+        if heavy:
+            regressions.append(f'{name}: heavy modules imported at startup: {sorted(heavy)}')
+        if args.max_first_ms is not None and scenarios[name]['process_ms']['p50_ms'] > args.max_first_ms:
+            regressions.append(f"{name}: p50 process_ms {scenarios[name]['process_ms']['p50_ms']} > {args.max_first_ms}")
+
+    print(json.dumps({'runs': args.runs, 'scenarios': scenarios}, indent=2))
+    if regressions:
+        print('\n'.join(['REGRESSION:'] + regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Tag filters and tag counts: note_tags index vs scanning the JSON column.
+
+    python benchmarks/bench_tags.py                    # 10k, 100k notes
+    python benchmarks/bench_tags.py --sizes 1000 50000 --repeat 10
+
+`scan` is what filtering by tag took before the index: load every note's
+tags and filter (or count) in Python. `index` is GET /api/notes?tag=...
+(first page of 50) and GET /api/tags through the test client. Tags are
+picked at three popularity ranks of the Zipf-distributed corpus tags.
+"""
+
+import argparse
+import json
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0')
+    from src.models.note import Note, db
+
+    client = app.test_client()
+    corpus = Corpus(words_per_note=(20, 100))
+    # common, mid and rare tags
+    picks = [corpus.tags[0], corpus.tags[10], corpus.tags[150]]
+
+    def scan_filter(wanted, mode):
+        with app.app_context():
+            hits = []
+            for note_id, tags in db.session.query(Note.id, Note.tags):
+                have = set(tags or [])
+                if (have.issuperset(wanted) if mode == 'all' else have & set(wanted)):
+                    hits.append(note_id)
+            return hits
+
+    def scan_counts():
+        with app.app_context():
+            counts = {}
+            for (tags,) in db.session.query(Note.tags):
+                for tag in tags or []:
+                    counts[tag] = counts.get(tag, 0) + 1
+            return sorted(counts.items(), key=lambda kv: -kv[1])
+
+    results = []
+    for size in args.sizes:
+        seed_notes(app, size, corpus)
+        row = {'notes': size}
+        for tag in picks:
+            url = f'/api/notes?tag={tag}&limit=50&fields=summary'
+            row[f'tag={tag}'] = {
+                'scan': summarize(time_calls(lambda: scan_filter([tag], 'all'), args.repeat)),
+                'index': summarize(time_calls(lambda: client.get(url), args.repeat)),
+            }
+        pair = picks[:2]
+        url = f'/api/notes?tag={pair[0]}&tag={pair[1]}&limit=50&fields=summary'
+        row['all_of_two'] = {
+            'scan': summarize(time_calls(lambda: scan_filter(pair, 'all'), args.repeat)),
+            'index': summarize(time_calls(lambda: client.get(url), args.repeat)),
+        }
+        row['tag_counts'] = {
+            'scan': summarize(time_calls(scan_counts, args.repeat)),
+            'index': summarize(time_calls(lambda: client.get('/api/tags?limit=50'), args.repeat)),
+        }
+        results.append(row)
+        print(json.dumps(row, indent=2))
+
+    print(json.dumps([{
+        'notes': r['notes'],
+        **{k: f"{v['scan']['p50_ms']}ms -> {v['index']['p50_ms']}ms" for k, v in r.items() if k != 'notes'},
+    } for r in results], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Per-user list and search latency as the table fills with other users' notes.
+
+    python benchmarks/bench_tenants.py                      # 10, 100, 1000 users x 1000 notes
+    python benchmarks/bench_tenants.py --users 10 100 1000 10000 --notes-per-user 1000
+
+Each step adds users with --notes-per-user notes each, written interleaved
+(as concurrent users would), so one user's rows are spread over the whole
+table. For a sample of users it times, through the test client with
+X-User-Id (TRUST_USER_HEADER=1) and NOTE_CACHE=off:
+
+  list    GET /api/notes?limit=50&fields=summary (first page + ETag)
+  search  GET /api/notes/search?q=<mid-frequency word>
+  tags    GET /api/tags?limit=20
+
+and, on SQLite, the bare FTS5 query two ways:
+
+  fts_owned     the backend's query: terms AND the user's user_id token
+  fts_filtered  terms matched over everyone's notes, then a join keeps the
+                user's - what search would cost without user_id in the index
+
+Flat list/search/tags rows across steps mean per-user cost is independent
+of the total table size.
+"""
+
+import argparse
+import json
+import random
+
+from common import Corpus, load_app, seed_notes, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--notes-per-user', type=int, default=1000)
+    parser.add_argument('--sample-users', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = load_app(NOTE_CACHE='off', REQUEST_LOG_SAMPLE='0', TRUST_USER_HEADER='1')
+    from sqlalchemy import func, insert, text
+    from src.models.user import User, db
+    from src.search import SqliteFtsBackend
+
+    client = app.test_client()
+    corpus = Corpus(words_per_note=(10, 60))
+    terms = corpus.query_terms(10)
+    rng = random.Random(7)
+    backend = app.extensions.get('note_search')
+    fts = isinstance(backend, SqliteFtsBackend)
+
+    def fts_owned(user_id, term):
+        with app.app_context():
+            return backend.search(db.session, term, limit=50, owner=user_id)
+
+    def fts_filtered(user_id, term):
+        # FTS5 over every user's rows, then the join keeps this user's
+        match = SqliteFtsBackend.match_expression(term)
+        with app.app_context():
+            return db.session.execute(text(
+                "SELECT note_fts.rowid, bm25(note_fts, 10.0, 1.0, 0.0) AS rank, "
+                "snippet(note_fts, 1, '<mark>', '</mark>', '…', 16) AS snippet FROM note_fts "
+                "JOIN note ON note.id = note_fts.rowid AND note.user_id = :user_id "
+                "WHERE note_fts MATCH :match ORDER BY rank LIMIT 50"
+            ), {'match': match, 'user_id': user_id}).all()
+
+    results = []
+    for users in sorted(args.users):
+        with app.app_context():
+            existing = db.session.query(func.count(User.id)).scalar()
+            if users > existing:
+                db.session.execute(insert(User), [{'username': f'user{i}', 'email': f'user{i}@example.com'}
+                                                  for i in range(existing + 1, users + 1)])
+                db.session.commit()
+        new_users = users - existing
+        if new_users > 0:
+            # round-robin over the new users, so their notes interleave
+            seed_notes(app, users * args.notes_per_user, corpus,
+                       owner=lambda k, base=existing, span=new_users: base + 1 + k % span)
+
+        sample = rng.sample(range(1, users + 1), min(args.sample_users, users))
+        timings = {'list': [], 'search': [], 'tags': [], 'fts_owned': [], 'fts_filtered': []}
+        for user_id in sample:
+            headers = {'X-User-Id': str(user_id)}
+            term = rng.choice(terms)
+            timings['list'] += time_calls(
+                lambda: client.get('/api/notes?limit=50&fields=summary', headers=headers), args.repeat)
+            timings['search'] += time_calls(
+                lambda: client.get(f'/api/notes/search?q={term}', headers=headers), args.repeat)
+            timings['tags'] += time_calls(
+                lambda: client.get('/api/tags?limit=20', headers=headers), args.repeat)
+            if fts:
+                timings['fts_owned'] += time_calls(lambda: fts_owned(user_id, term), args.repeat)
+                timings['fts_filtered'] += time_calls(lambda: fts_filtered(user_id, term), args.repeat)
+        row = {'users': users, 'notes': users * args.notes_per_user,
+               **{name: summarize(samples) for name, samples in timings.items() if samples}}
+        results.append(row)
+        print(json.dumps(row, indent=2))
+
+    print(json.dumps([{
+        'users': r['users'], 'notes': r['notes'],
+        **{k: f"p50 {v['p50_ms']}ms p95 {v['p95_ms']}ms" for k, v in r.items() if isinstance(v, dict)},
+    } for r in results], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+Benchmarks never touch database/app.db: `load_app()` points SQLITE_PATH at a
+scratch file *before* importing src.main, so call it after argument parsing
+and before importing anything else from src.
+"""
+
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def load_app(db_path=None, **env):
+    """Import src.main against a scratch SQLite database and return the app."""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix='notes-bench-', suffix='.db')
+        os.close(fd)
+    os.environ['SQLITE_PATH'] = db_path
+    # An empty value keeps load_dotenv() from pulling in a remote DATABASE_URL.
+    os.environ['DATABASE_URL'] = ''
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    from src.main import app
+    return app
+
+
+def _make_vocabulary(size, rng):
+    syllables = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'te', 'vo', 'zi', 'pa',
+                 'do', 'fe', 'gu', 'hi', 'ja', 'ko', 'li', 'mo', 'nu', 'ri']
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Corpus:
+    """Deterministic synthetic notes with a Zipf-like word distribution."""
+
+    def __init__(self, seed=42, vocabulary=5000, words_per_note=(20, 200), tags=200, events=0.0):
+        self.rng = random.Random(seed)
+        self.words = _make_vocabulary(vocabulary, self.rng)
+        self.weights = [1.0 / (rank + 1) for rank in range(len(self.words))]
+        self.words_per_note = words_per_note
+        self.tags = [f'tag{i}' for i in range(tags)]
+        self.tag_weights = [1.0 / (rank + 1) for rank in range(tags)]
+        # share of notes with an event, spread over ~3 years from 2025-01-01
+        self.events = events
+
+    def text(self, n_words):
+        return ' '.join(self.rng.choices(self.words, self.weights, k=n_words))
+
+    def note(self):
+        n_words = self.rng.randint(*self.words_per_note)
+        n_tags = self.rng.choice((0, 1, 1, 2, 3))
+        note = {
+            'title': self.text(self.rng.randint(2, 6)),
+            'content': self.text(n_words),
+            'tags': sorted(set(self.rng.choices(self.tags, self.tag_weights, k=n_tags))),
+        }
+        if self.events and self.rng.random() < self.events:
+            day = datetime.date(2025, 1, 1) + datetime.timedelta(days=self.rng.randrange(3 * 365))
+            note['event_date'] = day.isoformat()
+            if self.rng.random() < 0.7:
+                note['event_time'] = f'{self.rng.randrange(24):02d}:{self.rng.choice((0, 15, 30, 45)):02d}'
+        return note
+
+    def query_terms(self, count, band=(50, 500)):
+        """Pick mid-frequency words: common enough to match, rare enough to rank."""
+        return self.rng.sample(self.words[band[0]:band[1]], count)
+
+
+def seed_notes(app, total, corpus=None, batch_size=5000, owner=None):
+    """Top the note table up to `total` rows using batched Core inserts.
+
+    `owner(k)` gives the user_id of the k-th note added by this call
+    (default: shared notes). Derived data the routes keep in sync
+    (note_tags, event_at, change_seq) is filled too.
+    """
+    from sqlalchemy import func, insert
+    from src.agenda import parse_event_at
+    from src.changes import next_seq
+    from src.models.note import Note, NoteTag, db
+
+    corpus = corpus or Corpus()
+    with app.app_context():
+        existing = db.session.query(func.count(Note.id)).scalar()
+        remaining = total - existing
+        added = 0
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            rows = [corpus.note() for _ in range(n)]
+            for k, row in enumerate(rows, added):
+                row['user_id'] = owner(k) if owner else None
+                if row.get('event_date'):
+                    row['event_at'] = parse_event_at(row['event_date'], row.get('event_time'))
+            by_owner = {}
+            for row in rows:
+                by_owner.setdefault(row['user_id'], []).append(row)
+            for user_id, owned in by_owner.items():
+                first = next_seq(db.session, user_id, len(owned))
+                for offset, row in enumerate(owned):
+                    row['change_seq'] = first + offset
+            ids = db.session.execute(insert(Note).returning(Note.id, sort_by_parameter_order=True), rows).scalars().all()
+            tag_rows = [{'tag': tag, 'note_id': note_id, 'user_id': row['user_id']}
+                        for note_id, row in zip(ids, rows) for tag in row['tags']]
+            if tag_rows:
+                db.session.execute(insert(NoteTag), tag_rows)
+            db.session.commit()
+            remaining -= n
+            added += n
+    return corpus
+
+
+def time_calls(fn, repeat):
+    """Run fn() `repeat` times and return per-call latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples):
+    return {
+        'n': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+    }
@@ -0,0 +1,83 @@
+"""Compare two benchmarks/suite.py result files and flag regressions.
+
+    python benchmarks/compare.py results/before.json results/after.json
+    python benchmarks/compare.py before.json after.json --threshold 15 --metric p95_ms
+
+A scenario regresses when the chosen latency percentile grows (or
+throughput drops) by more than --threshold percent, or when it starts
+returning errors. The exit status is 1 if anything regressed, so the
+script can gate CI. Runs with different drivers, corpus sizes or
+concurrency are compared anyway, with a warning.
+"""
+
+import argparse
+import json
+import sys
+
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def pct_change(before, after):
+    if not before:
+        return None
+    return 100.0 * (after - before) / before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change that counts as a regression')
+    parser.add_argument('--metric', choices=LATENCY_METRICS, default='p50_ms',
+                        help='latency percentile that decides regressions')
+    args = parser.parse_args()
+
+    base, cand = load(args.baseline), load(args.candidate)
+    for key in ('driver', 'notes', 'concurrency', 'dialect'):
+        if base['meta'].get(key) != cand['meta'].get(key):
+            print(f"warning: {key} differs ({base['meta'].get(key)} vs {cand['meta'].get(key)})", file=sys.stderr)
+
+    print(f"baseline  {base['meta'].get('git')}  {base['meta'].get('timestamp')}")
+    print(f"candidate {cand['meta'].get('git')}  {cand['meta'].get('timestamp')}\n")
+    header = f"{'scenario':<10}" + ''.join(f'{m:>26}' for m in LATENCY_METRICS + ('throughput_rps',)) + f"{'errors':>11}  verdict"
+    print(header)
+    print('-' * len(header))
+
+    regressions = []
+    for scenario in base['results']:
+        if scenario not in cand['results']:
+            continue
+        b, c = base['results'][scenario], cand['results'][scenario]
+        cells = []
+        for metric in LATENCY_METRICS + ('throughput_rps',):
+            change = pct_change(b.get(metric), c.get(metric))
+            change = '' if change is None else f'{change:+.0f}%'
+            cells.append(f"{b.get(metric) or 0:>9.2f} {c.get(metric) or 0:>9.2f} {change:>6}")
+        verdict = 'ok'
+        latency_change = pct_change(b.get(args.metric), c.get(args.metric))
+        throughput_change = pct_change(b.get('throughput_rps'), c.get('throughput_rps'))
+        if latency_change is not None and latency_change > args.threshold:
+            verdict = f'SLOWER ({args.metric})'
+        elif throughput_change is not None and throughput_change < -args.threshold:
+            verdict = 'SLOWER (throughput)'
+        elif c.get('errors', 0) > b.get('errors', 0):
+            verdict = 'ERRORS'
+        elif latency_change is not None and latency_change < -args.threshold:
+            verdict = 'faster'
+        if verdict.startswith(('SLOWER', 'ERRORS')):
+            regressions.append(scenario)
+        print(f'{scenario:<10}' + ''.join(cells) + f"{b.get('errors', 0):>6} {c.get('errors', 0):>4}  {verdict}")
+
+    if regressions:
+        print(f"\nregressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""End-to-end benchmark suite for the notes API.
+
+    python benchmarks/suite.py                                   # 1k notes, test client
+    python benchmarks/suite.py --notes 100000 --driver wsgi --concurrency 8
+    python benchmarks/suite.py --scenarios list get search --ops 500 --out results/before.json
+    python benchmarks/suite.py --database-url postgresql+psycopg2://localhost/notes_bench
+    python benchmarks/compare.py results/before.json results/after.json
+
+Seeds a scratch SQLite file (or tops up the Postgres database given with
+--database-url) with `--notes` synthetic notes, then runs each scenario for
+`--ops` requests spread over `--concurrency` client threads:
+
+  list       GET  /api/notes?limit=50&fields=summary    (sidebar page)
+  get        GET  /api/notes/<id>
+  search     GET  /api/notes/search?q=<term>
+  create     POST /api/notes
+  update     PUT  /api/notes/<id>
+  patch      PATCH /api/notes/<id> with a splice        (autosave)
+  reorder    POST /api/notes/<id>/move                  (drag and drop)
+  translate  POST /api/notes/<id>/translate             (stub LLM, see below)
+
+Drivers: `client` calls the app in-process through Flask's test client;
+`wsgi` serves it with werkzeug's threaded server from a child process and
+sends real HTTP/1.1 keep-alive requests, so sockets, headers and
+compression are included. `translate` talks to scripts/stub_llm_server.py started in this
+process (--llm-delay adds latency per LLM request); each op translates a
+different note, so results are cold unless --ops exceeds --notes.
+
+Results (p50/p95/p99, throughput, errors per scenario plus the git
+revision and settings) go to --out, by default
+benchmarks/results/<timestamp>-<driver>-<notes>.json. App settings can be
+pinned with --env, e.g. --env NOTE_CACHE=off.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from common import ROOT_DIR, Corpus, load_app, seed_notes, summarize
+
+SCENARIOS = ('list', 'get', 'search', 'create', 'update', 'patch', 'reorder', 'translate')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class ClientDriver:
+    """In-process requests through the Flask test client (one per thread)."""
+
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(method, path, body=None):
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            return response.status_code
+        return send
+
+    def close(self):
+        pass
+
+
+class WsgiDriver:
+    """The app behind werkzeug's threaded server in a child process (so the
+    clients don't compete with it for the GIL); HTTP/1.1 keep-alive clients."""
+
+    name = 'wsgi'
+
+    def __init__(self, app):
+        # the child inherits the environment load_app() set up (same database)
+        self.proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve'],
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for line in self.proc.stdout:
+            if line.startswith('serving on port '):
+                self.port = int(line.split()[-1])
+                break
+        else:
+            raise RuntimeError('WSGI server failed to start')
+        # keep draining the child's stdout so it can never block on a full pipe
+        threading.Thread(target=self.proc.stdout.read, daemon=True).start()
+
+    def session(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+
+        def send(method, path, body=None):
+            headers = {'Accept-Encoding': 'gzip'}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body).encode()
+                headers['Content-Type'] = 'application/json'
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+            return response.status
+        return send
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+def serve():
+    """Child mode of WsgiDriver."""
+    import logging
+    from werkzeug.serving import make_server
+
+    from src.main import app
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no per-request access log
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    print(f'serving on port {server.server_port}', flush=True)
+    server.serve_forever()
+
+
+class Workload:
+    """Request factories for each scenario; each returns (method, path, body)."""
+
+    def __init__(self, ids, corpus, seed):
+        self.ids = ids
+        self.corpus = corpus
+        self.terms = corpus.query_terms(50)
+        self.lock = threading.Lock()
+        self.translate_order = random.Random(seed).sample(ids, len(ids))
+        self.translated = 0
+
+    def list(self, rng):
+        return 'GET', '/api/notes?limit=50&fields=summary', None
+
+    def get(self, rng):
+        return 'GET', f'/api/notes/{rng.choice(self.ids)}', None
+
+    def search(self, rng):
+        term = rng.choice(self.terms)
+        # half whole words, half 3-letter prefixes as typed in the search box
+        return 'GET', f'/api/notes/search?q={term if rng.random() < 0.5 else term[:3]}', None
+
+    def create(self, rng):
+        return 'POST', '/api/notes', self.corpus.note()
+
+    def update(self, rng):
+        note = self.corpus.note()
+        return 'PUT', f'/api/notes/{rng.choice(self.ids)}', {'title': note['title'], 'content': note['content']}
+
+    def patch(self, rng):
+        return 'PATCH', f'/api/notes/{rng.choice(self.ids)}', {
+            'ops': [{'at': 0, 'delete': 0, 'insert': self.corpus.text(3) + ' '}]}
+
+    def reorder(self, rng):
+        note_id, after = rng.sample(self.ids, 2)
+        return 'POST', f'/api/notes/{note_id}/move', {'after': after}
+
+    def translate(self, rng):
+        with self.lock:
+            note_id = self.translate_order[self.translated % len(self.translate_order)]
+            self.translated += 1
+        return 'POST', f'/api/notes/{note_id}/translate', {'target_lang': 'zh'}
+
+
+def run_scenario(driver, workload, scenario, ops, concurrency, seed):
+    make_request = getattr(workload, scenario)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    gate = threading.Barrier(concurrency)
+    per_thread = [ops // concurrency + (1 if i < ops % concurrency else 0) for i in range(concurrency)]
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        send = driver.session()
+        local, local_statuses = [], {}
+        gate.wait()
+        for _ in range(per_thread[index]):
+            method, path, body = make_request(rng)
+            started = time.perf_counter()
+            try:
+                status = send(method, path, body)
+            except Exception as e:
+                status = type(e).__name__
+            local.append((time.perf_counter() - started) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    errors = sum(count for status, count in statuses.items()
+                 if not (isinstance(status, int) and status < 400))
+    return {
+        'ops': ops,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(ops / elapsed, 1) if elapsed else None,
+        'errors': errors,
+        'statuses': {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        **summarize(latencies),
+    }
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                             capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT_DIR,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+        return out.stdout.strip() + ('-dirty' if dirty else '') if out.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=1000, help='corpus size (1k .. 1M)')
+    parser.add_argument('--words', type=int, nargs=2, default=(50, 800), metavar=('MIN', 'MAX'),
+                        help='words per seeded note')
+    parser.add_argument('--tags', type=int, default=200, help='distinct tags (Zipf-distributed)')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--ops', type=int, default=300, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--driver', choices=('client', 'wsgi'), default='client')
+    parser.add_argument('--database-url', help='benchmark this database instead of a scratch SQLite file')
+    parser.add_argument('--db', help='reuse/keep this SQLite file instead of a temp file')
+    parser.add_argument('--llm-delay', type=float, default=0.05, help='stub LLM seconds per request')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='app setting for this run (repeatable)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='result file (default: benchmarks/results/<timestamp>-...json)')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)  # WsgiDriver child
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve()
+
+    env = {'REQUEST_LOG_SAMPLE': '0', 'MOCK_TRANSLATION': '0'}
+    if 'translate' in args.scenarios:
+        sys.path.insert(0, os.path.join(ROOT_DIR, 'scripts'))
+        from stub_llm_server import start_in_thread
+        stub, base_url = start_in_thread(delay=args.llm_delay)
+        env.update(BASE_URL=base_url, OPENAI_API_KEY='stub', MODEL='stub-model')
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    env.update(item.split('=', 1) for item in args.env)
+    app = load_app(args.db, **env)
+
+    from src.models.note import Note, db
+
+    corpus = Corpus(seed=args.seed, words_per_note=tuple(args.words), tags=args.tags)
+    started = time.perf_counter()
+    seed_notes(app, args.notes, corpus)
+    seed_seconds = time.perf_counter() - started
+    with app.app_context():
+        ids = [nid for (nid,) in db.session.query(Note.id)]
+        dialect = db.engine.dialect.name
+
+    driver = ClientDriver(app) if args.driver == 'client' else WsgiDriver(app)
+    workload = Workload(ids, corpus, args.seed)
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            if args.warmup:
+                run_scenario(driver, workload, scenario, args.warmup, 1, args.seed + 1)
+            results[scenario] = run_scenario(driver, workload, scenario, args.ops, args.concurrency, args.seed)
+            r = results[scenario]
+            print(f"{scenario:<10} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                  f"p99 {r['p99_ms']:>8.2f}ms  {r['throughput_rps']:>8.1f} req/s  errors {r['errors']}",
+                  file=sys.stderr)
+    finally:
+        driver.close()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dialect': dialect,
+            'driver': args.driver,
+            'notes': len(ids),
+            'seed_seconds': round(seed_seconds, 2),
+            'concurrency': args.concurrency,
+            'ops': args.ops,
+            'words': list(args.words),
+            'llm_delay': args.llm_delay if 'translate' in args.scenarios else None,
+            'env': {k: v for k, v in env.items() if k not in ('OPENAI_API_KEY', 'DATABASE_URL')},
+        },
+        'results': results,
+    }
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{args.driver}-{args.notes}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f'wrote {out}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
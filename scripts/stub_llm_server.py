@@ -0,0 +1,159 @@
+"""Local stub of an OpenAI-compatible chat completions server.
+
+Lets the translation pipeline run offline and deterministically:
+
+    python scripts/stub_llm_server.py --port 8099 --delay 0.5 --fail-rate 0.2
+    OPENAI_API_KEY=stub BASE_URL=http://127.0.0.1:8099/v1 python src/main.py
+
+The "translation" is the text after the prompt's `Original:` marker,
+prefixed with `[<target_lang>]`, so reassembled output can be checked
+against the input. --fail-rate makes that fraction of requests return 500 to
+exercise retries. Requests with "stream": true get SSE chunks word by word
+(--token-delay between them).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TARGET_RE = re.compile(r'Translate the following text to ([^.\s]+)')
+
+
+_BATCH_RE = re.compile(r'Translate each value of the following JSON object to ([^.\s]+)')
+
+
+def fake_translate(prompt):
+    batch = _BATCH_RE.search(prompt)
+    if batch:
+        # packed batch prompt: answer with the same JSON object, values tagged
+        texts = json.loads(prompt.split('\n\n', 1)[-1])
+        return json.dumps({k: f'[{batch.group(1)}] {v.strip()}' for k, v in texts.items()}, ensure_ascii=False)
+    target = _TARGET_RE.search(prompt)
+    lang = target.group(1) if target else '??'
+    text = prompt.split('Original:\n', 1)[-1]
+    return f'[{lang}] {text.strip()}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StubLLM/1.0'
+    # headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients stall ~40ms per response on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request, content):
+        """Send `content` as chat.completion.chunk SSE events, word by word."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        words = re.findall(r'\S+\s*|\s+', content)
+        for i, word in enumerate(words):
+            chunk = {
+                'id': f'stub-{self.server.requests}',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': request.get('model', 'stub-model'),
+                'choices': [{'index': 0, 'delta': {'content': word},
+                             'finish_reason': 'stop' if i == len(words) - 1 else None}],
+            }
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.flush()
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            return self._send_json(200, {'object': 'list', 'data': [{'id': 'stub-model', 'object': 'model'}]})
+        return self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': 'not found'}})
+
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if random.random() < self.server.fail_rate:
+            return self._send_json(500, {'error': {'message': 'stub: injected failure'}})
+
+        prompt = '\n'.join(m.get('content') or '' for m in request.get('messages', []) if m.get('role') == 'user')
+        content = fake_translate(prompt)
+        if request.get('stream'):
+            return self._send_stream(request, content)
+        usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        self._send_json(200, {
+            'id': f'stub-{self.server.requests}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub-model'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': usage,
+        })
+
+
+def make_server(host='127.0.0.1', port=8099, delay=0.0, fail_rate=0.0, verbose=False, token_delay=0.0):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.token_delay = token_delay
+    server.fail_rate = fail_rate
+    server.verbose = verbose
+    server.requests = 0
+    server.lock = threading.Lock()
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start a stub server on a background thread; returns (server, base_url)."""
+    kwargs.setdefault('port', 0)
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}/v1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub OpenAI-compatible chat completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to sleep per request')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of requests that return 500')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='seconds between streamed tokens')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.delay, args.fail_rate, args.verbose, args.token_delay)
+    print(f'Stub LLM listening on http://{args.host}:{args.port}/v1')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
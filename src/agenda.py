@@ -0,0 +1,91 @@
+"""Calendar queries over note events.
+
+A note's event is entered as `event_date` (YYYY-MM-DD) and optional
+`event_time` (HH:MM or HH:MM:SS) strings, which the API keeps returning
+as they were sent. Every write also stores their combination in the indexed
+`event_at` timestamp (naive wall-clock time, midnight when there is no
+time), and `GET /api/notes/events` range-scans (event_at, id) with keyset
+pagination, so an agenda page costs the same however many notes exist.
+"""
+
+import base64
+import json
+from datetime import date, datetime, time
+
+from sqlalchemy import and_, bindparam, or_, select, update
+
+from src.models.note import Note
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def parse_event_at(event_date, event_time=None):
+    """datetime for the (date, time) strings, None without a date.
+
+    Raises ValueError when either string is malformed.
+    """
+    if not event_date:
+        return None
+    day = date.fromisoformat(str(event_date).strip())
+    at = time()
+    if event_time:
+        at = time.fromisoformat(str(event_time).strip())
+    return datetime.combine(day, at.replace(tzinfo=None))
+
+
+def parse_bound(value):
+    """A ?from=/?to= bound: a date (midnight) or a full ISO datetime."""
+    value = value.strip()
+    if len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), time())
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def encode_cursor(note):
+    key = [note.event_at.isoformat(), note.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    event_at, note_id = json.loads(base64.urlsafe_b64decode(padded))
+    return datetime.fromisoformat(event_at), int(note_id)
+
+
+def events_query(query, start=None, end=None, after=None):
+    """Restrict a Note query to events in [start, end), after the keyset
+    position `after` = (event_at, id), in (event_at, id) order."""
+    query = query.filter(Note.event_at.isnot(None))
+    if start is not None:
+        query = query.filter(Note.event_at >= start)
+    if end is not None:
+        query = query.filter(Note.event_at < end)
+    if after is not None:
+        event_at, note_id = after
+        query = query.filter(or_(Note.event_at > event_at,
+                                 and_(Note.event_at == event_at, Note.id > note_id)))
+    return query.order_by(Note.event_at.asc(), Note.id.asc())
+
+
+def backfill(conn):
+    """Fill event_at from the legacy strings (migration 7); rows that
+    don't parse are left NULL."""
+    note = Note.__table__
+    pending = []
+    # updated_at is pinned, or its onupdate default would stamp every row
+    stmt = (update(note).where(note.c.id == bindparam('b_id'))
+            .values(event_at=bindparam('b_event_at'), updated_at=note.c.updated_at))
+    rows = conn.execute(select(note.c.id, note.c.event_date, note.c.event_time)
+                        .where(note.c.event_date.isnot(None), note.c.event_at.is_(None))).all()
+    for note_id, event_date, event_time in rows:
+        try:
+            event_at = parse_event_at(event_date, event_time)
+        except ValueError:
+            continue
+        if event_at is not None:
+            pending.append({'b_id': note_id, 'b_event_at': event_at})
+        if len(pending) >= BACKFILL_CHUNK_SIZE:
+            conn.execute(stmt, pending)
+            pending = []
+    if pending:
+        conn.execute(stmt, pending)
@@ -0,0 +1,46 @@
+"""Who the current request acts for.
+
+Notes belong to users through Note.user_id. A request's user is
+`session['user_id']` (set by POST /api/login) or, with TRUST_USER_HEADER=1,
+the X-User-Id header. Requests with neither work on the shared notes
+(user_id NULL), which is where every note created before ownership lives,
+so the single-user app behaves as before.
+
+Neither source is authenticated here. The header is ignored unless
+TRUST_USER_HEADER is set, which is only safe behind a proxy that
+authenticates users, sets X-User-Id and drops any X-User-Id the client
+sent.
+"""
+
+import os
+
+from flask import g, jsonify, request, session
+
+USER_HEADER = 'X-User-Id'
+TRUST_USER_HEADER = os.getenv('TRUST_USER_HEADER', '0') in ('1', 'true', 'True')
+
+
+def current_user_id():
+    """The request's user id, or None for the shared notes.
+
+    Resolved once per request; raises ValueError for a malformed header.
+    """
+    if 'user_id' not in g:
+        user_id = session.get('user_id')
+        if user_id is None and TRUST_USER_HEADER:
+            raw = request.headers.get(USER_HEADER, '').strip()
+            if raw:
+                if not raw.isdigit():
+                    raise ValueError(f'{USER_HEADER} must be a user id')
+                user_id = int(raw)
+        g.user_id = user_id
+    return g.user_id
+
+
+def load_current_user():
+    """before_request hook: resolve the user up front, 400 for a malformed
+    X-User-Id."""
+    try:
+        current_user_id()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
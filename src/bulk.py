@@ -0,0 +1,274 @@
+"""Bulk note writes for POST /api/notes/bulk.
+
+Items (creates, updates and deletes) are validated one at a time as they
+are read, so a malformed item is reported by its index without holding up
+the rest. Valid items collect into batches of `batch_size`, and each batch
+is written with a few set-based statements and committed on its own:
+
+  create  one executemany INSERT, then one SELECT mapping the batch's
+          change_seq block back to ids for the note_tags and embedding
+          INSERTs; a block that doesn't map one-to-one fails the batch.
+          (INSERT ... RETURNING in parameter order would be one statement
+          per row on SQLite, which doesn't promise RETURNING order.)
+  update  one SELECT of the batch's notes, then the ORM flush (versioned,
+          so a concurrent edit fails the batch instead of being overwritten)
+  delete  one SELECT of the ids, tombstones, then one DELETE
+
+A batch that fails is rolled back and each of its items reported; earlier
+batches stay committed. Within a batch creates run first, then updates,
+then deletes. Every write also keeps note_tags, event_at, embeddings and
+the change feed in step, as the single-note routes do.
+"""
+
+import json
+import os
+from datetime import date, time
+
+from sqlalchemy import delete, insert, select
+
+from src import agenda, changes, semantic
+from src.models.note import Note, NoteTag
+from src.tags import clear_note_tags, normalize_tags
+
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '1000'))
+MAX_BULK_BATCH_SIZE = 5000
+
+UPDATABLE_FIELDS = ('title', 'content', 'tags', 'event_date', 'event_time')
+
+
+def iter_lines(stream, chunk_size=64 * 1024):
+    """Non-empty lines of a binary stream, read `chunk_size` bytes at a time
+    (iterating a WSGI input stream by line reads it a byte at a time)."""
+    rest = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        *lines, rest = (rest + chunk).split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield line
+    if rest.strip():
+        yield rest
+
+
+def check_text(item, field):
+    """`item[field]` if it is a string that fits the column (and, for the
+    title, isn't blank); ValueError otherwise. The single-note routes use
+    it too."""
+    value = item.get(field)
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    if field == 'title' and not value.strip():
+        raise ValueError('title must not be empty')
+    limit = getattr(Note.__table__.c[field].type, 'length', None)
+    if limit and len(value) > limit:
+        raise ValueError(f'{field} must be at most {limit} characters')
+    return value
+
+
+def _check_event(fields):
+    # each half on its own, since the other may be the stored value
+    if fields.get('event_date'):
+        date.fromisoformat(str(fields['event_date']).strip())
+    if fields.get('event_time'):
+        time.fromisoformat(str(fields['event_time']).strip())
+
+
+def _note_id(item):
+    note_id = item.get('id')
+    if not isinstance(note_id, int) or isinstance(note_id, bool):
+        raise ValueError('id (integer) is required')
+    return note_id
+
+
+def prepare(item):
+    """Validate one bulk item: (op, payload) or ValueError.
+
+    `item` is a dict, or one NDJSON line (str/bytes) holding one. `op`
+    defaults to create.
+    """
+    if isinstance(item, (str, bytes)):
+        try:
+            item = json.loads(item)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'invalid JSON: {e}')
+    if not isinstance(item, dict):
+        raise ValueError('each item must be a JSON object')
+    op = item.get('op', 'create')
+    if op == 'create':
+        tags = normalize_tags(item.get('tags'))
+        return op, {
+            'title': check_text(item, 'title'),
+            'content': check_text(item, 'content'),
+            'tags': tags,
+            'event_date': item.get('event_date'),
+            'event_time': item.get('event_time'),
+            'event_at': agenda.parse_event_at(item.get('event_date'), item.get('event_time')),
+        }
+    if op == 'update':
+        unknown = set(item) - set(UPDATABLE_FIELDS) - {'op', 'id', 'version'}
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields = {f: item[f] for f in UPDATABLE_FIELDS if f in item}
+        for field in ('title', 'content'):
+            if field in fields:
+                check_text(fields, field)
+        if 'tags' in fields:
+            fields['tags'] = normalize_tags(fields['tags'])
+        _check_event(fields)
+        version = item.get('version')
+        if version is not None and not isinstance(version, int):
+            raise ValueError('version must be an integer')
+        return op, {'id': _note_id(item), 'version': version, 'fields': fields}
+    if op == 'delete':
+        return op, {'id': _note_id(item)}
+    raise ValueError('op must be create, update or delete')
+
+
+class BulkWriter:
+    """Collects validated items into batches and writes them for one owner.
+
+    `on_commit(note_ids, rewrites)` runs after each committed batch with
+    the ids it updated or deleted and an (old, new) content pair per note
+    whose content changed (for cache invalidation).
+    """
+
+    def __init__(self, session, user_id, batch_size=BULK_BATCH_SIZE, on_commit=None):
+        self.session = session
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.on_commit = on_commit
+        self.counts = {'created': 0, 'updated': 0, 'deleted': 0}
+        self.errors = []
+        self.batches = 0
+        self._pending = []
+
+    def add(self, index, item):
+        try:
+            op, payload = prepare(item)
+        except ValueError as e:
+            self.errors.append({'index': index, 'error': str(e)})
+            return
+        self._pending.append((index, op, payload))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            counts, errors, touched, rewrites = self._write(batch)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            self.errors.extend({'index': index, 'error': f'batch failed: {e}'} for index, _, _ in batch)
+            return
+        self.batches += 1
+        for name, n in counts.items():
+            self.counts[name] += n
+        self.errors.extend(errors)
+        if self.on_commit is not None:
+            self.on_commit(touched, rewrites)
+
+    def finish(self):
+        """Write what is left; returns the summary sent to the client."""
+        self.flush()
+        self.errors.sort(key=lambda e: e['index'])
+        return {**self.counts, 'batches': self.batches, 'errors': self.errors}
+
+    def _write(self, batch):
+        session, user_id = self.session, self.user_id
+        creates = [(i, p) for i, op, p in batch if op == 'create']
+        updates = [(i, p) for i, op, p in batch if op == 'update']
+        deletes = [(i, p['id']) for i, op, p in batch if op == 'delete']
+        errors = []
+        touched = []
+        rewrites = []
+
+        if creates:
+            first = changes.next_seq(session, user_id, len(creates))
+            last = first + len(creates) - 1
+            rows = [{**p, 'user_id': user_id, 'change_seq': first + offset}
+                    for offset, (_, p) in enumerate(creates)]
+            session.execute(insert(Note.__table__), rows)
+            # next_seq hands out each owner's numbers once, so the block
+            # names exactly these rows (indexed on (user_id, change_seq), but
+            # not unique: shared notes' NULL user_id would defeat it anyway)
+            ids = dict(session.execute(select(Note.change_seq, Note.id).where(
+                Note.owned_by(user_id), Note.change_seq.between(first, last))).all())
+            if len(ids) != len(rows):
+                raise RuntimeError(f'expected {len(rows)} notes numbered {first}-{last}, found {len(ids)}')
+            tag_rows = [{'tag': tag, 'note_id': ids[row['change_seq']], 'user_id': user_id}
+                        for row in rows for tag in row['tags']]
+            if tag_rows:
+                session.execute(insert(NoteTag), tag_rows)
+            semantic.index_notes(session, [(ids[row['change_seq']], user_id, row['title'], row['content'])
+                                           for row in rows])
+
+        updated = 0
+        if updates:
+            notes = {note.id: note for note in session.query(Note).filter(
+                Note.id.in_({p['id'] for _, p in updates}), Note.owned_by(user_id))}
+            modified, retagged, reworded = {}, set(), set()
+            for index, p in updates:
+                note = notes.get(p['id'])
+                if note is None:
+                    errors.append({'index': index, 'id': p['id'], 'error': 'Note not found'})
+                    continue
+                if p['version'] is not None and p['version'] != note.version:
+                    errors.append({'index': index, 'id': note.id, 'version': note.version,
+                                   'error': 'Note was modified by another request'})
+                    continue
+                fields = p['fields']
+                if 'content' in fields and fields['content'] != note.content:
+                    rewrites.append((note.content, fields['content']))
+                    reworded.add(note.id)
+                if 'title' in fields and fields['title'] != note.title:
+                    reworded.add(note.id)
+                for field, value in fields.items():
+                    setattr(note, field, value)
+                if 'tags' in fields:
+                    retagged.add(note.id)
+                if 'event_date' in fields or 'event_time' in fields:
+                    note.event_at = agenda.parse_event_at(note.event_date, note.event_time)
+                if session.is_modified(note):
+                    modified[note.id] = note
+                updated += 1
+            if modified:
+                first = changes.next_seq(session, user_id, len(modified))
+                for offset, note in enumerate(modified.values()):
+                    note.change_seq = first + offset
+            if retagged:
+                clear_note_tags(session, retagged)
+                tag_rows = [{'tag': tag, 'note_id': nid, 'user_id': user_id}
+                            for nid in retagged for tag in notes[nid].tags or []]
+                if tag_rows:
+                    session.execute(insert(NoteTag), tag_rows)
+            if reworded:
+                semantic.index_notes(session, [(nid, user_id, notes[nid].title, notes[nid].content)
+                                               for nid in reworded])
+            # UPDATE ... WHERE id = :id AND version = :loaded_version
+            session.flush()
+            touched.extend(modified)
+
+        deleted = 0
+        if deletes:
+            found = set(session.execute(select(Note.id).where(
+                Note.id.in_({nid for _, nid in deletes}), Note.owned_by(user_id))).scalars())
+            gone = []
+            for index, note_id in deletes:
+                if note_id not in found:
+                    errors.append({'index': index, 'id': note_id, 'error': 'Note not found'})
+                elif note_id not in gone:
+                    gone.append(note_id)
+            if gone:
+                clear_note_tags(session, gone)
+                semantic.forget_notes(session, gone)
+                changes.record_deletes(session, user_id, gone)
+                session.execute(delete(Note).where(Note.id.in_(gone)))
+                touched.extend(gone)
+            deleted = len(gone)
+
+        return {'created': len(creates), 'updated': updated, 'deleted': deleted}, errors, touched, rewrites
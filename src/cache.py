@@ -0,0 +1,204 @@
+"""Caching primitives.
+
+  TTLCache    per-process LRU with TTL and entry/byte limits
+  RedisCache  the same interface over a Redis-compatible server (Redis,
+              Valkey, KeyDB, ...), shared by every worker; needs the
+              optional `redis` package
+
+Besides key/value entries both keep named counters (`incr`/`counter`) that
+are never evicted, for generation numbers.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # optional
+    redis = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and entry/byte limits.
+
+    Entry sizes default to sys.getsizeof(value), which is accurate for str and
+    bytes; pass `size=` for composite values. Counters are exposed through
+    `stats()`.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=16 * 1024 * 1024, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, size, value = entry
+            if expires_at is not None and expires_at <= now:
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, size=None):
+        ttl = self.ttl if ttl is None else ttl
+        size = sys.getsizeof(value) if size is None else size
+        if size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._pop(key) is not None
+
+    def delete_matching(self, predicate):
+        """Drop every entry for which predicate(key, value) is true."""
+        with self._lock:
+            doomed = [k for k, (_, _, v) in self._data.items() if predicate(k, v)]
+            for key in doomed:
+                self._pop(key)
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        return entry
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class RedisCache:
+    """TTLCache's interface on a Redis-compatible server.
+
+    Values must be str; keys are namespaced by `prefix`. Size limits and
+    eviction are the server's business (maxmemory / maxmemory-policy).
+    Hit/miss counters are per process. `client` replaces the connection
+    made from `url` (e.g. a fakeredis client in benchmarks); it must
+    decode responses to str.
+    """
+
+    def __init__(self, url, ttl=3600, prefix='notes:', client=None):
+        if redis is None:
+            raise RuntimeError('the redis package is not installed')
+        self.client = client or redis.Redis.from_url(url, decode_responses=True, socket_timeout=1)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self.client.get(self.prefix + key)
+        except redis.RedisError:
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None, size=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self.client.set(self.prefix + key, value, ex=ttl or None)
+        except redis.RedisError:
+            self.errors += 1
+            return False
+        return True
+
+    def delete(self, key):
+        try:
+            return bool(self.client.delete(self.prefix + key))
+        except redis.RedisError:
+            self.errors += 1
+            return False
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + '*', count=1000))
+            for offset in range(0, len(keys), 1000):
+                self.client.delete(*keys[offset:offset + 1000])
+        except redis.RedisError:
+            self.errors += 1
+
+    def incr(self, name):
+        # counters live under their own prefix so clear() keeps them
+        return self.client.incr(self.prefix.rstrip(':') + '#' + name)
+
+    def counter(self, name):
+        try:
+            return int(self.client.get(self.prefix.rstrip(':') + '#' + name) or 0)
+        except redis.RedisError:
+            self.errors += 1
+            return None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        try:
+            entries = self.client.dbsize()
+        except redis.RedisError:
+            entries = None
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'errors': self.errors,
+        }
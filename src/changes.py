@@ -0,0 +1,119 @@
+"""Change feed for incremental sync.
+
+Every write to a user's notes takes the next number from that owner's
+counter (`note_change_counters`, owner 0 for the shared notes) and stamps
+it on the note's `change_seq`, or on a tombstone when the note is deleted.
+`GET /api/notes/changes?since=<seq>` then returns only what changed after
+the client's last sync: two range scans on (user_id, change_seq).
+
+The counter is bumped with an upsert that keeps its row locked until the
+write commits, so an owner's changes commit in sequence order (on
+Postgres as on SQLite) and a reader that has seen n+1 has also seen n.
+The owner's latest number also serves as the list ETag validator.
+"""
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only
+
+from src.models.note import Note, NoteChangeCounter, NoteTombstone
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def _owner_key(user_id):
+    return 0 if user_id is None else user_id
+
+
+def _bump(conn_or_session, dialect, owner, count):
+    table = NoteChangeCounter.__table__
+    upsert = pg_insert if dialect == 'postgresql' else sqlite_insert
+    stmt = upsert(table).values(owner=owner, seq=count)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.owner], set_={'seq': table.c.seq + count})
+    return conn_or_session.execute(stmt.returning(table.c.seq)).scalar_one()
+
+
+def next_seq(session, user_id, count=1):
+    """Reserve `count` consecutive sequence numbers for `user_id`'s notes
+    and return the first. Holds the counter row until the transaction
+    ends, so call it as late as possible before committing."""
+    last = _bump(session, session.get_bind().dialect.name, _owner_key(user_id), count)
+    return last - count + 1
+
+
+def stamp(session, note):
+    """Give `note` the owner's next sequence number. Does not commit."""
+    note.change_seq = next_seq(session, note.user_id)
+
+
+def record_delete(session, note):
+    """Write the tombstone for `note`, which is about to be deleted."""
+    record_deletes(session, note.user_id, [note.id])
+
+
+def record_deletes(session, user_id, note_ids):
+    """Tombstones for `user_id`'s `note_ids`, in that order, with one
+    counter bump for all of them."""
+    if not note_ids:
+        return
+    first = next_seq(session, user_id, len(note_ids))
+    session.execute(insert(NoteTombstone.__table__), [
+        {'note_id': note_id, 'user_id': user_id, 'change_seq': first + offset}
+        for offset, note_id in enumerate(note_ids)])
+
+
+def latest_seq(session, user_id):
+    """The owner's most recent sequence number (0 before any write)."""
+    table = NoteChangeCounter.__table__
+    return session.execute(
+        select(table.c.seq).where(table.c.owner == _owner_key(user_id))).scalar() or 0
+
+
+def changes_since(session, user_id, since, limit, columns=None):
+    """Notes and deleted ids changed after `since`, in sequence order.
+
+    Returns (notes, deleted_ids, cursor, has_more): at most `limit` changes,
+    `cursor` being the last one's sequence number (or `since`). `columns`
+    restricts which Note columns are loaded.
+    """
+    query = session.query(Note).filter(Note.owned_by(user_id), Note.change_seq > since)
+    if columns is not None:
+        query = query.options(load_only(*(getattr(Note, c) for c in {'id', 'change_seq'} | set(columns))))
+    notes = query.order_by(Note.change_seq).limit(limit + 1).all()
+    tombstones = session.execute(
+        select(NoteTombstone.note_id, NoteTombstone.change_seq)
+        .where(NoteTombstone.owned_by(user_id), NoteTombstone.change_seq > since)
+        .order_by(NoteTombstone.change_seq).limit(limit + 1)).all()
+
+    merged = sorted([(n.change_seq, n) for n in notes] + [(t.change_seq, t.note_id) for t in tombstones],
+                    key=lambda change: change[0])
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+    cursor = merged[-1][0] if merged else since
+    return ([c for _, c in merged if isinstance(c, Note)],
+            [c for _, c in merged if not isinstance(c, Note)],
+            cursor, has_more)
+
+
+def backfill(conn):
+    """Number every existing note per owner, oldest update first, and set
+    the counters to match (migration 9)."""
+    note = Note.__table__
+    last = {}
+    pending = []
+    # updated_at is pinned, or its onupdate default would stamp every row
+    stmt = (update(note).where(note.c.id == bindparam('b_id'))
+            .values(change_seq=bindparam('b_seq'), updated_at=note.c.updated_at))
+    rows = conn.execute(select(note.c.id, note.c.user_id).order_by(note.c.updated_at, note.c.id)).all()
+    for note_id, user_id in rows:
+        owner = _owner_key(user_id)
+        last[owner] = last.get(owner, 0) + 1
+        pending.append({'b_id': note_id, 'b_seq': last[owner]})
+        if len(pending) >= BACKFILL_CHUNK_SIZE:
+            conn.execute(stmt, pending)
+            pending = []
+    if pending:
+        conn.execute(stmt, pending)
+    for owner, seq in last.items():
+        _bump(conn, conn.dialect.name, owner, seq)
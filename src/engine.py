@@ -0,0 +1,110 @@
+"""Engine profile: connection pool options and per-connection settings.
+
+DB_PROFILE=tuned (default) applies the settings below; DB_PROFILE=default
+leaves SQLAlchemy's defaults (used as the baseline in
+benchmarks/bench_concurrent_writes.py).
+
+SQLite, on every new connection:
+  journal_mode=WAL      readers no longer block the writer (and vice versa)
+  synchronous=NORMAL    fsync at checkpoints only; safe with WAL
+  busy_timeout          wait for the write lock instead of "database is locked"
+  cache_size, mmap_size page cache and memory-mapped reads
+SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_KB and SQLITE_MMAP_MB override them.
+
+Postgres: bounded pool with pre-ping and recycling (pgbouncer/Supabase
+drop idle server connections) and a server-side statement timeout.
+DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT and
+DB_STATEMENT_TIMEOUT_MS (0 disables; set 0 behind a pgbouncer that rejects
+the `options` startup parameter) override them.
+
+With either profile, JSON columns (Note.tags) are parsed with orjson when
+the optional package is installed.
+"""
+
+import os
+
+from sqlalchemy import event
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+DB_PROFILE = os.getenv('DB_PROFILE', 'tuned')
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_KB = int(os.getenv('SQLITE_CACHE_KB', str(64 * 1024)))
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', '256'))
+
+# Serverless instances each hold their own pool, so keep it small there.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '2' if os.environ.get('VERCEL') else '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '300'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+DB_CONNECT_TIMEOUT = 5
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for `uri` under the active profile."""
+    options = _profile_options(uri)
+    if orjson is not None:
+        # every listed note parses its tags; the stdlib decoder was ~40% of
+        # building a 10k-note list (benchmarks/bench_serialization.py)
+        options['json_deserializer'] = orjson.loads
+    return options
+
+
+def _profile_options(uri):
+    if uri.startswith('sqlite'):
+        if DB_PROFILE != 'tuned':
+            return {}
+        # pysqlite's own lock wait, matching busy_timeout
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+
+    # Always keep the short connect timeout so an unreachable host fails fast.
+    options = {'connect_args': {'connect_timeout': DB_CONNECT_TIMEOUT}}
+    if DB_PROFILE != 'tuned':
+        return options
+    if DB_STATEMENT_TIMEOUT_MS:
+        options['connect_args']['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_KB}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine):
+    """Install per-connection settings on `engine` (call before first use)."""
+    if DB_PROFILE == 'tuned' and engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return engine
+
+
+def describe(engine):
+    """Effective settings, for logs and benchmarks."""
+    info = {'profile': DB_PROFILE, 'dialect': engine.dialect.name, 'pool': type(engine.pool).__name__}
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size'):
+                info[pragma] = conn.exec_driver_sql(f'PRAGMA {pragma}').scalar()
+    else:
+        info['pool_size'] = engine.pool.size() if hasattr(engine.pool, 'size') else None
+    return info
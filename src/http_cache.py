@@ -0,0 +1,107 @@
+"""HTTP-level caching: validators for conditional GETs and compression.
+
+  - `note_etag(note)` / `list_etag(...)` build weak ETags; routes answer
+    304 Not Modified via `not_modified()` when If-None-Match matches.
+  - `init_compression(app)` gzips (or, when the optional `brotli` package
+    is installed, brotli-compresses) text and JSON responses of at least
+    COMPRESS_MIN_BYTES for clients that accept it. Streamed responses are
+    left alone so they keep flushing incrementally.
+
+The ETags are weak because the same entity is served in different
+encodings. Set HTTP_COMPRESSION=0 to disable compression.
+"""
+
+import gzip
+import hashlib
+import os
+from datetime import datetime
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSION = os.getenv('HTTP_COMPRESSION', '1') not in ('0', 'false', 'False')
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+COMPRESSIBLE_TYPES = ('application/json', 'application/msgpack', 'text/', 'application/javascript', 'image/svg+xml')
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _stamp(dt):
+    """Microseconds since the epoch of a naive UTC datetime, or 0."""
+    return int((dt - _EPOCH).total_seconds() * 1_000_000) if dt else 0
+
+
+def note_etag_value(note_id, version, updated_at):
+    """`<id>-<version>-<updated_at>`: version moves on edits, updated_at also
+    on position changes (reorder/move), which don't bump the version. The
+    leading `<id>-<version>` is what If-Match on PUT/PATCH compares."""
+    return f'{note_id}-{version}-{_stamp(updated_at)}'
+
+
+def note_etag(note):
+    return note_etag_value(note.id, note.version, note.updated_at)
+
+
+def list_etag(seq, owner=None, variant=''):
+    """Validator for a note listing: `seq` is the owner's latest change
+    sequence number (src/changes.py), which every insert, update, move and
+    delete advances. `variant` folds in the query string, since each
+    page/projection is its own representation."""
+    raw = f'{owner}:{seq}:{variant}'
+    return 'notes-' + hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def not_modified(etag):
+    """True when the request's If-None-Match matches `etag` (weak compare)."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def _choose_encoding(accept_encoding):
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    if not COMPRESSION or response.status_code < 200 or response.status_code >= 300:
+        return response
+    if response.status_code == 204 or 'Content-Encoding' in response.headers:
+        return response
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return response
+    if response.is_streamed and not response.direct_passthrough:
+        # generators (NDJSON export, SSE): compressing would buffer them
+        return response
+    encoding = _choose_encoding(request.headers.get('Accept-Encoding', ''))
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    # send_file() responses wrap the file; read it so it can be compressed
+    response.direct_passthrough = False
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    if encoding == 'br':
+        body = brotli.compress(body, quality=min(COMPRESS_LEVEL, 11))
+    else:
+        body = gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # a strong ETag (send_file) names the uncompressed bytes
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
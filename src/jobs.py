@@ -0,0 +1,229 @@
+"""In-process background jobs for slow (LLM) work.
+
+Endpoints enqueue a job and return 202 with its id; a small pool of worker
+threads runs it inside an app context and records state, result and error
+in the `jobs` table, which clients poll via GET /api/jobs/<id>. Because the
+state lives in the database, any process can answer the poll.
+
+The queue is bounded: when JOB_QUEUE_SIZE jobs are already waiting,
+enqueue() raises QueueFullError and the endpoint answers 429. Workers are
+started on the first enqueue, so importing the app (CLI, Vercel cold start)
+spawns no threads. Serverless platforms freeze the process between
+requests, so there the synchronous or streaming endpoints are the better
+fit. The queue itself is per process, so at boot jobs an earlier process
+left queued or running are marked failed (fail_orphans) rather than
+polled forever. Configure with JOB_WORKERS, JOB_QUEUE_SIZE and JOB_RETENTION (seconds
+finished jobs are kept).
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.models.job import Job, db
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '50'))
+JOB_RETENTION = int(os.getenv('JOB_RETENTION', str(24 * 3600)))
+PRUNE_INTERVAL = 600
+ORPHAN_ERROR = 'Job was interrupted by a restart; please retry'
+
+_handlers = {}
+
+
+class QueueFullError(Exception):
+    """Raised by enqueue() when the backlog is at JOB_QUEUE_SIZE."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Job queue is full; retry in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+class JobFailed(Exception):
+    """Raised by a handler to record a specific error body and HTTP status."""
+
+    def __init__(self, body, status=500):
+        super().__init__(body.get('error') if isinstance(body, dict) else str(body))
+        self.body = body
+        self.status = status
+
+
+def handler(kind):
+    """Register `fn(payload) -> result` as the runner for jobs of `kind`."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+class JobQueue:
+    def __init__(self, app, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE):
+        self.app = app
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._avg_seconds = None  # moving average of job run time
+        self._last_prune = 0.0
+        self._booted = datetime.utcnow()
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def retry_after(self):
+        """Rough seconds until a queue slot frees up."""
+        avg = self._avg_seconds or 5.0
+        return max(1.0, avg * (self._queue.qsize() + 1) / max(1, self.workers))
+
+    def enqueue(self, kind, payload, user_id=None):
+        """Record `user_id`'s queued job and hand it to the workers; returns
+        the Job."""
+        if kind not in _handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        if self._queue.full():
+            self._reject()
+
+        job = Job(id=uuid.uuid4().hex, kind=kind, state='queued', payload=payload, user_id=user_id)
+        db.session.add(job)
+        db.session.commit()
+        try:
+            self._queue.put_nowait(job.id)
+        except queue.Full:
+            # lost the race for the last slot
+            db.session.delete(job)
+            db.session.commit()
+            self._reject()
+        self._ensure_workers()
+        return job
+
+    def _reject(self):
+        with self._lock:
+            self._rejected += 1
+        raise QueueFullError(self.retry_after())
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                self._running += 1
+            try:
+                with self.app.app_context():
+                    self._run(job_id)
+                    self._prune()
+            except Exception as e:
+                print(f'WARNING: job {job_id} could not be recorded: {e}')
+            finally:
+                with self._lock:
+                    self._running -= 1
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return
+        job.state = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        started = time.monotonic()
+        try:
+            result = _handlers[job.kind](job.payload or {})
+            error = None
+        except JobFailed as e:
+            result, error = None, e
+        except Exception as e:
+            result, error = None, JobFailed({'error': str(e)}, 500)
+        elapsed = time.monotonic() - started
+
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        if error is None:
+            job.state = 'succeeded'
+            job.result = result
+        else:
+            job.state = 'failed'
+            job.error = error.body
+            job.error_status = error.status
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+        with self._lock:
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._avg_seconds = elapsed if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def _prune(self):
+        """Delete finished jobs older than JOB_RETENTION, at most every PRUNE_INTERVAL."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune < PRUNE_INTERVAL:
+                return
+            self._last_prune = now
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_RETENTION)
+        Job.query.filter(Job.state.in_(('succeeded', 'failed')), Job.finished_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+
+    def fail_orphans(self):
+        """Mark failed the jobs still queued or running from before this
+        process started: their queue died with the old process, so nothing
+        will run or finish them. Gunicorn workers boot together; a worker
+        recycled later also fails its siblings' older unfinished jobs."""
+        now = datetime.utcnow()
+        orphaned = Job.query.filter(Job.state.in_(('queued', 'running')), Job.created_at < self._booted).update({
+            'state': 'failed',
+            'error': {'error': ORPHAN_ERROR},
+            'error_status': 503,
+            'finished_at': now,
+        }, synchronize_session=False)
+        db.session.commit()
+        if orphaned:
+            print(f'WARNING: marked {orphaned} job(s) interrupted by a restart as failed')
+        return orphaned
+
+    def join(self):
+        """Block until every queued job has finished (used by scripts)."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'started': bool(self._threads),
+                'queued': self._queue.qsize(),
+                'max_queued': self._queue.maxsize,
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_seconds': round(self._avg_seconds, 3) if self._avg_seconds is not None else None,
+            }
+
+
+def init_jobs(app):
+    app.extensions['jobs'] = JobQueue(app)
+    return app.extensions['jobs']
+
+
+def get_job_queue():
+    return current_app.extensions['jobs']
+
+
+def enqueue(kind, payload, user_id=None):
+    return get_job_queue().enqueue(kind, payload, user_id)
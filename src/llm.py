@@ -7,8 +7,14 @@ not attempt a real API call.
 """
 
 import os
+import re
+import sys
 import json
+import random
+import threading
+import time
 import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from dotenv import load_dotenv
 
 # Load .env from project root (one level up from src/)
@@ -16,108 +22,483 @@ _here = os.path.abspath(os.path.dirname(__file__))
 _project_root = os.path.abspath(os.path.join(_here, '..'))
 load_dotenv(os.path.join(_project_root, '.env'))
 
+if _project_root not in sys.path:
+  # allow running as `python src/llm.py` as well as importing src.llm
+  sys.path.insert(0, _project_root)
+
+from src import metrics, translation_cache
+
 # Configuration
 OPENAI_KEY = os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_API_TOKEN')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 BASE_URL = os.getenv('BASE_URL')  # optional custom endpoint
 DEFAULT_MODEL = os.getenv('MODEL', 'gpt-4.1-mini')
 MOCK_TRANSLATION = os.getenv('MOCK_TRANSLATION', '0') in ('1', 'true', 'True')
+# Long notes are split into chunks of roughly this many characters and the
+# chunks are translated concurrently by up to TRANSLATE_CONCURRENCY threads.
+TRANSLATE_CHUNK_CHARS = int(os.getenv('TRANSLATE_CHUNK_CHARS', '3000'))
+TRANSLATE_CONCURRENCY = int(os.getenv('TRANSLATE_CONCURRENCY', '4'))
+# Batch translation packs short notes into one request up to these limits
+TRANSLATE_BATCH_CHARS = int(os.getenv('TRANSLATE_BATCH_CHARS', '6000'))
+TRANSLATE_BATCH_ITEMS = int(os.getenv('TRANSLATE_BATCH_ITEMS', '20'))
+# Per-attempt timeout, connection pool size and retry/backoff behaviour
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '15'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.25'))
+LLM_BACKOFF_CAP = float(os.getenv('LLM_BACKOFF_CAP', '2.0'))
+LLM_RETRY_BUDGET = float(os.getenv('LLM_RETRY_BUDGET', '2.0'))  # max seconds slept per call
+# Circuit breaker: open after this many consecutive failures, retry after N seconds
+LLM_CIRCUIT_THRESHOLD = int(os.getenv('LLM_CIRCUIT_THRESHOLD', '5'))
+LLM_CIRCUIT_RESET = float(os.getenv('LLM_CIRCUIT_RESET', '30'))
 
 
-def _make_client():
-  """Create and return an OpenAI client and model name.
+class CircuitOpenError(Exception):
+  """Raised without calling the model while the circuit breaker is open."""
+
+  def __init__(self, retry_after):
+    super().__init__(f'LLM endpoint unavailable (circuit open); retry in {retry_after:.0f}s')
+    self.retry_after = retry_after
+
 
-  Raises RuntimeError if no suitable API key is configured.
+class CircuitBreaker:
+  """Fail fast after repeated LLM failures instead of tying up workers.
+
+  After `threshold` consecutive failed attempts the circuit opens and calls
+  raise CircuitOpenError immediately. Once `reset_after` seconds have
+  passed, one trial call is let through (half-open): success closes the
+  circuit, failure re-opens it for another period.
   """
+
+  def __init__(self, threshold=5, reset_after=30.0):
+    self.threshold = threshold
+    self.reset_after = reset_after
+    self._lock = threading.Lock()
+    self._failures = 0
+    self._opened_at = None
+    self._trial_in_flight = False
+
+  @property
+  def state(self):
+    with self._lock:
+      if self._opened_at is None:
+        return 'closed'
+      if time.monotonic() - self._opened_at >= self.reset_after:
+        return 'half-open'
+      return 'open'
+
+  def before_call(self):
+    with self._lock:
+      if self._opened_at is None:
+        return
+      waited = time.monotonic() - self._opened_at
+      if waited >= self.reset_after and not self._trial_in_flight:
+        self._trial_in_flight = True
+        return
+      raise CircuitOpenError(max(0.0, self.reset_after - waited))
+
+  def record_success(self):
+    with self._lock:
+      self._failures = 0
+      self._opened_at = None
+      self._trial_in_flight = False
+
+  def record_failure(self):
+    with self._lock:
+      self._failures += 1
+      if self._trial_in_flight or self._failures >= self.threshold:
+        self._opened_at = time.monotonic()
+      self._trial_in_flight = False
+
+
+_breaker = CircuitBreaker(threshold=LLM_CIRCUIT_THRESHOLD, reset_after=LLM_CIRCUIT_RESET)
+_client_lock = threading.Lock()
+_client = None
+
+
+def _http_client():
+  """Shared keep-alive connection pool for the OpenAI client, if httpx is available."""
+  try:
+    import httpx
+    from openai import DefaultHttpxClient
+  except Exception:
+    return None  # fall back to the SDK's own default pool
+  return DefaultHttpxClient(limits=httpx.Limits(
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+    keepalive_expiry=60.0,
+  ))
+
+
+def _build_client():
   try:
     from openai import OpenAI
   except Exception as e:
     raise RuntimeError(f'openai package not available: {e}')
 
+  # Retries are done by call_llm_model (with jitter and the circuit
+  # breaker), so the SDK's own retry loop is disabled.
+  options = {'max_retries': 0, 'timeout': LLM_TIMEOUT}
+  http_client = _http_client()
+  if http_client is not None:
+    options['http_client'] = http_client
+
   # Prefer explicit OpenAI key from .env or environment
   key = OPENAI_KEY
   if key:
-    client = OpenAI(api_key=key)
-    return client, DEFAULT_MODEL
+    # BASE_URL may point at any OpenAI-compatible server (e.g. scripts/stub_llm_server.py)
+    if BASE_URL:
+      options['base_url'] = BASE_URL
+    return OpenAI(api_key=key, **options), DEFAULT_MODEL
 
   # Optional GitHub models gateway (less common)
   if GITHUB_TOKEN:
     endpoint = BASE_URL or 'https://models.github.ai/inference'
-    client = OpenAI(api_key=GITHUB_TOKEN, base_url=endpoint)
+    client = OpenAI(api_key=GITHUB_TOKEN, base_url=endpoint, **options)
     model = os.getenv('MODEL', 'openai/gpt-4.1-mini')
     return client, model
 
   raise RuntimeError('No API key configured. Set OPENAI_API_KEY in .env or environment')
 
 
-def call_llm_model(model_name, messages, temperature=1.0, top_p=1.0, retries=3, timeout=15):
+def _make_client():
+  """Return the process-wide OpenAI client and model name.
+
+  The client (and its keep-alive connection pool) is created on first use
+  and reused, so TLS handshakes are not repeated per call. Raises
+  RuntimeError if no suitable API key is configured.
+  """
+  global _client
+  if _client is None:
+    with _client_lock:
+      if _client is None:
+        _client = _build_client()
+  return _client
+
+
+def reset_client():
+  """Drop the shared client (e.g. after changing keys or BASE_URL)."""
+  global _client
+  with _client_lock:
+    _client = None
+
+
+def _is_retryable(exc):
+  status = getattr(exc, 'status_code', None)
+  if status is None:
+    return True  # connection errors, timeouts
+  return status in (408, 409, 429) or status >= 500
+
+
+def _backoff(attempt):
+  """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+  return random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * (2 ** (attempt - 1))))
+
+
+def _with_retries(describe, fn, retries):
+  """Run fn() with retries, jittered backoff, a sleep budget and the breaker.
+
+  Backoff sleeps on the calling thread - for the synchronous routes, the
+  request's worker - for up to LLM_RETRY_BUDGET seconds in total, which is
+  why the default budget is small. Only failures worth retrying (timeouts,
+  connection errors, 408/409/429, 5xx) count towards opening the breaker:
+  a client error such as 400 or 401 means the endpoint answered, so it
+  counts as a success there and fails just this call.
+  """
+  slept = 0.0
+  for attempt in range(1, retries + 1):
+    _breaker.before_call()
+    try:
+      result = fn()
+    except Exception as e:
+      if _is_retryable(e):
+        _breaker.record_failure()
+      else:
+        _breaker.record_success()
+      delay = _backoff(attempt)
+      if attempt >= retries or not _is_retryable(e) or slept + delay > LLM_RETRY_BUDGET:
+        raise
+      metrics.llm_retry(describe)
+      print(f"{describe} failed (attempt {attempt}/{retries}), retrying in {delay:.1f}s: {e}")
+      time.sleep(delay)
+      slept += delay
+      continue
+    _breaker.record_success()
+    return result
+
+
+def _extract_content(resp):
+  # Extract text safely
+  if hasattr(resp, 'choices') and len(resp.choices) > 0:
+    # OpenAI SDK objects: resp.choices[0].message.content
+    try:
+      return getattr(resp.choices[0].message, 'content', None) or resp.choices[0].message.content
+    except Exception:
+      # Fallback if shape differs
+      try:
+        return resp.choices[0]['message']['content']
+      except Exception:
+        return str(resp)
+
+  if isinstance(resp, dict):
+    choices = resp.get('choices') or []
+    if choices:
+      return choices[0].get('message', {}).get('content')
+
+  return str(resp)
+
+
+def call_llm_model(model_name, messages, temperature=1.0, top_p=1.0, retries=3, timeout=None):
   """Call the configured LLM and return assistant content string.
 
-  This implements a simple retry/backoff loop to be more robust for
-  intermittent network errors.
+  `timeout` (seconds, default LLM_TIMEOUT) bounds each attempt. Failed
+  attempts are retried with jittered exponential backoff while the total
+  sleep stays under LLM_RETRY_BUDGET (slept on this thread); non-retryable
+  errors (4xx other than 408/409/429) and an open circuit breaker fail
+  immediately, and only retryable failures count towards opening it.
   """
   client, _ = _make_client()
 
-  last_exc = None
-  for attempt in range(1, retries + 1):
+  def attempt():
+    started = time.perf_counter()
     try:
-      # The OpenAI Python client uses httpx under the hood and accepts a
-      # `timeout` parameter in some call signatures; the SDK also exposes
-      # client._client which is httpx.Client; keeping this simple we rely on
-      # the client's high-level call and guard with overall attempt timeout.
       resp = client.chat.completions.create(
         model=model_name,
         messages=messages,
         temperature=temperature,
         top_p=top_p,
+        timeout=timeout or LLM_TIMEOUT,
       )
+    except Exception:
+      metrics.observe_llm(model_name, 'call', time.perf_counter() - started, outcome='error')
+      raise
+    metrics.observe_llm(model_name, 'call', time.perf_counter() - started, usage=getattr(resp, 'usage', None))
+    return _extract_content(resp)
 
-      # Extract text safely
-      if hasattr(resp, 'choices') and len(resp.choices) > 0:
-        # OpenAI SDK objects: resp.choices[0].message.content
-        try:
-          return getattr(resp.choices[0].message, 'content', None) or resp.choices[0].message.content
-        except Exception:
-          # Fallback if shape differs
-          try:
-            return resp.choices[0]['message']['content']
-          except Exception:
-            return str(resp)
+  return _with_retries('LLM call', attempt, retries)
 
-      if isinstance(resp, dict):
-        choices = resp.get('choices') or []
-        if choices:
-          return choices[0].get('message', {}).get('content')
 
-      return str(resp)
+def stream_llm_model(model_name, messages, temperature=1.0, top_p=1.0, retries=3, timeout=None):
+  """Call the configured LLM with stream=True and yield content deltas.
 
-    except Exception as e:
-      last_exc = e
-      if attempt < retries:
-        backoff = 1.5 ** attempt
-        print(f"LLM call failed (attempt {attempt}/{retries}), retrying in {backoff:.1f}s: {e}")
-        import time
+  Opening the stream is retried like call_llm_model; once the first event
+  has arrived the caller may already have partial output, so later errors
+  propagate instead.
+  """
+  client, _ = _make_client()
 
-        time.sleep(backoff)
-        continue
-      # exhausted retries
+  def open_stream():
+    started = time.perf_counter()
+    try:
+      stream = client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        temperature=temperature,
+        top_p=top_p,
+        stream=True,
+        timeout=timeout or LLM_TIMEOUT,
+      )
+      events = iter(stream)
+      # pull the first event inside the retry loop so connect errors are retried
+      first = next(events, None)
+    except Exception:
+      metrics.observe_llm(model_name, 'stream', time.perf_counter() - started, outcome='error')
       raise
+    metrics.observe_llm(model_name, 'stream', time.perf_counter() - started)
+    return events, first
 
+  events, first = _with_retries('LLM stream', open_stream, retries)
+  try:
+    event = first
+    while event is not None:
+      if getattr(event, 'choices', None):
+        delta = getattr(event.choices[0].delta, 'content', None)
+        if delta:
+          yield delta
+      event = next(events, None)
+  except Exception as e:
+    if _is_retryable(e):
+      _breaker.record_failure()
+    raise
 
-def translate_text(text, target_lang):
-  """Translate `text` into `target_lang` and return the translated string.
 
-  This function will raise RuntimeError if the client is not configured, or
-  propagate other client/network exceptions to the caller.
-  """
-  prompt = (
+def circuit_state():
+  return _breaker.state
+
+
+def _translation_prompt(text, target_lang):
+  return (
     f"Translate the following text to {target_lang}. "
     "Preserve the original meaning, keep code blocks and lists formatted, "
     "and only return the translated text without extra commentary.\n\n"
     f"Original:\n{text}"
   )
 
-  messages = [{"role": "user", "content": prompt}]
+
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?\u3002\uff01\uff1f])\s+')
+
+
+def _split_blocks(text):
+  """Split text into paragraphs/fenced code blocks.
+
+  Returns (blocks, separators) where separators[i] is the exact whitespace
+  between blocks[i] and blocks[i + 1]. Blank lines inside a code fence do
+  not end the block.
+  """
+  blocks, separators = [], []
+  current, blank_run, in_fence = [], [], False
+  for line in text.splitlines(keepends=True):
+    if _FENCE_RE.match(line):
+      in_fence = not in_fence
+    if not in_fence and not line.strip():
+      blank_run.append(line)
+      continue
+    if blank_run:
+      if current:
+        blocks.append(''.join(current))
+        separators.append(''.join(blank_run))
+        current = []
+      else:
+        current.append(''.join(blank_run))  # leading blank lines
+      blank_run = []
+    current.append(line)
+  if current:
+    blocks.append(''.join(current))
+  if blank_run:
+    if blocks:
+      blocks[-1] += ''.join(blank_run)
+    else:
+      blocks.append(''.join(blank_run))
+  return blocks, separators
+
+
+def _split_long_block(block, max_chars):
+  """Split an oversized prose block on line, then sentence boundaries."""
+  pieces = []
+  for line in block.splitlines(keepends=True):
+    start = 0
+    if len(line) > max_chars:
+      for m in _SENTENCE_END_RE.finditer(line):
+        pieces.append(line[start:m.end()])
+        start = m.end()
+    pieces.append(line[start:])
+  # hard-cut anything still too long, then re-pack into ~max_chars chunks
+  chunks, buf = [], ''
+  for piece in pieces:
+    while len(buf) + len(piece) > max_chars and len(piece) > max_chars:
+      take = max_chars - len(buf)
+      chunks.append(buf + piece[:take])
+      buf, piece = '', piece[take:]
+    if buf and len(buf) + len(piece) > max_chars:
+      chunks.append(buf)
+      buf = ''
+    buf += piece
+  if buf:
+    chunks.append(buf)
+  return chunks
+
+
+def split_into_chunks(text, max_chars=None):
+  """Split `text` into translation chunks of at most ~max_chars characters.
+
+  Chunks break on paragraph boundaries and never inside a fenced code block
+  (an oversized code block becomes its own chunk). Returns (chunks, joins):
+  ''.join(c + j for c, j in zip(chunks, joins)) == text.
+  """
+  max_chars = max_chars or TRANSLATE_CHUNK_CHARS
+  if len(text) <= max_chars:
+    return [text], ['']
+  blocks, separators = _split_blocks(text)
+  separators = separators + ['']
+
+  chunks, joins = [], []
+  buf, buf_sep = '', ''
+  for block, sep in zip(blocks, separators):
+    if len(block) > max_chars and not _FENCE_RE.match(block.lstrip('\n')):
+      parts = _split_long_block(block, max_chars)
+    else:
+      parts = [block]
+    for i, part in enumerate(parts):
+      part_sep = sep if i == len(parts) - 1 else ''
+      if buf and len(buf) + len(buf_sep) + len(part) > max_chars:
+        chunks.append(buf)
+        joins.append(buf_sep)
+        buf, buf_sep = part, part_sep
+      elif buf:
+        buf += buf_sep + part
+        buf_sep = part_sep
+      else:
+        buf, buf_sep = part, part_sep
+  if buf or not chunks:
+    chunks.append(buf)
+    joins.append(buf_sep)
+  return chunks, joins
+
+
+def _translate_chunks(model, chunks, target_lang, concurrency=None):
+  """Translate chunks concurrently, consulting the cache for each one.
+
+  Cache reads and writes happen on the calling thread (the database tier
+  needs the Flask app context); worker threads only talk to the model. Each
+  chunk is retried on its own by call_llm_model, and finished chunks are
+  cached even if another chunk fails, so a retry of the whole note only
+  re-translates what failed.
+  """
+  results = [None] * len(chunks)
+  pending = {}
+  for idx, chunk in enumerate(chunks):
+    if not chunk.strip():
+      results[idx] = chunk  # whitespace-only: nothing to translate
+      continue
+    prompt = _translation_prompt(chunk, target_lang)
+    key = translation_cache.cache_key(model, target_lang, prompt)
+    cached = translation_cache.get(key)
+    if cached is not None:
+      results[idx] = cached
+    else:
+      pending[idx] = (key, prompt)
+
+  if not pending:
+    return results
+
+  def work(prompt):
+    messages = [{"role": "user", "content": prompt}]
+    return call_llm_model(model, messages, temperature=0, top_p=1.0)
+
+  if len(pending) == 1:
+    (idx, (key, prompt)), = pending.items()
+    outputs, first_error = {idx: work(prompt)}, None
+  else:
+    workers = max(1, min(concurrency or TRANSLATE_CONCURRENCY, len(pending)))
+    outputs, first_error = {}, None
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translate') as pool:
+      futures = {pool.submit(work, prompt): idx for idx, (key, prompt) in pending.items()}
+      for future in as_completed(futures):
+        try:
+          outputs[futures[future]] = future.result()
+        except Exception as e:
+          first_error = first_error or e
+
+  for idx, translated in outputs.items():
+    if translated:
+      key, _ = pending[idx]
+      translation_cache.put(key, translated, source_text=chunks[idx], model=model, target_lang=target_lang)
+    results[idx] = translated
+  if first_error is not None:
+    raise first_error
+  return results
+
+
+def translate_text(text, target_lang):
+  """Translate `text` into `target_lang` and return the translated string.
+
+  Long text is split into chunks (see split_into_chunks) that are translated
+  concurrently and reassembled in order. Results are cached per chunk (see
+  src/translation_cache.py).
+
+  This function will raise RuntimeError if the client is not configured, or
+  propagate other client/network exceptions to the caller.
+  """
   # If no API key is configured we allow an optional mock translation for
   # local development when MOCK_TRANSLATION=1. Otherwise propagate the
   # RuntimeError to the caller so the route can return an informative error.
@@ -129,7 +510,231 @@ def translate_text(text, target_lang):
       return _mock_translate(text, target_lang)
     raise
 
-  return call_llm_model(model, messages, temperature=0, top_p=1.0)
+  chunks, joins = split_into_chunks(text)
+  translated = _translate_chunks(model, chunks, target_lang)
+  if any(t is None for t in translated):
+    return None
+  if len(chunks) == 1:
+    return translated[0]
+  # Model output drops surrounding whitespace; restore the source's.
+  out = []
+  for chunk, result, join in zip(chunks, translated, joins):
+    lead, body, trail = _split_edges(chunk)
+    out.append(lead + result.strip() + trail + join if body else chunk + join)
+  return ''.join(out)
+
+
+def _split_edges(chunk):
+  """Return (leading whitespace, body, trailing whitespace) of a chunk."""
+  body = chunk.strip()
+  if not body:
+    return chunk, '', ''
+  start = chunk.index(body[0])
+  return chunk[:start], body, chunk[start + len(body):]
+
+
+def translate_text_stream(text, target_lang):
+  """Like translate_text, but yield the translation incrementally.
+
+  The first chunk that is not cached is streamed token by token, so the
+  caller gets output after one model round trip; the remaining chunks are
+  translated concurrently in the background and yielded in order as they
+  complete. Cached chunks are yielded immediately.
+  """
+  try:
+    client, model = _make_client()
+  except RuntimeError:
+    if MOCK_TRANSLATION:
+      yield _mock_translate(text, target_lang)
+      return
+    raise
+
+  chunks, joins = split_into_chunks(text)
+  keys, cached = [], []
+  for chunk in chunks:
+    prompt = _translation_prompt(chunk, target_lang)
+    key = translation_cache.cache_key(model, target_lang, prompt)
+    keys.append((key, prompt))
+    cached.append(translation_cache.get(key) if chunk.strip() else chunk)
+  pending = [idx for idx, value in enumerate(cached) if value is None]
+
+  def work(prompt):
+    messages = [{"role": "user", "content": prompt}]
+    return call_llm_model(model, messages, temperature=0, top_p=1.0)
+
+  pool, futures = None, {}
+  background = pending[1:]
+  if background:
+    workers = max(1, min(TRANSLATE_CONCURRENCY - 1, len(background)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translate')
+    futures = {idx: pool.submit(work, keys[idx][1]) for idx in background}
+
+  try:
+    for idx, chunk in enumerate(chunks):
+      lead, _, trail = _split_edges(chunk)
+      if cached[idx] is not None:
+        if len(chunks) == 1:
+          yield cached[idx]
+        elif chunk.strip():
+          yield lead + cached[idx].strip() + trail + joins[idx]
+        else:
+          yield chunk + joins[idx]
+        continue
+
+      if len(chunks) > 1 and lead:
+        yield lead
+      if idx in futures:
+        translated = futures.pop(idx).result()
+        if not translated:
+          raise ValueError('No translation received from model')
+        yield translated.strip() if len(chunks) > 1 else translated
+      else:
+        parts = []
+        messages = [{"role": "user", "content": keys[idx][1]}]
+        for delta in stream_llm_model(model, messages, temperature=0, top_p=1.0):
+          if not parts and len(chunks) > 1:
+            delta = delta.lstrip()
+            if not delta:
+              continue
+          parts.append(delta)
+          yield delta
+        translated = ''.join(parts)
+        if not translated:
+          raise ValueError('No translation received from model')
+      translation_cache.put(keys[idx][0], translated, source_text=chunk, model=model, target_lang=target_lang)
+      if len(chunks) > 1 and (trail or joins[idx]):
+        yield trail + joins[idx]
+  finally:
+    if pool is not None:
+      pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _batch_prompt(texts, target_lang):
+  return (
+    f"Translate each value of the following JSON object to {target_lang}. "
+    "Preserve the original meaning and formatting of each value (code blocks, lists, line breaks). "
+    "Reply with only a JSON object that has exactly the same keys and the translated "
+    "strings as values, without extra commentary.\n\n"
+    f"{json.dumps(texts, ensure_ascii=False)}"
+  )
+
+
+def _parse_batch_reply(reply):
+  """Parse the model's JSON object reply, tolerating ```json fences."""
+  text = (reply or '').strip()
+  if text.startswith('```'):
+    text = text.split('\n', 1)[-1]
+    text = text.rsplit('```', 1)[0]
+  try:
+    data = json.loads(text)
+  except ValueError:
+    return {}
+  if not isinstance(data, dict):
+    return {}
+  return {str(k): v for k, v in data.items() if isinstance(v, str) and v}
+
+
+def _pack_batches(items, char_budget, max_items):
+  """Greedily pack (item_id, text, key) tuples into groups under char_budget."""
+  groups, current, size = [], [], 0
+  for item in items:
+    length = len(item[1])
+    if current and (size + length > char_budget or len(current) >= max_items):
+      groups.append(current)
+      current, size = [], 0
+    current.append(item)
+    size += length
+  if current:
+    groups.append(current)
+  return groups
+
+
+def _translate_group(model, group, target_lang):
+  """Translate one packed group; returns {str(item_id): translation}.
+
+  Single-item groups use the normal prompt (no JSON wrapping). For packed
+  groups, ids missing from the reply are simply absent from the result.
+  """
+  if len(group) == 1:
+    item_id, text, _ = group[0]
+    messages = [{"role": "user", "content": _translation_prompt(text, target_lang)}]
+    translated = call_llm_model(model, messages, temperature=0, top_p=1.0)
+    return {str(item_id): translated} if translated else {}
+  texts = {str(item_id): text for item_id, text, _ in group}
+  messages = [{"role": "user", "content": _batch_prompt(texts, target_lang)}]
+  return _parse_batch_reply(call_llm_model(model, messages, temperature=0, top_p=1.0))
+
+
+def iter_translate_batch(items, target_lang):
+  """Translate many texts, yielding (item_id, translated, error) as each finishes.
+
+  `items` is a list of (item_id, text). Cached texts are yielded first.
+  Short uncached texts are packed several to a request (up to
+  TRANSLATE_BATCH_CHARS characters / TRANSLATE_BATCH_ITEMS items) and the
+  requests run concurrently; anything the model leaves out of a packed
+  reply is retried on its own. Texts longer than TRANSLATE_BATCH_CHARS go
+  through translate_text (chunked). Each result is cached under the same key
+  a single-note translation would use, so later per-note requests hit the
+  cache.
+  """
+  try:
+    client, model = _make_client()
+  except RuntimeError:
+    if MOCK_TRANSLATION:
+      for item_id, text in items:
+        yield item_id, _mock_translate(text, target_lang), None
+      return
+    raise
+
+  short, long_items = [], []
+  for item_id, text in items:
+    if not text.strip():
+      yield item_id, text, None
+    elif len(text) > TRANSLATE_BATCH_CHARS:
+      long_items.append((item_id, text))
+    else:
+      key = translation_cache.cache_key(model, target_lang, _translation_prompt(text, target_lang))
+      cached = translation_cache.get(key)
+      if cached is not None:
+        yield item_id, cached, None
+      else:
+        short.append((item_id, text, key))
+
+  groups = _pack_batches(short, TRANSLATE_BATCH_CHARS, TRANSLATE_BATCH_ITEMS)
+  if groups:
+    workers = max(1, min(TRANSLATE_CONCURRENCY, len(groups)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translate-batch') as pool:
+      pending = {pool.submit(_translate_group, model, group, target_lang): group for group in groups}
+      while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          group = pending.pop(future)
+          try:
+            out, error = future.result(), None
+          except Exception as e:
+            out, error = {}, e
+          for item in group:
+            item_id, text, key = item
+            translated = out.get(str(item_id))
+            if translated:
+              translation_cache.put(key, translated, source_text=text, model=model, target_lang=target_lang)
+              yield item_id, translated, None
+            elif len(group) > 1 and error is None:
+              # left out of the packed reply: retry this one on its own
+              pending[pool.submit(_translate_group, model, [item], target_lang)] = [item]
+            else:
+              yield item_id, None, error or ValueError('No translation received from model')
+
+  for item_id, text in long_items:
+    try:
+      translated = translate_text(text, target_lang)
+    except Exception as e:
+      yield item_id, None, e
+      continue
+    if translated:
+      yield item_id, translated, None
+    else:
+      yield item_id, None, ValueError('No translation received from model')
 
 
 def _mock_translate(text, target_lang):
@@ -153,8 +758,6 @@ def _mock_translate(text, target_lang):
 
 
 if __name__ == '__main__':
-  import sys
-
   print('llm.py smoke test')
   print('Loaded .env from:', os.path.join(_project_root, '.env'))
   print('OPENAI_KEY set:', bool(OPENAI_KEY))
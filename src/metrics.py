@@ -0,0 +1,351 @@
+"""Request, SQL and LLM instrumentation with a Prometheus `/metrics` endpoint.
+
+  init_metrics(app)          per-route latency histograms and request
+                             counters, DB queries per request, GET /metrics
+  instrument_engine(engine)  query count and duration per statement kind
+  observe_llm(...)           LLM attempt latency, tokens and retries (src/llm.py)
+  log_event(event, ...)      structured JSON log lines, written by a
+                             background thread and sampled
+
+No client library is needed: metrics are plain counters and fixed-bucket
+histograms kept in this process and rendered in the Prometheus text format.
+Each worker process reports its own numbers.
+
+Requests are logged at REQUEST_LOG_SAMPLE (default 0.1), plus every 5xx
+and every request slower than SLOW_REQUEST_MS (default 500). Set
+METRICS=0 to disable the endpoint and the request hooks.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+METRICS = os.getenv('METRICS', '1') not in ('0', 'false', 'False')
+REQUEST_LOG_SAMPLE = float(os.getenv('REQUEST_LOG_SAMPLE', '0.1'))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=HTTP_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[-2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                yield (self.name + '_bucket',
+                       _format_labels(self.labels, label_values, [('le', _format_value(float(bound)))]),
+                       cumulative)
+            yield (self.name + '_bucket', _format_labels(self.labels, label_values, [('le', '+Inf')]),
+                   series[-2])
+            yield self.name + '_count', _format_labels(self.labels, label_values), series[-2]
+            yield self.name + '_sum', _format_labels(self.labels, label_values), round(series[-1], 6)
+
+
+class Gauge:
+    """Read at scrape time from `fn()`, which returns {label values: value}.
+    Pass type='counter' for running totals kept elsewhere (cache stats)."""
+
+    def __init__(self, name, help, fn, labels=(), type='gauge'):
+        self.type = type
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception:
+            return
+        for label_values, value in sorted(values.items()):
+            if value is not None:
+                yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=HTTP_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, labels=(), type='gauge'):
+        return self.register(Gauge(name, help, fn, labels, type))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests by route, method and status.', ('method', 'route', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to build the response (streams: until the first chunk).',
+    ('method', 'route'))
+HTTP_DB_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'SQL statements executed per request.', ('method', 'route'), COUNT_BUCKETS)
+DB_QUERIES = REGISTRY.counter('db_queries_total', 'SQL statements by kind.', ('statement',))
+DB_LATENCY = REGISTRY.histogram(
+    'db_query_duration_seconds', 'SQL statement execution time.', ('statement',), SQL_BUCKETS)
+LLM_LATENCY = REGISTRY.histogram(
+    'llm_request_duration_seconds', 'LLM attempt latency (streams: until the first event).',
+    ('model', 'kind', 'outcome'), LLM_BUCKETS)
+LLM_TOKENS = REGISTRY.counter('llm_tokens_total', 'Tokens reported by the LLM endpoint.', ('model', 'type'))
+LLM_RETRIES = REGISTRY.counter('llm_retries_total', 'LLM attempts that failed and were retried.', ('kind',))
+
+
+_logger = logging.getLogger('notes.events')
+_logger.propagate = False
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _start_log_listener():
+    """Route log records through a queue so request threads never block on stdout."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        records = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(logging.Formatter('%(message)s'))
+        _listener = logging.handlers.QueueListener(records, output)
+        _logger.addHandler(logging.handlers.QueueHandler(records))
+        _logger.setLevel(logging.INFO)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def log_event(event, sample=None, **fields):
+    """Log one JSON line, kept with probability `sample` (default
+    REQUEST_LOG_SAMPLE; pass 1 to always keep it)."""
+    rate = REQUEST_LOG_SAMPLE if sample is None else sample
+    if rate < 1 and random.random() >= rate:
+        return
+    if _listener is None:
+        _start_log_listener()
+    _logger.info(json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, default=str))
+
+
+_local = threading.local()
+
+
+def _statement_kind(statement):
+    word = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ''
+    return word if word in ('select', 'insert', 'update', 'delete', 'with') else 'other'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    kind = _statement_kind(statement)
+    DB_QUERIES.inc(kind)
+    DB_LATENCY.observe(time.perf_counter() - started, kind)
+    _local.queries = getattr(_local, 'queries', 0) + 1
+
+
+def _handle_error(context):
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Count and time every statement `engine` executes."""
+    from sqlalchemy import event
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    return engine
+
+
+def observe_llm(model, kind, seconds, outcome='ok', usage=None):
+    """Record one LLM attempt; `usage` is the response's usage object, if any."""
+    LLM_LATENCY.observe(seconds, model or 'unknown', kind, outcome)
+    if usage is not None:
+        for field, label in (('prompt_tokens', 'prompt'), ('completion_tokens', 'completion')):
+            value = getattr(usage, field, None)
+            if value is None and isinstance(usage, dict):
+                value = usage.get(field)
+            if value:
+                LLM_TOKENS.inc(model or 'unknown', label, amount=value)
+
+
+def llm_retry(kind):
+    LLM_RETRIES.inc(kind)
+
+
+def _route(request):
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+
+def _before_request():
+    from flask import g
+    g.metrics_started = time.perf_counter()
+    _local.queries = 0
+
+
+def _after_request(response):
+    from flask import g, request
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = _route(request)
+    queries = getattr(_local, 'queries', 0)
+    HTTP_REQUESTS.inc(request.method, route, str(response.status_code))
+    HTTP_LATENCY.observe(elapsed, request.method, route)
+    HTTP_DB_QUERIES.observe(queries, request.method, route)
+    elapsed_ms = elapsed * 1000
+    always = response.status_code >= 500 or elapsed_ms >= SLOW_REQUEST_MS
+    log_event('request', sample=1 if always else None, method=request.method, route=route,
+              path=request.path, status=response.status_code,
+              ms=round(elapsed_ms, 2), db_queries=queries)
+    return response
+
+
+def _register_gauges(app):
+    def jobs():
+        queue = app.extensions.get('jobs')
+        if queue is None:
+            return {}
+        stats = queue.stats()
+        return {('queued',): stats['queued'], ('running',): stats['running']}
+
+    def note_cache():
+        cache = app.extensions.get('note_cache')
+        if cache is None or not cache.enabled:
+            return {}
+        stats = cache.stats()
+        from src.note_cache import KINDS
+        return {(kind, outcome): stats[kind][outcome]
+                for kind in KINDS for outcome in ('hits', 'misses')}
+
+    def translation_cache():
+        from src import translation_cache as tc
+        stats = tc.stats()
+        return {('hits',): stats['hits'], ('misses',): stats['misses']}
+
+    REGISTRY.gauge('job_queue_jobs', 'Background jobs waiting or running.', jobs, ('state',))
+    REGISTRY.gauge('note_cache_lookups_total', 'Note cache lookups by kind and outcome.',
+                   note_cache, ('kind', 'outcome'), type='counter')
+    REGISTRY.gauge('translation_cache_lookups_total', 'Translation cache lookups by outcome.',
+                   translation_cache, ('outcome',), type='counter')
+
+
+def init_metrics(app):
+    """Install the request hooks and GET /metrics."""
+    if not METRICS:
+        return None
+    from flask import Response
+    # first, so the time spent in other hooks (e.g. warmup) is included
+    app.before_request_funcs.setdefault(None, []).insert(0, _before_request)
+    app.after_request(_after_request)
+    _register_gauges(app)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    app.extensions['metrics'] = REGISTRY
+    return REGISTRY
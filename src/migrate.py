@@ -0,0 +1,257 @@
+"""Versioned schema migrations for SQLite and Postgres.
+
+Each migration is a function registered with @migration(version, name). It
+receives a Core connection inside a transaction, and must be idempotent:
+a fresh database gets every table and index from the baseline create_all,
+so later steps check before they alter. Applied versions are recorded in
+`schema_version`, and a boot with nothing to do costs one SELECT.
+
+    python -m src.migrate            # apply pending migrations
+    python -m src.migrate status     # show applied/pending versions
+
+Adding a table or column: change the model, then append a migration that
+creates it (`create_tables`, `add_column`) so existing databases follow.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+
+_version_table = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime),
+)
+
+# Postgres advisory lock key so concurrent boots migrate one at a time
+_LOCK_KEY = 7212001
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    def register(fn):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, 'migrations must be registered in order'
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+# -- helpers for migration bodies -------------------------------------------
+
+def _metadata():
+    from src.models.user import db
+    # import every model so db.metadata is complete
+    import src.models.note, src.models.translation, src.models.job  # noqa: F401
+    return db.metadata
+
+
+def create_tables(conn, *names):
+    """Create the named model tables (and their indexes) if missing."""
+    metadata = _metadata()
+    tables = [metadata.tables[n] for n in names] if names else None
+    metadata.create_all(conn, tables=tables, checkfirst=True)
+
+
+def has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, table, column, default=None):
+    """ALTER TABLE ... ADD COLUMN using the model's type for `column`."""
+    if has_column(conn, table, column):
+        return False
+    col = _metadata().tables[table].c[column]
+    ddl = f'ALTER TABLE {table} ADD COLUMN {column} {col.type.compile(dialect=conn.dialect)}'
+    if default is not None:
+        ddl += f' DEFAULT {default}'
+    conn.execute(text(ddl))
+    print(f'Applied migration: {ddl}')
+    return True
+
+
+def create_index(conn, name, table, columns):
+    # IF NOT EXISTS works on both SQLite and Postgres
+    conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+
+
+# -- migrations ---------------------------------------------------------------
+
+@migration(1, 'baseline')
+def _baseline(conn):
+    create_tables(conn)
+
+
+@migration(2, 'note_added_columns')
+def _note_added_columns(conn):
+    # Columns that ensure_note_columns used to add on SQLite only.
+    add_column(conn, 'note', 'tags')
+    add_column(conn, 'note', 'event_date')
+    add_column(conn, 'note', 'event_time')
+    add_column(conn, 'note', 'position', default=0)
+
+
+@migration(3, 'note_list_indexes')
+def _note_list_indexes(conn):
+    # get_notes orders by (position, updated_at DESC, id); LIKE search by updated_at
+    create_index(conn, 'ix_note_position_updated', 'note', ('position', 'updated_at DESC', 'id'))
+    create_index(conn, 'ix_note_updated_at', 'note', ('updated_at',))
+
+
+@migration(4, 'drop_schema_stamp')
+def _drop_schema_stamp(conn):
+    # superseded by schema_version
+    conn.execute(text('DROP TABLE IF EXISTS schema_stamp'))
+
+
+@migration(5, 'note_version')
+def _note_version(conn):
+    # optimistic concurrency for PATCH/PUT (If-Match / ETag)
+    add_column(conn, 'note', 'version', default=1)
+
+
+@migration(6, 'note_tags')
+def _note_tags(conn):
+    # tag index mirrored from note.tags (src/tags.py)
+    from src.tags import backfill
+    create_tables(conn, 'note_tags')
+    backfill(conn)
+
+
+@migration(7, 'note_event_at')
+def _note_event_at(conn):
+    # indexed timestamp for calendar range queries (src/agenda.py)
+    from src.agenda import backfill
+    add_column(conn, 'note', 'event_at')
+    create_index(conn, 'ix_note_event_at', 'note', ('event_at', 'id'))
+    backfill(conn)
+
+
+@migration(8, 'note_owner')
+def _note_owner(conn):
+    # per-user notes (src/auth.py); existing notes stay shared (user_id NULL)
+    added = add_column(conn, 'note', 'user_id')
+    add_column(conn, 'note_tags', 'user_id')
+    if added and conn.dialect.name == 'postgresql':
+        # create_all already made it on databases that started with the column
+        conn.execute(text(
+            'ALTER TABLE note ADD CONSTRAINT fk_note_user_id FOREIGN KEY (user_id) '
+            'REFERENCES "user" (id) ON DELETE CASCADE'))
+    # every note query now filters on user_id first
+    for name in ('ix_note_position_updated', 'ix_note_updated_at', 'ix_note_event_at'):
+        conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    create_index(conn, 'ix_note_user_position_updated', 'note', ('user_id', 'position', 'updated_at DESC', 'id'))
+    create_index(conn, 'ix_note_user_updated_at', 'note', ('user_id', 'updated_at'))
+    create_index(conn, 'ix_note_user_event_at', 'note', ('user_id', 'event_at', 'id'))
+    create_index(conn, 'ix_note_tags_user_tag', 'note_tags', ('user_id', 'tag', 'note_id'))
+    if conn.dialect.name == 'sqlite':
+        # init_search() recreates the FTS index with the user_id column
+        conn.execute(text('DROP TABLE IF EXISTS note_fts'))
+        for trigger in ('note_fts_ai', 'note_fts_ad', 'note_fts_au'):
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+
+
+@migration(9, 'note_changes')
+def _note_changes(conn):
+    # change feed for incremental sync (src/changes.py)
+    from src.changes import backfill
+    add_column(conn, 'note', 'change_seq')
+    create_tables(conn, 'note_tombstones', 'note_change_counters')
+    create_index(conn, 'ix_note_user_change_seq', 'note', ('user_id', 'change_seq'))
+    backfill(conn)
+
+
+@migration(10, 'note_embeddings')
+def _note_embeddings(conn):
+    # semantic search vectors (src/semantic.py); notes are embedded when
+    # their owner's index is first built, not here
+    create_tables(conn, 'note_embeddings')
+
+
+@migration(11, 'job_owner')
+def _job_owner(conn):
+    # GET /api/jobs/<id> answers only the user who queued the job; jobs
+    # queued before this are treated as the shared notes' (user_id NULL)
+    add_column(conn, 'jobs', 'user_id')
+
+
+# -- runner -------------------------------------------------------------------
+
+def current_version(conn):
+    """Highest applied version, or None when schema_version does not exist."""
+    if not inspect(conn).has_table('schema_version'):
+        return None
+    return conn.execute(select(func.max(_version_table.c.version))).scalar() or 0
+
+
+def is_current(engine):
+    """The boot-time check: one query against schema_version."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(_version_table.c.version))).scalar() == latest_version()
+    except Exception:
+        return False
+
+
+def upgrade(engine, target=None):
+    """Apply pending migrations up to `target`; returns the versions applied."""
+    target = latest_version() if target is None else target
+    applied = []
+    with engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _LOCK_KEY})
+        _version_table.create(conn, checkfirst=True)
+        current = current_version(conn) or 0
+        for version, name, fn in MIGRATIONS:
+            if version <= current or version > target:
+                continue
+            fn(conn)
+            conn.execute(_version_table.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+            print(f'INFO: Applied schema migration {version:03d} {name}')
+            applied.append(version)
+    return applied
+
+
+def status(engine):
+    with engine.connect() as conn:
+        rows = {r.version: r for r in conn.execute(select(_version_table))} if inspect(conn).has_table('schema_version') else {}
+    return [
+        {'version': v, 'name': n, 'applied_at': rows[v].applied_at.isoformat() if v in rows and rows[v].applied_at else None,
+         'state': 'applied' if v in rows else 'pending'}
+        for v, n, _ in MIGRATIONS
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.migrate', description='Apply database schema migrations.')
+    parser.add_argument('command', nargs='?', default='upgrade', choices=('upgrade', 'status'))
+    parser.add_argument('--to', type=int, default=None, help='stop at this version')
+    args = parser.parse_args(argv)
+
+    # import the app without running its own schema preparation
+    os.environ['STARTUP_MODE'] = 'lazy'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.main import app, db
+    from src.search import init_search
+
+    with app.app_context():
+        if args.command == 'status':
+            for row in status(db.engine):
+                print(f"{row['version']:03d} {row['name']:<24} {row['state']:<8} {row['applied_at'] or ''}")
+            return
+        applied = upgrade(db.engine, args.to)
+        init_search(app, db.engine)
+        with db.engine.connect() as conn:
+            print(f'Schema at version {current_version(conn)} ({len(applied)} applied)')
+
+
+if __name__ == '__main__':
+    main()
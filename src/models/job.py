@@ -0,0 +1,43 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class Job(db.Model):
+    """A unit of background work (see src/jobs.py), polled via /api/jobs/<id>."""
+    __tablename__ = 'jobs'
+
+    STATES = ('queued', 'running', 'succeeded', 'failed')
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(50), nullable=False)
+    # the user who enqueued it (src/auth.py), None for shared-notes
+    # requests; only they can poll it, since results hold note text
+    user_id = db.Column(db.Integer, nullable=True)
+    state = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    payload = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    # error body and HTTP status the synchronous endpoint would have returned
+    error = db.Column(db.JSON, nullable=True)
+    error_status = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.state}>'
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if self.state == 'succeeded':
+            data['result'] = self.result
+        elif self.state == 'failed':
+            data['error'] = self.error
+            data['error_status'] = self.error_status
+        return data
@@ -3,8 +3,15 @@ from datetime import datetime, date, time
 from src.models.user import db
 
 
+def _owner_clause(column, user_id):
+    return column.is_(None) if user_id is None else column == user_id
+
+
 class Note(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    # owning user; NULL for the shared notes of requests without a user
+    # (src/auth.py). Every route filters on it, so it leads every index.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -15,23 +22,133 @@ class Note(db.Model):
     # event date and time (stored as strings for simplicity)
     event_date = db.Column(db.String(10), nullable=True)  # YYYY-MM-DD
     event_time = db.Column(db.String(8), nullable=True)   # HH:MM:SS
+    # event_date + event_time as one indexed timestamp for range queries
+    # (src/agenda.py); NULL when the note has no event
+    event_at = db.Column(db.DateTime, nullable=True)
     # position for manual ordering (lower = earlier in list)
     position = db.Column(db.Integer, nullable=True, default=0)
-    
+    # bumped by every ORM update; UPDATEs are conditional on it (optimistic
+    # concurrency), and it is the note's ETag
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # position in the owner's change feed (src/changes.py), stamped by every
+    # write including reorders and moves
+    change_seq = db.Column(db.Integer, nullable=True)
+
+    __mapper_args__ = {'version_id_col': version}
+
+    # Fields a client may ask for with ?fields=...
+    FIELDS = ('id', 'title', 'content', 'created_at', 'updated_at', 'tags',
+              'event_date', 'event_time', 'event_at', 'position', 'version')
+    # Sidebar listing: everything except the full body, plus a short preview
+    PREVIEW_LENGTH = 200
+    SUMMARY_FIELDS = ('id', 'title', 'content_preview', 'created_at', 'updated_at',
+                      'tags', 'event_date', 'event_time', 'event_at', 'position', 'version')
+
+    # truncated copy of content computed in SQL, only loaded when requested
+    content_preview = db.column_property(db.func.substr(content, 1, PREVIEW_LENGTH), deferred=True)
+
     def __repr__(self):
         return f'<Note {self.title}>'
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'content': self.content,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            # tags is stored as JSON where supported; normalize to list
-            'tags': self.tags if self.tags else [],
-            'event_date': self.event_date,
-            'event_time': self.event_time,
-            'position': self.position
-        }
 
+    @classmethod
+    def owned_by(cls, user_id):
+        """Criterion for `user_id`'s notes; None means the shared notes."""
+        return _owner_clause(cls.user_id, user_id)
+
+    def to_dict(self, fields=None):
+        """Serialize the note. `fields` restricts the output to a subset of
+        FIELDS/SUMMARY_FIELDS; only those attributes are touched, so deferred
+        columns such as `content` are not loaded unless asked for."""
+        data = {}
+        for field in fields or self.FIELDS:
+            value = getattr(self, field)
+            if field in ('created_at', 'updated_at', 'event_at'):
+                value = value.isoformat() if value else None
+            elif field == 'tags':
+                # tags is stored as JSON where supported; normalize to list
+                value = value if value else []
+            data[field] = value
+        return data
+
+
+# All led by user_id, so a user's queries read only that user's rows.
+# Serves get_notes' ORDER BY (src/ordering.LIST_ORDER) straight from the
+# index: ASC is NULLS LAST on Postgres, and SQLite plans it without a sort.
+db.Index('ix_note_user_position_updated', Note.user_id, Note.position, Note.updated_at.desc(), Note.id)
+# the list ETag's count/max(updated_at) and LIKE search's order
+db.Index('ix_note_user_updated_at', Note.user_id, Note.updated_at)
+# GET /api/notes/events: range scan and keyset order on (event_at, id)
+db.Index('ix_note_user_event_at', Note.user_id, Note.event_at, Note.id)
+# GET /api/notes/changes?since=: notes changed after a sequence number
+db.Index('ix_note_user_change_seq', Note.user_id, Note.change_seq)
+
+
+class NoteTag(db.Model):
+    """Tag index: one row per (tag, note), kept in sync with Note.tags by
+    src/tags.py so tag filters and counts never read the JSON column."""
+    __tablename__ = 'note_tags'
+
+    # (tag, note_id) serves "notes with tag X" and the per-tag counts
+    tag = db.Column(db.String(100), primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('note.id', ondelete='CASCADE'), primary_key=True, index=True)
+    # copy of the note's owner, so per-user filters and counts stay in the index
+    user_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (db.Index('ix_note_tags_user_tag', 'user_id', 'tag', 'note_id'),)
+
+    def __repr__(self):
+        return f'<NoteTag {self.tag} {self.note_id}>'
+
+    @classmethod
+    def owned_by(cls, user_id):
+        return _owner_clause(cls.user_id, user_id)
+
+
+class NoteTombstone(db.Model):
+    """A deleted note, kept so the change feed can report the deletion."""
+    __tablename__ = 'note_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # not unique: SQLite may hand a deleted note's id to a new note
+    note_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_note_tombstones_user_change_seq', 'user_id', 'change_seq'),)
+
+    def __repr__(self):
+        return f'<NoteTombstone {self.note_id} {self.change_seq}>'
+
+    @classmethod
+    def owned_by(cls, user_id):
+        return _owner_clause(cls.user_id, user_id)
+
+
+class NoteChangeCounter(db.Model):
+    """Last change sequence number handed out per owner (0 = shared notes)."""
+    __tablename__ = 'note_change_counters'
+
+    owner = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    seq = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<NoteChangeCounter {self.owner} {self.seq}>'
+
+
+class NoteEmbedding(db.Model):
+    """A note's vector for semantic search (src/semantic.py): float32 bytes
+    from the embedder named in `model`."""
+    __tablename__ = 'note_embeddings'
+
+    note_id = db.Column(db.Integer, db.ForeignKey('note.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+    model = db.Column(db.String(64), nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f'<NoteEmbedding {self.note_id} {self.model}>'
+
+    @classmethod
+    def owned_by(cls, user_id):
+        return _owner_clause(cls.user_id, user_id)
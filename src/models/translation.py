@@ -0,0 +1,22 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class CachedTranslation(db.Model):
+    """Persistent tier of the translation cache (see src/translation_cache.py).
+
+    Rows are content-addressed: `key` hashes (model, target_lang, prompt), so
+    the same text translated again - from any note - is served from here.
+    """
+    __tablename__ = 'translation_cache'
+
+    key = db.Column(db.String(64), primary_key=True)
+    # hash of the source text, used to invalidate when a note's content changes
+    source_hash = db.Column(db.String(64), nullable=False, index=True)
+    model = db.Column(db.String(100), nullable=False)
+    target_lang = db.Column(db.String(20), nullable=False)
+    translated = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CachedTranslation {self.key[:12]} {self.target_lang}>'
@@ -0,0 +1,195 @@
+"""Read-through cache for serialized note payloads, list pages and search
+results.
+
+Entries hold the JSON body exactly as sent plus its ETag, so a hit skips
+the query, to_dict() and the JSON encoder (and a matching If-None-Match
+gets its 304 without touching the database).
+
+  note:<owner>:<id>                  GET /api/notes/<id>
+  list:<owner>:<gen>:<query string>  GET /api/notes pages (not the streamed
+                                     forms) and GET /api/notes/events
+  search:<owner>:<gen>:<limit>:<q>   GET /api/notes/search
+  tags:<owner>:<gen>:<query string>  GET /api/tags
+
+`owner` is the user the notes belong to (`u<id>`, or `shared`; see
+src/auth.py) and `gen` that owner's generation counter, bumped by every
+write to their notes: a write retires all of its owner's list, search and
+tag entries at once and leaves other users' alone; note entries are
+deleted by id. Routes call `invalidate(ids, owner)` after committing:
+create, update, patch, delete, reorder and move (with every id of the
+owner's when a move renumbers the whole list).
+
+Backends (NOTE_CACHE):
+  memory  per-process TTLCache. Another process's writes are only seen
+          once entries expire, so use it with a single worker.
+  redis   RedisCache at NOTE_CACHE_URL (or REDIS_URL), shared by all
+          workers and instances.
+  off     no caching.
+  auto    (default) redis when a URL is set, else off: a memory cache
+          under several workers (gunicorn, Vercel) would serve one
+          worker's stale pages after another worker's write. Single-worker
+          deployments opt into memory explicitly.
+
+NOTE_CACHE_TTL (seconds), NOTE_CACHE_MAX_ENTRIES and NOTE_CACHE_MAX_BYTES
+size it; GET /api/note-cache/stats reports hit rates per kind.
+"""
+
+import os
+import sys
+import threading
+
+from flask import current_app
+
+from src.cache import RedisCache, TTLCache
+
+NOTE_CACHE = os.getenv('NOTE_CACHE', 'auto').lower()
+NOTE_CACHE_URL = os.getenv('NOTE_CACHE_URL') or os.getenv('REDIS_URL')
+NOTE_CACHE_TTL = int(os.getenv('NOTE_CACHE_TTL', '300'))
+NOTE_CACHE_MAX_ENTRIES = int(os.getenv('NOTE_CACHE_MAX_ENTRIES', '5000'))
+NOTE_CACHE_MAX_BYTES = int(os.getenv('NOTE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+KINDS = ('note', 'list', 'search', 'tags')
+
+
+def _scope(owner):
+    return 'shared' if owner is None else f'u{owner}'
+
+
+class NoteCache:
+    """Typed front for a TTLCache/RedisCache store; `store=None` disables it."""
+
+    def __init__(self, store=None, backend='off'):
+        self.store = store
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._counts = {kind: {'hits': 0, 'misses': 0, 'stores': 0} for kind in KINDS}
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.store is not None
+
+    def _count(self, kind, name):
+        with self._lock:
+            self._counts[kind][name] += 1
+
+    def generation(self, owner=None):
+        """`owner`'s current write generation; None when caching is off or
+        unavailable."""
+        return self.store.counter(f'gen:{_scope(owner)}') if self.store is not None else None
+
+    @staticmethod
+    def note_key(note_id, owner=None):
+        return f'note:{_scope(owner)}:{note_id}'
+
+    @staticmethod
+    def list_key(gen, variant, owner=None):
+        return f'list:{_scope(owner)}:{gen}:{variant}' if gen is not None else None
+
+    @staticmethod
+    def search_key(gen, query, limit, owner=None):
+        return f'search:{_scope(owner)}:{gen}:{limit}:{query}' if gen is not None else None
+
+    @staticmethod
+    def tags_key(gen, variant, owner=None):
+        return f'tags:{_scope(owner)}:{gen}:{variant}' if gen is not None else None
+
+    def lookup(self, kind, key):
+        """(etag, body) for `key`, or None."""
+        if self.store is None or key is None:
+            return None
+        entry = self.store.get(key)
+        if entry is None:
+            self._count(kind, 'misses')
+            return None
+        self._count(kind, 'hits')
+        etag, _, body = entry.partition('\n')
+        return etag, body
+
+    def put(self, kind, key, body, etag='', gen=None, owner=None):
+        """Cache `body`. Pass the `gen` read before querying when the key is
+        not generation-scoped: if a write landed meanwhile the (possibly
+        stale) body is dropped instead of cached."""
+        if self.store is None or key is None:
+            return
+        if gen is not None and self.generation(owner) != gen:
+            return
+        entry = f'{etag}\n{body}'
+        if self.store.set(key, entry, size=sys.getsizeof(entry)):
+            self._count(kind, 'stores')
+
+    def invalidate(self, note_ids=(), owner=None):
+        """Forget `owner`'s `note_ids` and every list/search/tag entry of
+        theirs."""
+        if self.store is None:
+            return
+        try:
+            self.store.incr(f'gen:{_scope(owner)}')
+        except Exception as e:
+            # the owner's lists and searches stay cached until they expire
+            print(f'WARNING: note cache generation bump failed: {e}')
+        # the note entries go regardless: they are not generation-scoped
+        for note_id in note_ids:
+            try:
+                self.store.delete(self.note_key(note_id, owner))
+            except Exception as e:
+                print(f'WARNING: note cache invalidation failed: {e}')
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self, owner=None):
+        with self._lock:
+            kinds = {kind: dict(counts) for kind, counts in self._counts.items()}
+            invalidations = self.invalidations
+        for counts in kinds.values():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_rate'] = round(counts['hits'] / lookups, 4) if lookups else None
+        hits = sum(c['hits'] for c in kinds.values())
+        lookups = hits + sum(c['misses'] for c in kinds.values())
+        return {
+            'backend': self.backend,
+            'ttl': NOTE_CACHE_TTL,
+            'generation': self.generation(owner),
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+            **kinds,
+            'invalidations': invalidations,
+            'store': self.store.stats() if self.store is not None else None,
+        }
+
+
+def _make_store(choice):
+    if choice == 'auto':
+        if not NOTE_CACHE_URL:
+            return None, 'off'
+        choice = 'redis'
+    if choice == 'redis':
+        if not NOTE_CACHE_URL:
+            print('WARNING: NOTE_CACHE=redis but neither NOTE_CACHE_URL nor REDIS_URL is set; note cache disabled')
+            return None, 'off'
+        try:
+            store = RedisCache(NOTE_CACHE_URL, ttl=NOTE_CACHE_TTL, prefix='notes:')
+            store.client.ping()
+            return store, 'redis'
+        except Exception as e:
+            # not memory: a shared cache was asked for because several
+            # workers serve the database
+            print(f'WARNING: could not use redis note cache; note cache disabled: {e}')
+            return None, 'off'
+    if choice == 'memory':
+        return TTLCache(max_entries=NOTE_CACHE_MAX_ENTRIES, max_bytes=NOTE_CACHE_MAX_BYTES,
+                        ttl=NOTE_CACHE_TTL), 'memory'
+    return None, 'off'
+
+
+def init_note_cache(app, choice=None):
+    store, backend = _make_store((choice or NOTE_CACHE).lower())
+    app.extensions['note_cache'] = NoteCache(store, backend)
+    print(f'INFO: Note cache backend: {backend}')
+    return app.extensions['note_cache']
+
+
+def get_note_cache():
+    return current_app.extensions.get('note_cache') or _DISABLED
+
+
+_DISABLED = NoteCache()
@@ -0,0 +1,175 @@
+"""Manual note ordering.
+
+Positions are spaced POSITION_GAP apart, so moving a single note usually
+means writing just that note's position (the midpoint between its new
+neighbours). Only when the gap is used up, or legacy rows share a position,
+is the whole list renumbered - and then in one set-based UPDATE per chunk
+rather than one SELECT+UPDATE per note. Each user's notes form their own
+list (`user_id`, None for the shared notes).
+"""
+
+from sqlalchemy import Integer, and_, bindparam, column, func, or_, update, values
+
+from src.changes import next_seq
+from src.models.note import Note
+
+POSITION_GAP = 1024
+# Rows per UPDATE ... FROM (VALUES ...) statement on Postgres
+REORDER_CHUNK_SIZE = 1000
+
+# Sidebar order: position if set (NULLs last), then most recently updated
+LIST_ORDER = (Note.position.asc().nullslast(), Note.updated_at.desc(), Note.id.asc())
+
+
+def after_key(position, updated_at, note_id):
+    """Predicate for rows that come after (position, updated_at, id) in LIST_ORDER."""
+    same_position = or_(Note.updated_at < updated_at,
+                        and_(Note.updated_at == updated_at, Note.id > note_id))
+    if position is None:
+        return and_(Note.position.is_(None), same_position)
+    return or_(Note.position > position,
+               Note.position.is_(None),
+               and_(Note.position == position, same_position))
+
+
+def before_key(position, updated_at, note_id):
+    """Predicate for rows that come before (position, updated_at, id) in LIST_ORDER."""
+    same_position = or_(Note.updated_at > updated_at,
+                        and_(Note.updated_at == updated_at, Note.id < note_id))
+    if position is None:
+        return or_(Note.position.isnot(None), and_(Note.position.is_(None), same_position))
+    return or_(Note.position < position,
+               and_(Note.position == position, same_position))
+
+
+# LIST_ORDER reversed, for walking backwards from a note
+REVERSE_LIST_ORDER = (Note.position.desc().nullsfirst(), Note.updated_at.asc(), Note.id.desc())
+
+
+def bulk_reorder(session, ids, start=0, user_id=None):
+    """Give `ids` gapped positions in list order with set-based UPDATEs.
+
+    Postgres gets one `UPDATE ... FROM (VALUES ...)` per chunk, i.e. one
+    round trip; SQLite (in-process, no network) uses an executemany bulk
+    update by primary key. Unknown ids, and other users' notes, are
+    ignored. Does not commit.
+    """
+    seen = set()
+    ordered = [i for i in ids if not (i in seen or seen.add(i))]
+    if not ordered:
+        return 0
+    # unknown ids leave gaps in the sequence, which readers don't mind
+    first_seq = next_seq(session, user_id, len(ordered))
+    rows = [(nid, (start + idx) * POSITION_GAP, first_seq + idx) for idx, nid in enumerate(ordered)]
+
+    if session.get_bind().dialect.name == 'postgresql':
+        for offset in range(0, len(rows), REORDER_CHUNK_SIZE):
+            chunk = rows[offset:offset + REORDER_CHUNK_SIZE]
+            new_positions = values(
+                column('id', Integer), column('position', Integer), column('change_seq', Integer),
+                name='new_positions'
+            ).data(chunk)
+            session.execute(
+                update(Note)
+                .where(Note.id == new_positions.c.id, Note.owned_by(user_id))
+                .values(position=new_positions.c.position, change_seq=new_positions.c.change_seq)
+                .execution_options(synchronize_session=False)
+            )
+    else:
+        session.execute(
+            update(Note.__table__)
+            .where(Note.__table__.c.id == bindparam('b_id'), Note.owned_by(user_id))
+            .values(position=bindparam('b_position'), change_seq=bindparam('b_seq')),
+            [{'b_id': nid, 'b_position': position, 'b_seq': seq} for nid, position, seq in rows],
+        )
+    return len(rows)
+
+
+def _next_note(session, note, exclude_id):
+    return session.query(Note.id, Note.position).filter(
+        Note.owned_by(note.user_id),
+        after_key(note.position, note.updated_at, note.id), Note.id != exclude_id
+    ).order_by(*LIST_ORDER).first()
+
+
+def _prev_note(session, note, exclude_id):
+    return session.query(Note.id, Note.position).filter(
+        Note.owned_by(note.user_id),
+        before_key(note.position, note.updated_at, note.id), Note.id != exclude_id
+    ).order_by(*REVERSE_LIST_ORDER).first()
+
+
+def _rebalance(session, note_id, after, before, user_id):
+    ids = [nid for (nid,) in session.query(Note.id).filter(Note.owned_by(user_id)).order_by(*LIST_ORDER)
+           if nid != note_id]
+    if after is not None:
+        ids.insert(ids.index(after.id) + 1, note_id)
+    elif before is not None:
+        ids.insert(ids.index(before.id), note_id)
+    else:
+        ids.append(note_id)
+    bulk_reorder(session, ids, user_id=user_id)
+
+
+def move_note(session, note_id, after_id=None, before_id=None, user_id=None):
+    """Move one note between its new neighbours.
+
+    `after_id` is the note that should precede it and `before_id` the one
+    that should follow it; either may be omitted (None) at the ends of the
+    list. Returns 'moved' for a single-row write or 'rebalanced' when the
+    list had to be renumbered. Raises LookupError for ids that are unknown
+    or not `user_id`'s. Does not commit.
+    """
+    note = session.get(Note, note_id)
+    if note is None or note.user_id != user_id:
+        raise LookupError(f'note {note_id} not found')
+    wanted = {i for i in (after_id, before_id) if i is not None}
+    neighbours = {n.id: n for n in session.query(Note).filter(
+        Note.owned_by(user_id), Note.id.in_(wanted))} if wanted else {}
+    if wanted - set(neighbours):
+        raise LookupError(f'note(s) {sorted(wanted - set(neighbours))} not found')
+    after = neighbours.get(after_id)
+    before = neighbours.get(before_id)
+
+    if after is not None and before is None:
+        # Caller only knows the preceding note (e.g. the end of a loaded
+        # page); the following one is whatever is next in list order.
+        nxt = _next_note(session, after, note_id)
+        if nxt is not None:
+            before = session.get(Note, nxt.id)
+    elif before is not None and after is None:
+        # Likewise when only the following note is known: land between it
+        # and whatever precedes it now.
+        prev = _prev_note(session, before, note_id)
+        if prev is not None:
+            after = session.get(Note, prev.id)
+
+    lo = after.position if after is not None else None
+    hi = before.position if before is not None else None
+    others = [note_id] + [n.id for n in (after, before) if n is not None]
+    new_position = None
+
+    if (after is not None and lo is None) or (before is not None and hi is None):
+        new_position = None  # NULL positions sort last; renumber to place properly
+    elif after is not None and before is not None:
+        crowded = session.query(func.count(Note.id)).filter(
+            Note.owned_by(user_id), Note.position.between(lo, hi), Note.id.notin_(others)
+        ).scalar()
+        if hi - lo >= 2 and not crowded:
+            new_position = (lo + hi) // 2
+    elif after is not None:
+        new_position = lo + POSITION_GAP
+    elif before is not None:
+        new_position = hi - POSITION_GAP
+
+    if new_position is not None:
+        # Core UPDATE: a move is not an edit, so it must not bump the note's
+        # version (that would 409 the editor's next conditional autosave)
+        session.execute(
+            update(Note.__table__).where(Note.__table__.c.id == note_id)
+            .values(position=new_position, change_seq=next_seq(session, user_id))
+        )
+        session.expire(note, ['position', 'change_seq'])
+        return 'moved'
+    _rebalance(session, note_id, after, before, user_id)
+    return 'rebalanced'
@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify
+from src.models.job import Job, db
+from src.auth import current_user_id, load_current_user
+from src.jobs import get_job_queue
+
+job_bp = Blueprint('job', __name__)
+# jobs are polled by the user who queued them (src/auth.py)
+job_bp.before_request(load_current_user)
+
+
+@job_bp.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    """Queue depth, worker and outcome counters for this process."""
+    return jsonify(get_job_queue().stats())
+
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a background job: state plus result (succeeded) or error (failed).
+
+    Another user's job is a 404 like a missing one.
+    """
+    job = db.session.get(Job, job_id)
+    if job is None or job.user_id != current_user_id():
+        return jsonify({'error': 'Job not found'}), 404
+    response = jsonify(job.to_dict())
+    if job.state in ('queued', 'running'):
+        response.headers['Retry-After'] = '1'
+        response.headers['Cache-Control'] = 'no-store'
+    return response
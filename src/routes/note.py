@@ -1,45 +1,347 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context, url_for
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import StaleDataError
 from src.models.note import Note, db
-from src.llm import translate_text
+from src.models.user import User
+from src import agenda, bulk, changes, jobs, semantic, translation_cache
+from src.auth import current_user_id, load_current_user
+from src.metrics import log_event
+from src.llm import CircuitOpenError, iter_translate_batch, translate_text, translate_text_stream
+from src.ordering import LIST_ORDER, after_key, bulk_reorder, move_note
+from src.http_cache import list_etag, not_modified, note_etag, note_etag_value
+from src.note_cache import get_note_cache
+from src.search import get_search_backend
+from src.serialization import note_dicts, note_select, transcode, wants_msgpack
+from src.splice import SpliceError, apply_splices
+from src.tags import MAX_FILTER_TAGS, clear_note_tags, normalize_tags, set_note_tags, tag_counts, tag_filter
+from src.streaming import iter_rows, stream_json
 
 note_bp = Blueprint('note', __name__)
+# every route works on the current user's notes (src/auth.py)
+note_bp.before_request(load_current_user)
 
+import base64
 import datetime
+import itertools
 import os
 import json as _json
 
+MAX_PAGE_SIZE = 500
+MAX_CHANGES_PAGE = 1000
+
+
+def _parse_fields(raw):
+    """Parse ?fields=a,b,c (or the `summary` alias). Returns None for all fields."""
+    if not raw:
+        return None
+    if raw == 'summary':
+        return Note.SUMMARY_FIELDS
+    fields = tuple(f.strip() for f in raw.split(',') if f.strip())
+    unknown = [f for f in fields if f not in Note.FIELDS + ('content_preview',)]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _revalidate(response, etag):
+    """Attach a weak ETag; no-cache makes browsers revalidate (-> 304) every time."""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _not_modified(etag):
+    return _revalidate(Response(status=304), etag)
+
+
+def _cached_response(entry):
+    """Response for a note-cache hit: 304 or the stored body, same ETag."""
+    etag, body = entry
+    if etag and not_modified(etag):
+        return _not_modified(etag)
+    if wants_msgpack():
+        response = current_app.response_class(transcode(body), mimetype='application/msgpack')
+        response.vary.add('Accept')
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    return _revalidate(response, etag) if etag else response
+
+
+def _cache_put(kind, key, response, etag='', **kwargs):
+    """Cache a JSON response's body. MessagePack responses are not stored;
+    _cached_response() converts the JSON entry for those clients."""
+    if response.mimetype == 'application/json':
+        get_note_cache().put(kind, key, response.get_data(as_text=True), etag, **kwargs)
+
+
+def _encode_cursor(note):
+    key = [note.position, note.updated_at.isoformat() if note.updated_at else None, note.id]
+    return base64.urlsafe_b64encode(_json.dumps(key).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    position, updated_at, note_id = _json.loads(base64.urlsafe_b64decode(padded))
+    if updated_at is not None:
+        updated_at = datetime.datetime.fromisoformat(updated_at)
+    return position, updated_at, int(note_id)
+
+
+def _owned_note(note_id):
+    """The current user's note `note_id`, or None. Another user's note is
+    a 404 like a missing one, so ids don't reveal what exists."""
+    note = db.session.get(Note, note_id)
+    if note is None or note.user_id != current_user_id():
+        return None
+    return note
+
+
 @note_bp.route('/notes', methods=['GET'])
 def get_notes():
-    """Get all notes, ordered by most recently updated"""
-    # order by position if set (NULLs last), then by updated_at desc
-    notes = Note.query.order_by(Note.position.asc().nullslast(), Note.updated_at.desc()).all()
-    return jsonify([note.to_dict() for note in notes])
+    """Get notes, in manual order then most recently updated.
+
+    Optional query params:
+      fields  comma separated subset of Note.FIELDS (plus `content_preview`),
+              or `summary` for everything but the full body
+      limit   page size; when set (or with cursor) the response is
+              {notes: [...], next_cursor: "..."} instead of a bare list
+      cursor  opaque next_cursor from the previous page
+      stream  `1` streams the unpaginated list instead of buffering it
+      format  `ndjson` streams one note per line (implies stream)
+      tag     only notes with this tag; repeat for several
+      tag_mode  `all` (default) or `any` of the given tags
+    """
+    try:
+        fields = _parse_fields(request.args.get('fields'))
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        after = _decode_cursor(cursor) if cursor else None
+        tags = normalize_tags(request.args.getlist('tag'))
+        tag_mode = request.args.get('tag_mode', 'all')
+        if tag_mode not in ('all', 'any'):
+            raise ValueError('tag_mode must be all or any')
+        if len(tags) > MAX_FILTER_TAGS:
+            raise ValueError(f'at most {MAX_FILTER_TAGS} tags')
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+    fmt = request.args.get('format', 'json')
+    streamed = limit is None and cursor is None and (
+        fmt == 'ndjson' or request.args.get('stream') in ('1', 'true'))
+    user_id = current_user_id()
+    cache = get_note_cache()
+    cache_key = None
+    if not streamed:
+        cache_key = cache.list_key(cache.generation(user_id), request.query_string.decode(), user_id)
+        entry = cache.lookup('list', cache_key)
+        if entry is not None:
+            return _cached_response(entry)
+
+    # Conditional GET: every write to the user's notes moves their change
+    # sequence, so one primary-key lookup says whether anything changed
+    seq = changes.latest_seq(db.session, user_id)
+    etag = list_etag(seq, user_id, request.query_string.decode())
+    if not_modified(etag):
+        return _not_modified(etag)
+
+    # Only the requested columns, as plain rows (src/serialization.py), plus
+    # the keyset columns for the cursor; order by position if set (NULLs
+    # last), then by updated_at desc
+    query = (note_select(fields, keys=('position', 'updated_at', 'id'))
+             .where(Note.owned_by(user_id)).order_by(*LIST_ORDER))
+    if after is not None:
+        query = query.where(after_key(*after))
+    if tags:
+        query = query.where(tag_filter(tags, tag_mode, user_id))
+
+    if streamed:
+        return _revalidate(stream_json(note_dicts(iter_rows(db.session, query), fields), fmt), etag)
+    if limit is None and cursor is None:
+        response = jsonify(list(note_dicts(db.session.execute(query).tuples(), fields)))
+    else:
+        limit = max(1, min(limit or 50, MAX_PAGE_SIZE))
+        # fetch one extra row to know whether another page exists
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        response = jsonify({
+            'notes': list(note_dicts(rows, fields)),
+            'next_cursor': _encode_cursor(rows[-1]) if has_more else None,
+            # read before the query: sync from here may repeat a change, never miss one
+            'changes_cursor': seq,
+        })
+    # the key carries the generation read before the query, so a write
+    # that raced with it leaves this entry unreachable
+    _cache_put('list', cache_key, response, etag)
+    return _revalidate(response, etag)
+
+@note_bp.route('/notes/events', methods=['GET'])
+def get_events():
+    """Notes whose event falls in [from, to), soonest first.
+
+    Query params:
+      from, to  YYYY-MM-DD or ISO datetimes; either may be omitted
+      limit     page size (default 100, max MAX_PAGE_SIZE)
+      cursor    next_cursor from the previous page
+      fields    as for GET /notes
+    Returns {notes: [...], next_cursor: "..."|null}.
+    """
+    try:
+        fields = _parse_fields(request.args.get('fields'))
+        start = agenda.parse_bound(request.args['from']) if request.args.get('from') else None
+        end = agenda.parse_bound(request.args['to']) if request.args.get('to') else None
+        cursor = request.args.get('cursor')
+        after = agenda.decode_cursor(cursor) if cursor else None
+        limit = max(1, min(request.args.get('limit', 100, type=int) or 100, MAX_PAGE_SIZE))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+    user_id = current_user_id()
+    cache = get_note_cache()
+    cache_key = cache.list_key(cache.generation(user_id), 'events?' + request.query_string.decode(), user_id)
+    entry = cache.lookup('list', cache_key)
+    if entry is not None:
+        return _cached_response(entry)
+
+    query = agenda.events_query(Note.query.filter(Note.owned_by(user_id)), start, end, after)
+    if fields is not None:
+        columns = {'id', 'event_at'} | set(fields)
+        query = query.options(load_only(*(getattr(Note, c) for c in columns)))
+    notes = query.limit(limit + 1).all()
+    has_more = len(notes) > limit
+    notes = notes[:limit]
+    response = jsonify({
+        'notes': [note.to_dict(fields) for note in notes],
+        'next_cursor': agenda.encode_cursor(notes[-1]) if has_more else None,
+    })
+    _cache_put('list', cache_key, response)
+    return response
+
+@note_bp.route('/notes/changes', methods=['GET'])
+def get_changes():
+    """Notes created, edited or moved, and ids deleted, since a sync cursor.
+
+    Query params:
+      since   `cursor` (or `changes_cursor` of a GET /notes page) from the
+              last sync; 0 or omitted for everything
+      limit   most changes per response (default 500, max MAX_CHANGES_PAGE)
+      fields  as for GET /notes
+    Returns {notes: [...], deleted: [id, ...], cursor: n, has_more: bool};
+    while has_more, call again with the new cursor.
+    """
+    try:
+        fields = _parse_fields(request.args.get('fields'))
+        since = request.args.get('since', 0, type=int)
+        limit = max(1, min(request.args.get('limit', 500, type=int) or 500, MAX_CHANGES_PAGE))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    if since < 0:
+        return jsonify({'error': 'Invalid request: since must be >= 0'}), 400
+
+    user_id = current_user_id()
+    notes, deleted, cursor, has_more = changes.changes_since(db.session, user_id, since, limit, fields)
+    return jsonify({
+        'notes': [note.to_dict(fields) for note in notes],
+        'deleted': deleted,
+        'cursor': cursor,
+        'has_more': has_more,
+    })
+
+@note_bp.route('/notes/export', methods=['GET'])
+def export_notes():
+    """Stream every note as NDJSON (default) or a JSON array.
+
+    Query params: format=ndjson|json, fields=... (as for GET /notes).
+    Memory stays bounded by the fetch batch size, not the number of notes.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'json'):
+        return jsonify({'error': 'format must be ndjson or json'}), 400
+    try:
+        fields = _parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+    query = note_select(fields).where(Note.owned_by(current_user_id())).order_by(Note.id.asc())
+    return stream_json(note_dicts(iter_rows(db.session, query), fields), fmt,
+                       filename=f'notes.{fmt}')
+
+def _with_etag(response, note):
+    response.set_etag(note_etag(note), weak=True)
+    return response
+
+
+def _if_match_version(note_id):
+    """Version the client based its edit on: If-Match (the note's ETag,
+    W/"<id>-<version>[-...]", or a bare version number), else the body's
+    `version`. None = no precondition; -1 = an ETag for a different note."""
+    header = request.headers.get('If-Match')
+    if header and header.strip() != '*':
+        tag = header.split(',')[0].strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        parts = tag.strip('"').split('-')
+        nid, version = (parts[0], parts[1]) if len(parts) > 1 else ('', parts[0])
+        if nid and nid != str(note_id):
+            return -1
+        try:
+            return int(version)
+        except ValueError:
+            return -1
+    version = (request.get_json(silent=True) or {}).get('version')
+    return version if isinstance(version, int) else None
+
+
+def _conflict_response(note_id):
+    """409 with the current server copy so the client can merge or retry."""
+    db.session.rollback()
+    current = db.session.get(Note, note_id)
+    if current is None:
+        return jsonify({'error': 'Note not found'}), 404
+    response = jsonify({'error': 'Note was modified by another request', 'current': current.to_dict()})
+    return _with_etag(response, current), 409
+
 
 @note_bp.route('/notes', methods=['POST'])
 def create_note():
     """Create a new note"""
     try:
         data = request.json
-        # Log incoming create payload for debugging
-        print(f"[notes:create] {datetime.datetime.utcnow().isoformat()} - incoming POST data: {data}")
         if not data or 'title' not in data or 'content' not in data:
             return jsonify({'error': 'Title and content are required'}), 400
 
-        tags = data.get('tags', [])
-        # ensure tags is a list
-        if tags is None:
-            tags = []
+        try:
+            bulk.check_text(data, 'title')
+            bulk.check_text(data, 'content')
+            tags = normalize_tags(data.get('tags'))
+            event_at = agenda.parse_event_at(data.get('event_date'), data.get('event_time'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        user_id = current_user_id()
+        if user_id is not None and db.session.get(User, user_id) is None:
+            return jsonify({'error': 'Unknown user'}), 401
 
         note = Note(
+            user_id=user_id,
             title=data['title'],
             content=data['content'],
             tags=tags,
             event_date=data.get('event_date'),
-            event_time=data.get('event_time')
+            event_time=data.get('event_time'),
+            event_at=event_at,
         )
+        # stamped before the INSERT, so creating is still a single write
+        changes.stamp(db.session, note)
         db.session.add(note)
+        db.session.flush()
+        set_note_tags(db.session, note.id, tags, user_id)
+        semantic.index_notes(db.session, [(note.id, user_id, note.title, note.content)])
         db.session.commit()
-        return jsonify(note.to_dict()), 201
+        get_note_cache().invalidate([note.id], user_id)
+        # sizes only: note bodies never go to the log
+        log_event('notes.create', id=note.id, title_chars=len(note.title), content_chars=len(note.content))
+        return _with_etag(jsonify(note.to_dict()), note), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -47,36 +349,187 @@ def create_note():
 @note_bp.route('/notes/<int:note_id>', methods=['GET'])
 def get_note(note_id):
     """Get a specific note by ID"""
-    note = Note.query.get_or_404(note_id)
-    return jsonify(note.to_dict())
+    user_id = current_user_id()
+    cache = get_note_cache()
+    entry = cache.lookup('note', cache.note_key(note_id, user_id))
+    if entry is not None:
+        return _cached_response(entry)
+    gen = cache.generation(user_id)
+
+    if request.if_none_match:
+        # revalidation: compare against two small columns before loading the note
+        row = db.session.query(Note.version, Note.updated_at).filter(
+            Note.id == note_id, Note.owned_by(user_id)).first()
+        if row is not None:
+            etag = note_etag_value(note_id, row.version, row.updated_at)
+            if not_modified(etag):
+                return _not_modified(etag)
+    note = _owned_note(note_id)
+    if note is None:
+        abort(404)
+    response = jsonify(note.to_dict())
+    etag = note_etag(note)
+    _cache_put('note', cache.note_key(note_id, user_id), response, etag, gen=gen, owner=user_id)
+    return _revalidate(response, etag)
 
 @note_bp.route('/notes/<int:note_id>', methods=['PUT'])
 def update_note(note_id):
     """Update a specific note"""
     try:
-        note = Note.query.get_or_404(note_id)
-        data = request.json
-        print(f"[notes:update] {datetime.datetime.utcnow().isoformat()} - updating id={note_id} with data: {request.json}")
+        note = _owned_note(note_id)
+        if note is None:
+            return jsonify({'error': 'Note not found'}), 404
         data = request.json
 
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        try:
+            for field in ('title', 'content'):
+                if field in data:
+                    bulk.check_text(data, field)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
+        expected = _if_match_version(note_id)
+        if expected is not None and expected != note.version:
+            return _conflict_response(note_id)
+
+        old_title, old_content = note.title, note.content
         note.title = data.get('title', note.title)
         note.content = data.get('content', note.content)
         # handle tags/event_date/event_time
         tags = data.get('tags')
         if tags is not None:
-            # expect tags to be a list; assign directly so SQLAlchemy can map to JSON
-            note.tags = tags
+            try:
+                note.tags = normalize_tags(tags)
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+            set_note_tags(db.session, note_id, note.tags, note.user_id)
 
         if 'event_date' in data:
             note.event_date = data.get('event_date')
 
         if 'event_time' in data:
             note.event_time = data.get('event_time')
+        if 'event_date' in data or 'event_time' in data:
+            # only when sent, so legacy rows whose strings don't parse
+            # (event_at left NULL by migration 7) stay editable
+            try:
+                note.event_at = agenda.parse_event_at(note.event_date, note.event_time)
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+        new_content = note.content
+        content_changed = new_content != old_content
+        content_chars = len(new_content or '')
+        if content_changed or note.title != old_title:
+            semantic.index_notes(db.session, [(note.id, note.user_id, note.title, note.content)])
+        changes.stamp(db.session, note)
         db.session.commit()
-        return jsonify(note.to_dict())
+        get_note_cache().invalidate([note_id], current_user_id())
+        log_event('notes.update', id=note_id, fields=sorted(data), content_chars=content_chars)
+        if content_changed:
+            # cached translations of the old text are now stale; done before
+            # to_dict() reloads the note so the request never holds two
+            # pooled connections at once
+            translation_cache.invalidate_text(old_content, new_content)
+        return _with_etag(jsonify(note.to_dict()), note)
+    except StaleDataError:
+        # another request updated the note between our read and write
+        return _conflict_response(note_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+PATCHABLE_FIELDS = ('title', 'content', 'tags', 'event_date', 'event_time')
+
+
+@note_bp.route('/notes/<int:note_id>', methods=['PATCH'])
+def patch_note(note_id):
+    """Apply a partial update (what autosave sends).
+
+    Request JSON: any of title/content/tags/event_date/event_time, and/or
+    "ops": [{"at", "delete", "insert"}, ...] splices against the stored
+    content (see src/splice.py). Send If-Match: <ETag> (or "version") to
+    make the write conditional; a stale version gets 409 with the current
+    note. Returns {id, version, updated_at} and the new ETag, or the full
+    note with Prefer: return=representation.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'JSON object required'}), 400
+        unknown = set(data) - set(PATCHABLE_FIELDS) - {'ops', 'version'}
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+        if 'ops' in data and 'content' in data:
+            return jsonify({'error': 'Send either content or ops, not both'}), 400
+        try:
+            for field in ('title', 'content'):
+                if field in data:
+                    bulk.check_text(data, field)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        note = _owned_note(note_id)
+        if note is None:
+            return jsonify({'error': 'Note not found'}), 404
+        expected = _if_match_version(note_id)
+        if expected is not None and expected != note.version:
+            return _conflict_response(note_id)
+
+        old_title, old_content = note.title, note.content
+        for field in PATCHABLE_FIELDS:
+            if field in data and field not in ('content', 'tags'):
+                setattr(note, field, data[field])
+        if 'tags' in data:
+            try:
+                tags = normalize_tags(data['tags'])
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+            if tags != (note.tags or []):
+                note.tags = tags
+                set_note_tags(db.session, note_id, tags, note.user_id)
+        if 'event_date' in data or 'event_time' in data:
+            try:
+                note.event_at = agenda.parse_event_at(note.event_date, note.event_time)
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+        if 'content' in data:
+            note.content = data['content']
+        elif data.get('ops'):
+            note.content = apply_splices(old_content, data['ops'])
+
+        new_content = note.content
+        content_changed = new_content != old_content
+        if db.session.is_modified(note):
+            if content_changed or note.title != old_title:
+                semantic.index_notes(db.session, [(note.id, note.user_id, note.title, note.content)])
+            changes.stamp(db.session, note)
+            # UPDATE ... WHERE id = :id AND version = :loaded_version
+            db.session.commit()
+            get_note_cache().invalidate([note_id], current_user_id())
+        if content_changed:
+            translation_cache.invalidate_text(old_content, new_content)
+
+        if 'return=representation' in request.headers.get('Prefer', ''):
+            response = jsonify(note.to_dict())
+        else:
+            response = jsonify({
+                'id': note.id,
+                'version': note.version,
+                'updated_at': note.updated_at.isoformat() if note.updated_at else None,
+            })
+        return _with_etag(response, note)
+    except SpliceError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 422
+    except StaleDataError:
+        return _conflict_response(note_id)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -85,27 +538,171 @@ def update_note(note_id):
 def delete_note(note_id):
     """Delete a specific note"""
     try:
-        note = Note.query.get_or_404(note_id)
-        print(f"[notes:delete] {datetime.datetime.utcnow().isoformat()} - deleting id={note_id}")
+        note = _owned_note(note_id)
+        if note is None:
+            return jsonify({'error': 'Note not found'}), 404
+        clear_note_tags(db.session, [note_id])
+        semantic.forget_notes(db.session, [note_id])
+        changes.record_delete(db.session, note)
         db.session.delete(note)
         db.session.commit()
+        get_note_cache().invalidate([note_id], current_user_id())
+        log_event('notes.delete', id=note_id)
         return '', 204
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@note_bp.route('/notes/bulk', methods=['POST'])
+def bulk_notes():
+    """Create, update and delete many notes in one request.
+
+    Body: a JSON array of items, or NDJSON (Content-Type:
+    application/x-ndjson, one item per line), read as it arrives - the
+    form to use for large imports. Items:
+      {"title", "content", "tags", "event_date", "event_time"}   create
+      {"op": "update", "id", ...fields, "version"?}              update
+      {"op": "delete", "id"}                                     delete
+    Written in batches of ?batch_size= (default BULK_BATCH_SIZE), each
+    committed on its own (see src/bulk.py). Returns {created, updated,
+    deleted, batches, errors: [{index, error, id?}, ...]}.
+    """
+    batch_size = request.args.get('batch_size', bulk.BULK_BATCH_SIZE, type=int)
+    if not 1 <= batch_size <= bulk.MAX_BULK_BATCH_SIZE:
+        return jsonify({'error': f'batch_size must be between 1 and {bulk.MAX_BULK_BATCH_SIZE}'}), 400
+
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        items = bulk.iter_lines(request.stream)
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a JSON array of items or an NDJSON body'}), 400
+
+    user_id = current_user_id()
+    if user_id is not None and db.session.get(User, user_id) is None:
+        return jsonify({'error': 'Unknown user'}), 401
+
+    def committed(note_ids, rewrites):
+        get_note_cache().invalidate(note_ids, user_id)
+        for old_content, new_content in rewrites:
+            translation_cache.invalidate_text(old_content, new_content)
+
+    writer = bulk.BulkWriter(db.session, user_id, batch_size, on_commit=committed)
+    try:
+        for index, item in enumerate(items):
+            writer.add(index, item)
+        result = writer.finish()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    log_event('notes.bulk', created=result['created'], updated=result['updated'],
+              deleted=result['deleted'], batches=result['batches'], errors=len(result['errors']))
+    return jsonify(result)
+
 @note_bp.route('/notes/search', methods=['GET'])
 def search_notes():
-    """Search notes by title or content"""
+    """Search notes by title or content.
+
+    Uses the full-text backend chosen at startup (see src/search.py); results
+    are ranked best-first and carry a highlighted `snippet`.
+    """
     query = request.args.get('q', '')
     if not query:
         return jsonify([])
-    
-    notes = Note.query.filter(
-        (Note.title.contains(query)) | (Note.content.contains(query))
-    ).order_by(Note.updated_at.desc()).all()
-    
-    return jsonify([note.to_dict() for note in notes])
+    limit = min(request.args.get('limit', 50, type=int) or 50, 200)
+
+    user_id = current_user_id()
+    cache = get_note_cache()
+    cache_key = cache.search_key(cache.generation(user_id), query, limit, user_id)
+    entry = cache.lookup('search', cache_key)
+    if entry is not None:
+        return _cached_response(entry)
+
+    hits = get_search_backend().search(db.session, query, limit=limit, owner=user_id)
+    if not hits:
+        return jsonify([])
+
+    notes = {note.id: note for note in Note.query.filter(Note.id.in_([h[0] for h in hits]))}
+    results = []
+    for note_id, rank, snippet in hits:
+        note = notes.get(note_id)
+        if note is None:
+            continue
+        item = note.to_dict()
+        item['snippet'] = snippet
+        item['rank'] = rank
+        results.append(item)
+    response = jsonify(results)
+    _cache_put('search', cache_key, response)
+    return response
+
+
+@note_bp.route('/notes/semantic', methods=['GET'])
+def semantic_search():
+    """Notes closest in meaning to ?q=, best first, each with its cosine
+    `score` (see src/semantic.py).
+
+    Optional query params: limit (default 10, max 100), fields (as for
+    GET /notes).
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify([])
+    try:
+        fields = _parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    limit = max(1, min(request.args.get('limit', 10, type=int) or 10, 100))
+    index = semantic.get_semantic_index()
+    if index is None:
+        return jsonify({'error': 'Semantic search is not available'}), 503
+
+    user_id = current_user_id()
+    cache = get_note_cache()
+    cache_key = cache.search_key(cache.generation(user_id), f"semantic:{request.args.get('fields', '')}:{query}",
+                                 limit, user_id)
+    entry = cache.lookup('search', cache_key)
+    if entry is not None:
+        return _cached_response(entry)
+
+    try:
+        hits = index.search(db.session, query, limit=limit, owner=user_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    # a score of 0 or less shares nothing with the query
+    hits = [(note_id, score) for note_id, score in hits if score > 0]
+    notes_query = Note.query.filter(Note.id.in_([note_id for note_id, _ in hits]), Note.owned_by(user_id))
+    if fields is not None:
+        notes_query = notes_query.options(load_only(*(getattr(Note, c) for c in {'id'} | set(fields))))
+    notes = {note.id: note for note in notes_query}
+    response = jsonify([{**notes[note_id].to_dict(fields), 'score': round(score, 4)}
+                        for note_id, score in hits if note_id in notes])
+    _cache_put('search', cache_key, response)
+    return response
+
+
+@note_bp.route('/tags', methods=['GET'])
+def get_tags():
+    """Tags with the number of notes carrying each, most used first.
+
+    Optional query params: prefix (e.g. for autocomplete), limit.
+    """
+    prefix = request.args.get('prefix', '').strip()
+    limit = request.args.get('limit', type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE)) if limit else None
+
+    user_id = current_user_id()
+    cache = get_note_cache()
+    cache_key = cache.tags_key(cache.generation(user_id), request.query_string.decode(), user_id)
+    entry = cache.lookup('tags', cache_key)
+    if entry is not None:
+        return _cached_response(entry)
+
+    response = jsonify([{'tag': tag, 'count': count}
+                        for tag, count in tag_counts(db.session, prefix=prefix, limit=limit, user_id=user_id)])
+    _cache_put('tags', cache_key, response)
+    return response
 
 
 @note_bp.route('/notes/reorder', methods=['POST'])
@@ -117,23 +714,202 @@ def reorder_notes():
         if not order or not isinstance(order, list):
             return jsonify({'error': 'Order must be a list of note ids'}), 400
 
-        # Update positions
-        for idx, nid in enumerate(order):
-            note = Note.query.get(nid)
-            if note:
-                note.position = idx
+        # Update positions in set-based statements instead of one query per id;
+        # ids of other users' notes are skipped
+        user_id = current_user_id()
+        bulk_reorder(db.session, order, user_id=user_id)
         db.session.commit()
+        get_note_cache().invalidate(order, user_id)
         return jsonify({'status': 'ok'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@note_bp.route('/notes/<int:note_id>/move', methods=['POST'])
+def move_note_route(note_id):
+    """Move one note. Expects JSON body: {'after': id|null, 'before': id|null}
+
+    `after` is the note it should follow and `before` the note it should
+    precede. Usually only the moved note's position is written.
+    """
+    try:
+        data = request.json or {}
+        after_id = data.get('after')
+        before_id = data.get('before')
+        if after_id is None and before_id is None:
+            return jsonify({'error': 'after or before is required'}), 400
+        if note_id in (after_id, before_id):
+            return jsonify({'error': 'A note cannot be moved relative to itself'}), 400
+
+        user_id = current_user_id()
+        try:
+            result = move_note(db.session, note_id, after_id=after_id, before_id=before_id, user_id=user_id)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        db.session.commit()
+        if result == 'moved':
+            get_note_cache().invalidate([note_id], user_id)
+        else:
+            # every one of the user's notes was renumbered
+            renumbered = [nid for (nid,) in db.session.query(Note.id).filter(Note.owned_by(user_id))]
+            get_note_cache().invalidate(renumbered, user_id)
+        position = db.session.query(Note.position).filter(Note.id == note_id).scalar()
+        return jsonify({'status': result, 'position': position})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+def _translation_error_response(exc, include_post_example=False):
+    """Map an exception from the LLM helpers to a JSON error response."""
+    if isinstance(exc, CircuitOpenError):
+        # Endpoint has been failing: fail fast instead of retrying again
+        response = jsonify({
+            'error': 'Translation service temporarily unavailable',
+            'detail': str(exc),
+            'retry_after': round(exc.retry_after),
+        })
+        response.headers['Retry-After'] = str(max(1, round(exc.retry_after)))
+        return response, 503
+
+    if isinstance(exc, RuntimeError):
+        # Likely cause: no API key configured
+        msg = str(exc)
+        return jsonify({
+            'error': 'OpenAI call failed: No API key configured',
+            'detail': msg,
+            'suggestions': [
+                'Set OPENAI_API_KEY in the environment or create a .env file with OPENAI_API_KEY=sk-...',
+                'For quick local testing without a key, set MOCK_TRANSLATION=1 in your environment (development only).',
+                'If you intended to call GitHub-hosted models, set GITHUB_TOKEN and optionally BASE_URL.'
+            ]
+        }), 500
+
+    import traceback
+    traceback.print_exception(exc)
+    msg = str(exc)
+    low = msg.lower()
+    if 'timeout' in low or 'timed out' in low or 'connect' in low:
+        example_curl = {
+            'ipv4': "curl --ipv4 -v https://api.openai.com/v1/models -H \"Authorization: Bearer $OPENAI_API_KEY\"",
+        }
+        if include_post_example:
+            example_curl['post_example'] = "curl --ipv4 -s -X POST https://api.openai.com/v1/chat/completions -H \"Authorization: Bearer $OPENAI_API_KEY\" -H \"Content-Type: application/json\" -d '{\"model\":\"gpt-4.1-mini\",\"messages\": [{\"role\":\"user\",\"content\":\"Say hi in Chinese\"}]}'"
+        suggestions = [
+            'Your server could not reach the OpenAI endpoint (TCP timeout). Common causes: local firewall, corporate network proxy, ISP filtering, or IPv6 routing problems.',
+            'Quick test: force IPv4 and check connectivity using curl (example): ' + example_curl['ipv4'],
+            'If IPv4 works but IPv6 does not, consider forcing IPv4 or disabling IPv6 on the server/network, or use a VPN.',
+            'If your network requires a proxy, set HTTPS_PROXY/HTTP_PROXY environment variables for the Flask process.',
+            'Alternatively try from another network (mobile hotspot) or use a VPN to confirm whether it is an ISP/network issue.'
+        ]
+        return jsonify({
+            'error': 'OpenAI call failed: Request timed out',
+            'detail': msg,
+            'suggestions': suggestions,
+            'curl_examples': example_curl
+        }), 504
+
+    return jsonify({'error': f'OpenAI call failed: {msg}', 'detail': msg}), 502
+
+
+def _wants_stream():
+    return (request.args.get('stream') in ('1', 'true')
+            or 'text/event-stream' in request.headers.get('Accept', ''))
+
+
+def _sse(data, event=None):
+    frame = f'event: {event}\n' if event else ''
+    return frame + f'data: {_json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def _translation_stream_response(content, target, include_post_example=False):
+    """Relay translate_text_stream() to the client as Server-Sent Events.
+
+    Frames: `data: {"delta": "..."}` per piece of text, then `event: done`
+    (or `event: error` if the model fails mid-stream). The first piece is
+    produced before the response starts, so configuration and connection
+    errors still get a normal JSON error status.
+    """
+    pieces = translate_text_stream(content, target)
+    try:
+        first = next(pieces)
+    except StopIteration:
+        return jsonify({'error': 'No translation received from model'}), 502
+    except Exception as e:
+        return _translation_error_response(e, include_post_example)
+
+    def generate():
+        total = len(first)
+        yield _sse({'delta': first})
+        try:
+            for piece in pieces:
+                total += len(piece)
+                yield _sse({'delta': piece})
+        except Exception as e:
+            yield _sse({'error': f'OpenAI call failed: {e}', 'detail': str(e)}, event='error')
+            return
+        yield _sse({'chars': total}, event='done')
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # ask reverse proxies (nginx, Vercel) not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _wants_async():
+    return (request.args.get('async') in ('1', 'true')
+            or 'respond-async' in request.headers.get('Prefer', ''))
+
+
+def _enqueue_response(kind, payload):
+    """Queue a background job: 202 with its id, or 429 when the queue is full."""
+    try:
+        job = jobs.enqueue(kind, payload, current_user_id())
+    except jobs.QueueFullError as e:
+        response = jsonify({'error': 'Too many queued jobs, try again later', 'retry_after': round(e.retry_after)})
+        response.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+        return response, 429
+    status_url = url_for('job.get_job', job_id=job.id)
+    response = jsonify({'job_id': job.id, 'state': job.state, 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+def _job_translation(content, target, include_post_example=False):
+    """Run translate_text for a job, failing with the body/status the
+    synchronous endpoint would have returned."""
+    try:
+        translated = translate_text(content, target)
+    except Exception as e:
+        response, status = _translation_error_response(e, include_post_example)
+        raise jobs.JobFailed(response.get_json(), status)
+    if not translated:
+        raise jobs.JobFailed({'error': 'No translation received from model'}, 502)
+    return {'translated': translated}
+
+
+@jobs.handler('translate_text')
+def _translate_text_job(payload):
+    return _job_translation(payload['content'], payload['target_lang'])
+
+
+@jobs.handler('translate_note')
+def _translate_note_job(payload):
+    note = db.session.get(Note, payload['note_id'])
+    if note is None:
+        raise jobs.JobFailed({'error': 'Note not found'}, 404)
+    return _job_translation(note.content or '', payload['target_lang'], include_post_example=True)
+
+
 @note_bp.route('/notes/translate', methods=['POST'])
 def translate_free_text():
     """Translate arbitrary text provided in the request body.
 
     Request JSON: { content: "...", target_lang: "zh" }
+    Add ?stream=1 (or Accept: text/event-stream) to receive Server-Sent Events,
+    or ?async=1 (Prefer: respond-async) to get a 202 with a job id to poll.
     """
     try:
         data = request.json
@@ -143,43 +919,16 @@ def translate_free_text():
         target = data['target_lang']
         content = data['content']
 
+        if _wants_async():
+            return _enqueue_response('translate_text', {'content': content or '', 'target_lang': target})
+
+        if _wants_stream():
+            return _translation_stream_response(content or '', target)
+
         try:
             translated = translate_text(content or '', target)
-        except RuntimeError as re:
-            msg = str(re)
-            return jsonify({
-                'error': 'OpenAI call failed: No API key configured',
-                'detail': msg,
-                'suggestions': [
-                    'Set OPENAI_API_KEY in the environment or create a .env file with OPENAI_API_KEY=sk-...',
-                    'For quick local testing without a key, set MOCK_TRANSLATION=1 in your environment (development only).',
-                    'If you intended to call GitHub-hosted models, set GITHUB_TOKEN and optionally BASE_URL.'
-                ]
-            }), 500
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            msg = str(e)
-            low = msg.lower()
-            if 'timeout' in low or 'timed out' in low or 'connect' in low:
-                example_curl = {
-                    'ipv4': "curl --ipv4 -v https://api.openai.com/v1/models -H \"Authorization: Bearer $OPENAI_API_KEY\"",
-                }
-                suggestions = [
-                    'Your server could not reach the OpenAI endpoint (TCP timeout). Common causes: local firewall, corporate network proxy, ISP filtering, or IPv6 routing problems.',
-                    'Quick test: force IPv4 and check connectivity using curl (example): ' + example_curl['ipv4'],
-                    'If IPv4 works but IPv6 does not, consider forcing IPv4 or disabling IPv6 on the server/network, or use a VPN.',
-                    'If your network requires a proxy, set HTTPS_PROXY/HTTP_PROXY environment variables for the Flask process.',
-                    'Alternatively try from another network (mobile hotspot) or use a VPN to confirm whether it is an ISP/network issue.'
-                ]
-                return jsonify({
-                    'error': 'OpenAI call failed: Request timed out',
-                    'detail': msg,
-                    'suggestions': suggestions,
-                    'curl_examples': example_curl
-                }), 504
-
-            return jsonify({'error': f'OpenAI call failed: {msg}', 'detail': msg}), 502
+            return _translation_error_response(e)
 
         if not translated:
             return jsonify({'error': 'No translation received from model'}), 502
@@ -195,7 +944,8 @@ def translate_note(note_id):
     """Translate a note's content using the configured OpenAI-compatible endpoint.
 
     Request JSON: { "target_lang": "zh" } or { "target_lang": "en" }
-    Returns: { translated: "..." }
+    Returns: { translated: "..." }, Server-Sent Events with ?stream=1
+    (or Accept: text/event-stream), or 202 { job_id, status_url } with ?async=1.
     """
     try:
         data = request.json
@@ -203,48 +953,21 @@ def translate_note(note_id):
             return jsonify({'error': 'target_lang is required'}), 400
 
         target = data['target_lang']
-        note = Note.query.get_or_404(note_id)
+        note = _owned_note(note_id)
+        if note is None:
+            return jsonify({'error': 'Note not found'}), 404
+
+        if _wants_async():
+            return _enqueue_response('translate_note', {'note_id': note_id, 'target_lang': target})
+
+        if _wants_stream():
+            return _translation_stream_response(note.content or '', target, include_post_example=True)
 
         # Use shared translate_text helper which encapsulates client selection.
         try:
             translated = translate_text(note.content or '', target)
-        except RuntimeError as re:
-            # Likely cause: no API key configured
-            msg = str(re)
-            return jsonify({
-                'error': 'OpenAI call failed: No API key configured',
-                'detail': msg,
-                'suggestions': [
-                    'Set OPENAI_API_KEY in the environment or create a .env file with OPENAI_API_KEY=sk-...',
-                    'For quick local testing without a key, set MOCK_TRANSLATION=1 in your environment (development only).',
-                    'If you intended to call GitHub-hosted models, set GITHUB_TOKEN and optionally BASE_URL.'
-                ]
-            }), 500
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            msg = str(e)
-            low = msg.lower()
-            if 'timeout' in low or 'timed out' in low or 'connect' in low:
-                example_curl = {
-                    'ipv4': "curl --ipv4 -v https://api.openai.com/v1/models -H \"Authorization: Bearer $OPENAI_API_KEY\"",
-                    'post_example': "curl --ipv4 -s -X POST https://api.openai.com/v1/chat/completions -H \"Authorization: Bearer $OPENAI_API_KEY\" -H \"Content-Type: application/json\" -d '{\"model\":\"gpt-4.1-mini\",\"messages\": [{\"role\":\"user\",\"content\":\"Say hi in Chinese\"}]}'"
-                }
-                suggestions = [
-                    'Your server could not reach the OpenAI endpoint (TCP timeout). Common causes: local firewall, corporate network proxy, ISP filtering, or IPv6 routing problems.',
-                    'Quick test: force IPv4 and check connectivity using curl (example): ' + example_curl['ipv4'],
-                    'If IPv4 works but IPv6 does not, consider forcing IPv4 or disabling IPv6 on the server/network, or use a VPN.',
-                    'If your network requires a proxy, set HTTPS_PROXY/HTTP_PROXY environment variables for the Flask process.',
-                    'Alternatively try from another network (mobile hotspot) or use a VPN to confirm whether it is an ISP/network issue.'
-                ]
-                return jsonify({
-                    'error': 'OpenAI call failed: Request timed out',
-                    'detail': msg,
-                    'suggestions': suggestions,
-                    'curl_examples': example_curl
-                }), 504
-
-            return jsonify({'error': f'OpenAI call failed: {msg}', 'detail': msg}), 502
+            return _translation_error_response(e, include_post_example=True)
 
         if not translated:
             return jsonify({'error': 'No translation received from model'}), 502
@@ -254,3 +977,87 @@ def translate_note(note_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+MAX_BATCH_TRANSLATE = 200
+
+
+def _batch_rows(ids, target, user_id=None):
+    """Translate `user_id`'s notes in `ids`, yielding {id, translated|error}
+    rows as they complete (unknown ids last)."""
+    # one IN query for all requested notes
+    notes = Note.query.filter(Note.id.in_(ids), Note.owned_by(user_id)).options(
+        load_only(Note.id, Note.content)).all()
+    contents = {note.id: note.content or '' for note in notes}
+    for note_id, translated, error in iter_translate_batch([(i, contents[i]) for i in ids if i in contents], target):
+        if error is not None:
+            yield {'id': note_id, 'error': f'OpenAI call failed: {error}'}
+        else:
+            yield {'id': note_id, 'translated': translated}
+    for note_id in ids:
+        if note_id not in contents:
+            yield {'id': note_id, 'error': 'Note not found'}
+
+
+@jobs.handler('translate_batch')
+def _translate_batch_job(payload):
+    ids = payload['ids']
+    try:
+        by_id = {row['id']: row for row in _batch_rows(ids, payload['target_lang'], payload.get('user_id'))}
+    except Exception as e:
+        response, status = _translation_error_response(e)
+        raise jobs.JobFailed(response.get_json(), status)
+    return {'results': [by_id[i] for i in ids]}
+
+
+@note_bp.route('/notes/translate/batch', methods=['POST'])
+def translate_batch():
+    """Translate several notes in one call.
+
+    Request JSON: { "ids": [1, 2, ...], "target_lang": "zh" }
+    Returns { results: [{id, translated} | {id, error}, ...] } in request
+    order, with ?stream=1 one NDJSON line per note as each finishes, or with
+    ?async=1 a 202 job whose result has the same shape.
+    Short notes are packed several per LLM request; results land in the
+    translation cache, so later per-note translations are served from it.
+    """
+    data = request.json
+    if not data or 'target_lang' not in data or not isinstance(data.get('ids'), list):
+        return jsonify({'error': 'ids (list) and target_lang are required'}), 400
+    try:
+        ids = list(dict.fromkeys(int(i) for i in data['ids']))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be integers'}), 400
+    if len(ids) > MAX_BATCH_TRANSLATE:
+        return jsonify({'error': f'At most {MAX_BATCH_TRANSLATE} ids per batch'}), 400
+    target = data['target_lang']
+    payload = {'ids': ids, 'target_lang': target, 'user_id': current_user_id()}
+
+    if _wants_async():
+        return _enqueue_response('translate_batch', payload)
+
+    if request.args.get('stream') in ('1', 'true'):
+        rows = _batch_rows(ids, target, payload['user_id'])
+        try:
+            first = next(rows)
+        except StopIteration:
+            return stream_json(iter(()), 'ndjson')
+        except Exception as e:
+            return _translation_error_response(e)
+        return stream_json(itertools.chain([first], rows), 'ndjson')
+
+    try:
+        return jsonify(_translate_batch_job(payload))
+    except jobs.JobFailed as e:
+        return jsonify(e.body), e.status
+
+
+@note_bp.route('/note-cache/stats', methods=['GET'])
+def note_cache_stats():
+    """Backend, generation and hit/miss counters per entry kind."""
+    return jsonify(get_note_cache().stats(current_user_id()))
+
+
+@note_bp.route('/translation-cache/stats', methods=['GET'])
+def translation_cache_stats():
+    """Hit/miss counters and sizes for both translation cache tiers."""
+    return jsonify(translation_cache.stats())
@@ -1,5 +1,9 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, session
+from sqlalchemy import delete
 from src.models.user import User, db
+from src.models.note import Note, NoteEmbedding, NoteTag, NoteTombstone
+from src import semantic
+from src.note_cache import get_note_cache
 
 user_bp = Blueprint('user', __name__)
 
@@ -34,6 +38,35 @@ def update_user(user_id):
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
+    # their notes go too; SQLite does not enforce the ON DELETE CASCADE
+    note_ids = [nid for (nid,) in db.session.query(Note.id).filter(Note.owned_by(user_id))]
+    db.session.execute(delete(NoteTag).where(NoteTag.owned_by(user_id)))
+    db.session.execute(delete(NoteEmbedding).where(NoteEmbedding.owned_by(user_id)))
+    db.session.execute(delete(Note).where(Note.owned_by(user_id)))
+    # the change counter stays, so a reused id never repeats a sequence number
+    db.session.execute(delete(NoteTombstone).where(NoteTombstone.owned_by(user_id)))
     db.session.delete(user)
     db.session.commit()
+    get_note_cache().invalidate(note_ids, user_id)
+    semantic.drop_owner(user_id)
+    return '', 204
+
+@user_bp.route('/login', methods=['POST'])
+def login():
+    """Work on this user's notes for the rest of the session.
+
+    Request JSON: {"user_id": 1}. There is no password, so anyone can act
+    as any user: not authenticated. Before exposing the app to several
+    people, put it behind a proxy that authenticates them (see src/auth.py).
+    """
+    data = request.json or {}
+    user = db.session.get(User, data.get('user_id')) if isinstance(data.get('user_id'), int) else None
+    if user is None:
+        return jsonify({'error': 'User not found'}), 404
+    session['user_id'] = user.id
+    return jsonify(user.to_dict())
+
+@user_bp.route('/logout', methods=['POST'])
+def logout():
+    session.pop('user_id', None)
     return '', 204
@@ -0,0 +1,259 @@
+"""Full-text search backends for notes.
+
+`init_search(app)` picks a backend once at startup and stores it in
+`app.extensions['note_search']`; routes call `get_search_backend()`.
+
+Backends:
+  - SqliteFtsBackend: FTS5 virtual table kept in sync with `note` by triggers,
+    ranked with bm25() and highlighted with snippet().
+  - PostgresFtsBackend: GIN index over a tsvector expression, ranked with
+    ts_rank_cd() and highlighted with ts_headline().
+  - LikeSearchBackend: the original `LIKE '%q%'` scan, used as a fallback
+    and as the baseline in benchmarks/bench_search.py.
+
+Set SEARCH_BACKEND=like|fts|auto (default auto) to override the choice.
+"""
+
+import os
+import re
+
+from flask import current_app
+from sqlalchemy import text
+
+from src.models.note import Note
+
+# Highlight markers wrapped around matched terms in snippets.
+MARK_START = '<mark>'
+MARK_END = '</mark>'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_tokens(query):
+    """Split a user query into plain word tokens (operators are dropped)."""
+    return _TOKEN_RE.findall(query or '')
+
+
+class SearchBackend:
+    """Base class: returns a ranked list of (note_id, rank, snippet) over
+    the notes of `owner` (a user id; None for the shared notes)."""
+
+    name = 'base'
+
+    def install(self, engine):
+        """Create whatever index structures the backend needs (idempotent)."""
+
+    def installed(self, engine):
+        """True when install() has already run against `engine` (one cheap
+        catalog query)."""
+        return True
+
+    def search(self, session, query, limit=50, owner=None):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(SearchBackend):
+    """Unindexed substring match; every query is a full table scan."""
+
+    name = 'like'
+
+    def search(self, session, query, limit=50, owner=None):
+        query = (query or '').strip()
+        if not query:
+            return []
+        notes = session.query(Note.id, Note.title, Note.content).filter(
+            Note.owned_by(owner),
+            (Note.title.contains(query)) | (Note.content.contains(query))
+        ).order_by(Note.updated_at.desc()).limit(limit).all()
+        return [(nid, None, _like_snippet(title, content, query)) for nid, title, content in notes]
+
+
+def _like_snippet(title, content, query, width=60):
+    for source in (content or '', title or ''):
+        idx = source.lower().find(query.lower())
+        if idx >= 0:
+            start = max(0, idx - width)
+            end = min(len(source), idx + len(query) + width)
+            return (
+                ('…' if start > 0 else '')
+                + source[start:idx]
+                + MARK_START + source[idx:idx + len(query)] + MARK_END
+                + source[idx + len(query):end]
+                + ('…' if end < len(source) else '')
+            )
+    return (content or '')[:2 * width]
+
+
+class SqliteFtsBackend(SearchBackend):
+    """SQLite FTS5 index over note.title/note.content.
+
+    The FTS table is an external-content table (it stores only the index,
+    not a second copy of the text) and is kept current by triggers, so any
+    write path - ORM, bulk insert or raw SQL - stays searchable. It also
+    indexes note.user_id, so a user's search intersects the query terms with
+    that user's rows inside FTS5 instead of ranking every user's matches
+    and filtering afterwards.
+    """
+
+    name = 'sqlite-fts5'
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer or os.getenv('SEARCH_FTS_TOKENIZER', 'unicode61 remove_diacritics 2')
+
+    def install(self, engine):
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='note_fts'"
+            )).first()
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS note_fts USING fts5("
+                "title, content, user_id, content='note', content_rowid='id', "
+                f"tokenize='{self.tokenizer}', prefix='2 3')"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS note_fts_ai AFTER INSERT ON note BEGIN "
+                "INSERT INTO note_fts(rowid, title, content, user_id) "
+                "VALUES (new.id, new.title, new.content, new.user_id); "
+                "END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS note_fts_ad AFTER DELETE ON note BEGIN "
+                "INSERT INTO note_fts(note_fts, rowid, title, content, user_id) "
+                "VALUES ('delete', old.id, old.title, old.content, old.user_id); "
+                "END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS note_fts_au AFTER UPDATE OF title, content, user_id ON note BEGIN "
+                "INSERT INTO note_fts(note_fts, rowid, title, content, user_id) "
+                "VALUES ('delete', old.id, old.title, old.content, old.user_id); "
+                "INSERT INTO note_fts(rowid, title, content, user_id) "
+                "VALUES (new.id, new.title, new.content, new.user_id); "
+                "END"
+            ))
+            if not exists:
+                # First install on an existing database: index the current rows.
+                conn.execute(text("INSERT INTO note_fts(note_fts) VALUES ('rebuild')"))
+
+    def installed(self, engine):
+        with engine.connect() as conn:
+            found = conn.execute(text(
+                "SELECT count(*) FROM sqlite_master WHERE name IN "
+                "('note_fts', 'note_fts_ai', 'note_fts_ad', 'note_fts_au')"
+            )).scalar()
+        return found == 4
+
+    @staticmethod
+    def match_expression(query, owner=None):
+        # Quote every token so FTS5 operators in user input are inert, and
+        # make each one a prefix query so results update while typing. The
+        # terms only match title/content, never the user_id column.
+        terms = ' '.join('"{}"*'.format(tok.replace('"', '""')) for tok in query_tokens(query))
+        if not terms:
+            return ''
+        if owner is None:
+            return '{title content} : (%s)' % terms
+        return 'user_id : "%d" AND {title content} : (%s)' % (owner, terms)
+
+    def search(self, session, query, limit=50, owner=None):
+        match = self.match_expression(query, owner)
+        if not match:
+            return []
+        # Shared notes have no user_id token, so they are filtered by a join.
+        shared = '' if owner is not None else (
+            "JOIN note ON note.id = note_fts.rowid AND note.user_id IS NULL ")
+        # bm25() returns lower-is-better scores; weight title hits 10x.
+        rows = session.execute(text(
+            "SELECT note_fts.rowid AS rowid, bm25(note_fts, 10.0, 1.0, 0.0) AS rank, "
+            "snippet(note_fts, 1, :mark_start, :mark_end, '…', 16) AS snippet "
+            f"FROM note_fts {shared}WHERE note_fts MATCH :match ORDER BY rank LIMIT :limit"
+        ), {'match': match, 'mark_start': MARK_START, 'mark_end': MARK_END, 'limit': limit}).all()
+        return [(r.rowid, r.rank, r.snippet) for r in rows]
+
+
+class PostgresFtsBackend(SearchBackend):
+    """Postgres full-text search over an expression GIN index.
+
+    Postgres has no built-in BM25; ts_rank_cd (cover density) is the closest
+    ranking available without extensions.
+    """
+
+    name = 'postgres-tsvector'
+
+    def __init__(self, ts_config=None):
+        ts_config = ts_config or os.getenv('SEARCH_TS_CONFIG', 'simple')
+        if not re.fullmatch(r'\w+', ts_config):
+            raise ValueError(f'invalid text search config: {ts_config!r}')
+        self.ts_config = ts_config
+        # Must match the indexed expression exactly for the planner to use it.
+        self.document = (
+            f"(setweight(to_tsvector('{ts_config}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{ts_config}', coalesce(content, '')), 'B'))"
+        )
+
+    def install(self, engine):
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_note_search ON note USING GIN ({self.document})"
+            ))
+
+    def installed(self, engine):
+        with engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT 1 FROM pg_indexes WHERE tablename = 'note' AND indexname = 'ix_note_search'"
+            )).first() is not None
+
+    @staticmethod
+    def tsquery(query):
+        # Tokens are \w+ only, so they need no further escaping inside a tsquery.
+        return ' & '.join(f'{tok}:*' for tok in query_tokens(query))
+
+    def search(self, session, query, limit=50, owner=None):
+        tsq = self.tsquery(query)
+        if not tsq:
+            return []
+        owned = 'user_id IS NULL' if owner is None else 'user_id = :owner'
+        rows = session.execute(text(
+            f"SELECT id, ts_rank_cd({self.document}, q) AS rank, "
+            f"ts_headline('{self.ts_config}', content, q, :headline_opts) AS snippet "
+            f"FROM note, to_tsquery('{self.ts_config}', :tsq) AS q "
+            f"WHERE {owned} AND {self.document} @@ q ORDER BY rank DESC LIMIT :limit"
+        ), {
+            'tsq': tsq,
+            'owner': owner,
+            'limit': limit,
+            'headline_opts': f'StartSel={MARK_START}, StopSel={MARK_END}, MaxFragments=1, MaxWords=24, MinWords=8',
+        }).all()
+        return [(r.id, r.rank, r.snippet) for r in rows]
+
+
+def choose_backend(engine, preference=None):
+    """Return the best backend for `engine`'s dialect, honouring SEARCH_BACKEND."""
+    preference = (preference or os.getenv('SEARCH_BACKEND', 'auto')).lower()
+    if preference == 'like':
+        return LikeSearchBackend()
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        return SqliteFtsBackend()
+    if dialect == 'postgresql':
+        return PostgresFtsBackend()
+    return LikeSearchBackend()
+
+
+def init_search(app, engine, install=True):
+    """Pick and install the search backend; falls back to LIKE on failure.
+    With install=False (schema already current) the index is only checked
+    for, and installed if an earlier boot left it missing."""
+    backend = choose_backend(engine)
+    try:
+        if install or not backend.installed(engine):
+            backend.install(engine)
+    except Exception as e:
+        print(f'WARNING: could not install {backend.name} search index, falling back to LIKE: {e}')
+        backend = LikeSearchBackend()
+    app.extensions['note_search'] = backend
+    print(f'INFO: Using {backend.name} search backend')
+    return backend
+
+
+def get_search_backend():
+    return current_app.extensions.get('note_search') or LikeSearchBackend()
@@ -0,0 +1,385 @@
+"""Semantic note search: local embeddings ranked by cosine similarity.
+
+Every write embeds the note's title and content into `note_embeddings`
+(float32 bytes) in the same transaction; deleting a note deletes its row.
+Each process keeps one in-memory index per owner - a (n, dim) float32
+matrix of unit vectors and their note ids - built on that owner's first
+query. Before every query the index replays the owner's change feed
+(src/changes.py) from the sequence number it last saw, so writes made by
+any worker or instance are picked up: one primary-key lookup when nothing
+changed, and a read of only the changed rows otherwise. The indexes are
+kept least recently used first within SEMANTIC_MAX_BYTES per process (an
+owner larger than that is still indexed, alone), and each owner has its
+own lock, so building one owner's index never holds up another's queries.
+
+A query is one matrix-vector product plus an argpartition for the top k
+(about 25 ms per 100k notes at 512 dimensions). Setting SEMANTIC_IVF_MIN
+gives owners with at least that many notes an inverted-file partition
+(spherical k-means, about sqrt(n) lists), and a query then only scores
+the notes in its SEMANTIC_IVF_PROBES nearest lists. That is approximate,
+and hashed vectors cluster poorly, so it is off by default;
+benchmarks/bench_semantic.py reports its recall and latency.
+
+Embedders (SEMANTIC_EMBEDDER):
+  hashing      (default) signed feature hashing of words and their
+               character trigrams into SEMANTIC_DIM dimensions. Local, no
+               model files; matches shared words and word forms, not
+               synonyms.
+  module:attr  a factory returning an object with `name`, `dim` and
+               `embed(texts) -> float32 array (len(texts), dim)`, e.g. a
+               wrapper around a sentence-transformers model.
+Notes without a row, or with a row from another embedder, are embedded
+when their owner's index is built (so migration 10 needs no backfill).
+
+Needs numpy. Without it GET /api/notes/semantic answers 503 and writes
+drop the note's stale row instead of embedding it.
+"""
+
+import importlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+try:
+    import numpy as np
+except ImportError:  # optional
+    np = None
+
+from src import changes
+from src.models.note import Note, NoteEmbedding
+
+SEMANTIC_EMBEDDER = os.getenv('SEMANTIC_EMBEDDER', 'hashing')
+SEMANTIC_DIM = int(os.getenv('SEMANTIC_DIM', '512'))
+SEMANTIC_IVF_MIN = int(os.getenv('SEMANTIC_IVF_MIN', '0'))  # 0: never partition
+SEMANTIC_IVF_PROBES = int(os.getenv('SEMANTIC_IVF_PROBES', '16'))
+# memory for all owners' in-memory indexes together, per process
+SEMANTIC_MAX_BYTES = int(os.getenv('SEMANTIC_MAX_BYTES', str(256 * 1024 * 1024)))
+# notes embedded (and upserted) per statement when an index is built
+EMBED_CHUNK_SIZE = 2000
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def note_text(title, content):
+    return f'{title or ""}\n{content or ""}'
+
+
+class HashingEmbedder:
+    """Signed feature hashing of a text's distinct lowercase words, each
+    with its character trigrams (so word forms share features). crc32 (not
+    hash(), which is salted per process) keeps vectors stable across
+    processes and restarts."""
+
+    def __init__(self, dim=SEMANTIC_DIM, trigram_weight=1.0, cache_size=200_000):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+        self.trigram_weight = trigram_weight
+        self._cache = {}
+        self._cache_size = cache_size
+
+    def _features(self, word):
+        # (indices, weights) per word, memoised: vocabularies repeat
+        cached = self._cache.get(word)
+        if cached is None:
+            padded = f'<{word}>'
+            grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+            indices, weights = [], []
+            # the trigrams together weigh `trigram_weight` (L2), however long the word
+            tri = self.trigram_weight / len(grams) ** 0.5
+            for gram, weight in [(word, 1.0)] + [(g, tri) for g in grams]:
+                h = zlib.crc32(gram.encode())
+                indices.append(h % self.dim)
+                weights.append(weight if h & 0x80000000 else -weight)
+            cached = (indices, weights)
+            if len(self._cache) < self._cache_size:
+                self._cache[word] = cached
+        return cached
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, weights = [], []
+            for word in dict.fromkeys(_WORD_RE.findall((text or '').lower())):
+                i, w = self._features(word)
+                indices += i
+                weights += w
+            if indices:
+                out[row] = np.bincount(indices, weights=weights, minlength=self.dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def load_embedder(spec=None):
+    spec = spec or SEMANTIC_EMBEDDER
+    if spec == 'hashing':
+        return HashingEmbedder()
+    module, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module), attr)()
+
+
+class _OwnerIndex:
+    """One owner's vectors; rows [0, n) of `ids`/`vectors` are live."""
+
+    def __init__(self, dim):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.n = 0
+        self.rows = {}
+        self.seq = 0
+        self.centroids = None
+        self.lists = None
+        self.ivf_size = 0
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.vectors.nbytes + (self.lists.nbytes if self.lists is not None else 0)
+
+    def _reserve(self, extra):
+        if self.n + extra <= len(self.ids):
+            return
+        capacity = max(self.n + extra, 2 * len(self.ids), 64)
+        ids = np.zeros(capacity, dtype=np.int64)
+        vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+        ids[:self.n] = self.ids[:self.n]
+        vectors[:self.n] = self.vectors[:self.n]
+        self.ids, self.vectors = ids, vectors
+        if self.lists is not None:
+            lists = np.zeros(capacity, dtype=np.int32)
+            lists[:self.n] = self.lists[:self.n]
+            self.lists = lists
+
+    def upsert(self, note_ids, vectors):
+        self._reserve(len(note_ids))
+        rows = []
+        for note_id in note_ids:
+            row = self.rows.get(note_id)
+            if row is None:
+                row = self.rows[note_id] = self.n
+                self.ids[row] = note_id
+                self.n += 1
+            rows.append(row)
+        if rows:
+            self.vectors[rows] = vectors
+            if self.centroids is not None:
+                self.lists[rows] = np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def remove(self, note_ids):
+        for note_id in note_ids:
+            row = self.rows.pop(note_id, None)
+            if row is None:
+                continue
+            last = self.n - 1
+            if row != last:
+                # move the last row into the hole
+                moved = int(self.ids[last])
+                self.ids[row] = moved
+                self.vectors[row] = self.vectors[last]
+                if self.lists is not None:
+                    self.lists[row] = self.lists[last]
+                self.rows[moved] = row
+            self.n = last
+
+    def maybe_build_ivf(self, min_size=SEMANTIC_IVF_MIN, iterations=8, seed=0):
+        """(Re)partition once the index reaches `min_size` notes or has
+        doubled since the last partition; drop it below `min_size`."""
+        if not min_size or self.n < min_size:
+            self.centroids = self.lists = None
+            return
+        if self.centroids is not None and self.n < 2 * self.ivf_size:
+            return
+        vectors = self.vectors[:self.n]
+        nlist = max(1, int(self.n ** 0.5))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(self.n, size=min(self.n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # an empty list keeps its old centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+        lists = np.zeros(len(self.ids), dtype=np.int32)
+        for start in range(0, self.n, 50_000):
+            lists[start:start + 50_000] = np.argmax(vectors[start:start + 50_000] @ centroids.T, axis=1)
+        self.centroids, self.lists, self.ivf_size = centroids, lists, self.n
+
+    def search(self, query, k, probes=None):
+        """Top-k (note_id, score) for unit vector `query`; exact unless the
+        index is partitioned and `probes` is less than its list count."""
+        vectors = self.vectors[:self.n]
+        candidates = None
+        if self.centroids is not None and probes and probes < len(self.centroids):
+            nearest = np.argpartition(-(self.centroids @ query), probes)[:probes]
+            candidates = np.flatnonzero(np.isin(self.lists[:self.n], nearest))
+            scores = vectors[candidates] @ query
+        else:
+            scores = vectors @ query
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        rows = top if candidates is None else candidates[top]
+        return [(int(self.ids[row]), float(scores[i])) for row, i in zip(rows, top)]
+
+
+def _upsert_rows(session, rows):
+    table = NoteEmbedding.__table__
+    upsert = pg_insert if session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.note_id], set_={
+        'user_id': stmt.excluded.user_id, 'model': stmt.excluded.model, 'vector': stmt.excluded.vector})
+    session.execute(stmt, rows)
+
+
+class SemanticIndex:
+    """Per-owner vector indexes over note_embeddings, for one process."""
+
+    def __init__(self, embedder, max_bytes=SEMANTIC_MAX_BYTES):
+        self.embedder = embedder
+        self.max_bytes = max_bytes
+        self._owners = OrderedDict()  # least recently used first
+        self._owner_locks = {}
+        # guards the two dicts only; syncing runs under the owner's lock
+        self._lock = threading.Lock()
+
+    def write(self, session, notes):
+        """Embed and store `notes`: (note_id, user_id, title, content)
+        tuples. Returns the vectors; does not commit."""
+        vectors = self.embedder.embed([note_text(title, content) for _, _, title, content in notes])
+        if notes:
+            _upsert_rows(session, [
+                {'note_id': note_id, 'user_id': user_id, 'model': self.embedder.name, 'vector': vector.tobytes()}
+                for (note_id, user_id, _, _), vector in zip(notes, vectors)])
+        return vectors
+
+    def _vectors(self, session, owner, note_ids=None):
+        """(ids, vectors) of the owner's notes (or of `note_ids`), embedding
+        and storing the ones whose row is missing or stale."""
+        query = (select(Note.id, NoteEmbedding.model, NoteEmbedding.vector)
+                 .outerjoin(NoteEmbedding, NoteEmbedding.note_id == Note.id)
+                 .where(Note.owned_by(owner)))
+        if note_ids is not None:
+            query = query.where(Note.id.in_(note_ids))
+        ids, vectors, stale = [], [], []
+        for note_id, model, vector in session.execute(query):
+            if model == self.embedder.name:
+                ids.append(note_id)
+                vectors.append(np.frombuffer(vector, dtype=np.float32))
+            else:
+                stale.append(note_id)
+        for start in range(0, len(stale), EMBED_CHUNK_SIZE):
+            chunk = session.execute(select(Note.id, Note.user_id, Note.title, Note.content)
+                                    .where(Note.id.in_(stale[start:start + EMBED_CHUNK_SIZE]))).all()
+            vectors += list(self.write(session, chunk))
+            session.commit()
+            ids += [row[0] for row in chunk]
+        dim = self.embedder.dim
+        return ids, np.array(vectors, dtype=np.float32).reshape(len(ids), dim)
+
+    def _owner_lock(self, owner):
+        with self._lock:
+            return self._owner_locks.setdefault(owner, threading.Lock())
+
+    def _keep(self, owner, index):
+        """Mark `owner` most recently used and evict the least recently used
+        others while over max_bytes."""
+        with self._lock:
+            self._owners[owner] = index
+            self._owners.move_to_end(owner)
+            total = sum(i.nbytes for i in self._owners.values())
+            while total > self.max_bytes and len(self._owners) > 1:
+                _, evicted = self._owners.popitem(last=False)
+                total -= evicted.nbytes
+
+    def drop_owner(self, owner):
+        """Forget `owner`'s in-memory index (their user was deleted)."""
+        with self._lock:
+            self._owners.pop(owner, None)
+            self._owner_locks.pop(owner, None)
+
+    def _sync(self, session, owner):
+        latest = changes.latest_seq(session, owner)
+        with self._lock:
+            index = self._owners.get(owner)
+        if index is None:
+            index = _OwnerIndex(self.embedder.dim)
+            # the sequence is read first, so a write racing with the load
+            # is replayed by the next query
+            index.upsert(*self._vectors(session, owner))
+            index.seq = latest
+        elif latest != index.seq:
+            since, has_more = index.seq, True
+            while has_more:
+                notes, deleted, since, has_more = changes.changes_since(
+                    session, owner, since, EMBED_CHUNK_SIZE, columns=('id',))
+                index.remove(deleted)
+                if notes:
+                    index.upsert(*self._vectors(session, owner, [n.id for n in notes]))
+            index.seq = since
+        index.maybe_build_ivf()
+        self._keep(owner, index)
+        return index
+
+    def search(self, session, query, limit=10, owner=None, probes=None):
+        """[(note_id, score)] of `owner`'s notes nearest to `query`, best
+        first. `probes` is the number of IVF lists to scan (default
+        SEMANTIC_IVF_PROBES, 0 for an exact search). May commit embeddings
+        it had to compute."""
+        vector = self.embedder.embed([query])[0]
+        if not vector.any():
+            return []
+        with self._owner_lock(owner):
+            index = self._sync(session, owner)
+            return index.search(vector, limit, SEMANTIC_IVF_PROBES if probes is None else probes)
+
+
+def index_notes(session, notes):
+    """Store embeddings for `notes` ((note_id, user_id, title, content)
+    tuples) whose title or content changed. Does not commit."""
+    index = get_semantic_index()
+    if index is not None:
+        index.write(session, notes)
+    else:
+        forget_notes(session, [n[0] for n in notes])
+
+
+def forget_notes(session, note_ids):
+    """Delete the embeddings of `note_ids` (SQLite does not enforce the
+    ON DELETE CASCADE). Does not commit."""
+    if note_ids:
+        session.execute(delete(NoteEmbedding).where(NoteEmbedding.note_id.in_(list(note_ids))))
+
+
+def drop_owner(user_id):
+    """Release a deleted user's in-memory index in this process."""
+    index = get_semantic_index()
+    if index is not None:
+        index.drop_owner(user_id)
+
+
+def init_semantic(app):
+    index = None
+    if np is None:
+        print('WARNING: numpy is not installed; semantic search disabled')
+    else:
+        try:
+            index = SemanticIndex(load_embedder())
+            print(f'INFO: Semantic search embedder: {index.embedder.name}')
+        except Exception as e:
+            print(f'WARNING: could not load embedder {SEMANTIC_EMBEDDER!r}; semantic search disabled: {e}')
+    app.extensions['semantic_index'] = index
+    return index
+
+
+def get_semantic_index():
+    return current_app.extensions.get('semantic_index')
@@ -0,0 +1,152 @@
+"""Response encoding: a faster JSON provider, row serialization and
+MessagePack.
+
+  - `init_serialization(app)` installs NoteJSONProvider as `app.json`, so
+    jsonify(), request.get_json() and the streamed responses all go
+    through it. It encodes with orjson when the optional package is
+    installed (JSON_BACKEND=auto, the default) and with the standard
+    library otherwise (or with JSON_BACKEND=stdlib). Either way dates and
+    datetimes come out as ISO 8601, keys keep their order and non-ASCII
+    text is sent as UTF-8, so both backends produce the same JSON.
+  - `note_select(fields)` / `note_dicts(rows, fields)` serialize notes
+    straight from column tuples: no ORM objects, and no to_dict() or
+    isoformat() per row. GET /api/notes and the export use them.
+  - When the optional `msgpack` package is installed, a request whose
+    Accept header prefers application/msgpack gets its jsonify() response
+    as MessagePack instead (streamed NDJSON/JSON responses excepted).
+    Such responses carry `Vary: Accept`.
+"""
+
+import datetime
+import decimal
+import json
+import os
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+from src.models.note import Note
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto').lower()
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+# what a client may ask for; the first is the default for */*
+_OFFERED = ('application/json', MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+
+def _default(o):
+    """Types neither encoder handles natively (orjson also does the
+    datetime and date cases itself, in the same format)."""
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def wants_msgpack():
+    """True when MessagePack is available and the request prefers it."""
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match(_OFFERED) in _OFFERED[1:]
+
+
+def packb(obj):
+    return msgpack.packb(obj, default=_default, use_bin_type=True, datetime=False)
+
+
+class NoteJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson underneath (when `use_orjson`) and
+    MessagePack negotiation in response()."""
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app, use_orjson=None):
+        super().__init__(app)
+        if use_orjson is None:
+            use_orjson = orjson is not None and JSON_BACKEND != 'stdlib'
+        self.use_orjson = use_orjson
+
+    @property
+    def name(self):
+        return 'orjson' if self.use_orjson else 'stdlib'
+
+    def _indent(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps_bytes(self, obj):
+        """UTF-8 encoded JSON for `obj`."""
+        if self.use_orjson:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if self._indent() else 0)
+            return orjson.dumps(obj, default=_default, option=option)
+        # the indent/separators choice DefaultJSONProvider.response() makes
+        layout = {'indent': 2} if self._indent() else {'separators': (',', ':')}
+        return self.dumps(obj, **layout).encode()
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return self.dumps_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if wants_msgpack():
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+        if msgpack is not None:
+            response.vary.add('Accept')
+        return response
+
+
+def transcode(body):
+    """A cached JSON body as MessagePack, for clients that asked for it."""
+    return packb(orjson.loads(body) if orjson is not None else json.loads(body))
+
+
+def note_select(fields=None, keys=()):
+    """SELECT of the Note columns behind `fields` (default Note.FIELDS,
+    `content_preview` included), followed by any `keys` the caller needs
+    but doesn't send, such as keyset cursor columns."""
+    fields = tuple(fields or Note.FIELDS)
+    names = fields + tuple(k for k in keys if k not in fields)
+    return select(*(getattr(Note, name) for name in names))
+
+
+def note_dicts(rows, fields=None):
+    """One dict per row of a note_select(fields) result, as to_dict(fields)
+    would build it but with datetimes left to the encoder. Trailing key
+    columns are dropped."""
+    fields = tuple(fields or Note.FIELDS)
+    with_tags = 'tags' in fields
+    for row in rows:
+        item = dict(zip(fields, row))
+        if with_tags and not item['tags']:
+            item['tags'] = []
+        yield item
+
+
+def init_serialization(app):
+    app.json = NoteJSONProvider(app)
+    print(f'INFO: JSON encoder: {app.json.name}' + (', MessagePack available' if msgpack is not None else ''))
+    return app.json
@@ -0,0 +1,34 @@
+"""Apply text edits sent by the editor as splices.
+
+An op is {"at": offset, "delete": count, "insert": "text"}. Ops apply in
+order, and each offset refers to the text as left by the previous op.
+Offsets and counts are in UTF-16 code units, the unit of JavaScript string
+indices, so they agree with the browser for text outside the BMP (emoji).
+"""
+
+
+class SpliceError(ValueError):
+    """An op is malformed, out of range or splits a surrogate pair."""
+
+
+def apply_splices(text, ops):
+    if not isinstance(ops, list):
+        raise SpliceError('ops must be a list')
+    buf = (text or '').encode('utf-16-le')
+    for i, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise SpliceError(f'op {i} must be an object')
+        at = op.get('at')
+        delete = op.get('delete', 0)
+        insert = op.get('insert', '')
+        if not isinstance(at, int) or not isinstance(delete, int) or at < 0 or delete < 0:
+            raise SpliceError(f'op {i}: at and delete must be non-negative integers')
+        if not isinstance(insert, str):
+            raise SpliceError(f'op {i}: insert must be a string')
+        if at + delete > len(buf) // 2:
+            raise SpliceError(f'op {i}: range {at}..{at + delete} is past the end of the text ({len(buf) // 2})')
+        buf = buf[:2 * at] + insert.encode('utf-16-le', 'surrogatepass') + buf[2 * (at + delete):]
+    try:
+        return buf.decode('utf-16-le')
+    except UnicodeDecodeError:
+        raise SpliceError('ops split a surrogate pair') from None
@@ -0,0 +1,65 @@
+"""Database preparation at boot, or deferred to the first request.
+
+`prepare_database()` applies pending migrations (src/migrate.py) and
+installs the search index. A boot against an up-to-date database only
+reads the version from `schema_version` and checks that the search index
+exists (reinstalling it if an earlier boot failed to).
+
+STARTUP_MODE picks when this runs:
+  - eager (default outside Vercel): at import, as before
+  - lazy  (default on Vercel): once, before the first request, or ahead of
+    time with `flask --app src.main warmup` / `python -m src.migrate`
+"""
+
+import os
+import threading
+import time
+
+from flask import jsonify
+
+from src import migrate
+from src.search import init_search
+
+STARTUP_MODE = os.getenv('STARTUP_MODE') or ('lazy' if os.environ.get('VERCEL') else 'eager')
+
+
+def prepare_database(app, db):
+    """Migrate the schema unless schema_version says it is already current."""
+    started = time.perf_counter()
+    with app.app_context():
+        engine = db.engine
+        if migrate.is_current(engine):
+            init_search(app, engine, install=False)
+            print(f'INFO: Schema current (version {migrate.latest_version()}), checked in {(time.perf_counter() - started) * 1000:.1f}ms')
+            return False
+        applied = migrate.upgrade(engine)
+        init_search(app, engine)
+    print(f'INFO: Applied {len(applied)} schema migration(s) in {(time.perf_counter() - started) * 1000:.1f}ms')
+    return True
+
+
+def install_warmup(app, warmup):
+    """Run `warmup()` exactly once, before the first request that needs it."""
+    lock = threading.Lock()
+    state = {'done': False}
+
+    @app.before_request
+    def _warm_once():
+        if state['done']:
+            return
+        with lock:
+            if not state['done']:
+                try:
+                    warmup()
+                except Exception as e:
+                    # leave `done` unset so the next request tries again
+                    print(f'WARNING: database warmup failed: {type(e).__name__}: {e}')
+                    return jsonify({'error': 'Database unavailable', 'detail': str(e)}), 503
+                state['done'] = True
+
+    @app.cli.command('warmup')
+    def warmup_command():
+        """Prepare the database schema now instead of on the first request."""
+        with lock:
+            warmup()
+            state['done'] = True
@@ -0,0 +1,67 @@
+"""Streaming JSON/NDJSON responses for large result sets.
+
+Rows are pulled from the database in batches (`yield_per`, which also turns
+on server-side cursors for Postgres) and written out as they are encoded, so
+peak memory depends on the batch size rather than on the number of notes.
+"""
+
+from flask import Response, current_app, stream_with_context
+
+# Rows fetched per round trip while streaming
+STREAM_BATCH_SIZE = 500
+# Encoded output is buffered up to roughly this many characters per chunk
+CHUNK_CHARS = 64 * 1024
+
+
+def iter_rows(session, statement, batch_size=STREAM_BATCH_SIZE):
+    """Iterate the tuples of a select() without loading them all at once."""
+    return session.execute(statement, execution_options={'yield_per': batch_size}).tuples()
+
+
+def _chunked(pieces):
+    buf, size = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_CHARS:
+            yield ''.join(buf)
+            buf, size = [], 0
+    if buf:
+        yield ''.join(buf)
+
+
+def iter_json_array(items):
+    """Encode an iterable of dicts as one JSON array, piece by piece."""
+    dumps = current_app.json.dumps
+    yield '['
+    first = True
+    for item in items:
+        if first:
+            first = False
+            yield dumps(item)
+        else:
+            yield ',' + dumps(item)
+    yield ']'
+
+
+def iter_ndjson(items):
+    """Encode an iterable of dicts as newline-delimited JSON."""
+    dumps = current_app.json.dumps
+    for item in items:
+        yield dumps(item) + '\n'
+
+
+def stream_json(items, fmt='json', filename=None):
+    """Return a streamed Response for `items` in `json` or `ndjson` format.
+
+    `items` is consumed lazily inside the request context, so it may be a
+    generator over a live query.
+    """
+    if fmt == 'ndjson':
+        body, mimetype = iter_ndjson(items), 'application/x-ndjson'
+    else:
+        body, mimetype = iter_json_array(items), 'application/json'
+    response = Response(stream_with_context(_chunked(body)), mimetype=mimetype)
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
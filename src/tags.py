@@ -0,0 +1,108 @@
+"""Tag index over Note.tags.
+
+Note.tags (JSON) stays the source of truth for what a note shows; the
+`note_tags` table (NoteTag) mirrors it as one row per (tag, note), with
+the note's owner copied alongside, so that `GET /api/notes?tag=...` and
+`GET /api/tags` are lookups in one user's part of the (user_id, tag)
+index on both SQLite and Postgres. Every write path that changes tags calls
+`set_note_tags` in the same transaction, and `clear_note_tags` before a
+note is deleted (SQLite does not enforce the ON DELETE CASCADE).
+"""
+
+from sqlalchemy import delete, func, insert, null, select
+
+from src.models.note import Note, NoteTag
+
+MAX_TAG_LENGTH = 100
+MAX_FILTER_TAGS = 20
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def normalize_tags(tags):
+    """Stripped, de-duplicated tags in their original order.
+
+    Raises ValueError for anything but a list of strings, or a tag longer
+    than MAX_TAG_LENGTH.
+    """
+    if tags is None:
+        return []
+    if not isinstance(tags, list):
+        raise ValueError('tags must be a list of strings')
+    seen = {}
+    for tag in tags:
+        if not isinstance(tag, str):
+            raise ValueError('tags must be a list of strings')
+        tag = tag.strip()
+        if len(tag) > MAX_TAG_LENGTH:
+            raise ValueError(f'tags must be at most {MAX_TAG_LENGTH} characters')
+        if tag:
+            seen.setdefault(tag, None)
+    return list(seen)
+
+
+def set_note_tags(session, note_id, tags, user_id=None):
+    """Make note_tags match `tags` (already normalized) for one note of
+    `user_id`, writing only the rows that changed. Does not commit."""
+    table = NoteTag.__table__
+    current = set(session.execute(select(table.c.tag).where(table.c.note_id == note_id)).scalars())
+    wanted = set(tags)
+    if current - wanted:
+        session.execute(delete(table).where(table.c.note_id == note_id, table.c.tag.in_(current - wanted)))
+    if wanted - current:
+        session.execute(insert(table), [{'tag': tag, 'note_id': note_id, 'user_id': user_id}
+                                        for tag in wanted - current])
+
+
+def clear_note_tags(session, note_ids):
+    table = NoteTag.__table__
+    session.execute(delete(table).where(table.c.note_id.in_(list(note_ids))))
+
+
+def tag_filter(tags, mode='all', user_id=None):
+    """Criterion on Note.id for `user_id`'s notes carrying all (or any) of
+    `tags`."""
+    table = NoteTag.__table__
+    matching = select(table.c.note_id).where(NoteTag.owned_by(user_id), table.c.tag.in_(tags))
+    if mode == 'all' and len(tags) > 1:
+        # (tag, note_id) is the primary key, so count(*) counts distinct tags
+        matching = matching.group_by(table.c.note_id).having(func.count() == len(tags))
+    return Note.id.in_(matching)
+
+
+def tag_counts(session, prefix=None, limit=None, user_id=None):
+    """[(tag, count)] for `user_id`'s notes, most used first, read from the
+    index only."""
+    table = NoteTag.__table__
+    count = func.count().label('count')
+    query = (select(table.c.tag, count).where(NoteTag.owned_by(user_id))
+             .group_by(table.c.tag).order_by(count.desc(), table.c.tag))
+    if prefix:
+        # a range on the index rather than LIKE, which ignores it
+        query = query.where(table.c.tag >= prefix, table.c.tag < prefix + '\U0010ffff')
+    if limit:
+        query = query.limit(limit)
+    return session.execute(query).all()
+
+
+def backfill(conn):
+    """Rebuild note_tags from every note's JSON tags (migration 6)."""
+    from src.migrate import has_column
+    note, table = Note.__table__, NoteTag.__table__
+    # migration 6 runs before note.user_id exists (8), when every note is shared
+    owner = note.c.user_id if has_column(conn, 'note', 'user_id') else null()
+    conn.execute(delete(table))
+    rows = []
+    result = conn.execution_options(stream_results=True, yield_per=BACKFILL_CHUNK_SIZE).execute(
+        select(note.c.id, owner, note.c.tags).where(note.c.tags.isnot(None)))
+    for note_id, user_id, tags in result:
+        try:
+            tags = normalize_tags(tags)
+        except ValueError:
+            # legacy rows with non-list JSON keep their value but stay unindexed
+            continue
+        rows.extend({'tag': tag, 'note_id': note_id, 'user_id': user_id} for tag in tags)
+        if len(rows) >= BACKFILL_CHUNK_SIZE:
+            conn.execute(insert(table), rows)
+            rows = []
+    if rows:
+        conn.execute(insert(table), rows)
@@ -0,0 +1,178 @@
+"""Two-tier, content-addressed cache for LLM translations.
+
+Entries are keyed on sha256(model, target_lang, prompt), so re-translating
+the same text - from the same note, another note or the free-text endpoint -
+never calls the model twice.
+
+  memory tier   per-process LRU with TTL and entry/byte limits
+  database tier `translation_cache` table; survives restarts and Vercel cold
+                starts, and is shared by all workers
+
+The database tier needs a Flask app context and is skipped without one (e.g.
+when src/llm.py runs as a script). Configure with TRANSLATION_CACHE_TTL,
+TRANSLATION_CACHE_DB_TTL (seconds), TRANSLATION_CACHE_MAX_ENTRIES,
+TRANSLATION_CACHE_MAX_BYTES and TRANSLATION_CACHE_PERSIST=0|1.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from src.cache import TTLCache
+
+MEMORY_TTL = int(os.getenv('TRANSLATION_CACHE_TTL', str(24 * 3600)))
+DB_TTL = int(os.getenv('TRANSLATION_CACHE_DB_TTL', str(30 * 24 * 3600)))
+PERSIST = os.getenv('TRANSLATION_CACHE_PERSIST', '1') in ('1', 'true', 'True')
+
+_memory = TTLCache(
+    max_entries=int(os.getenv('TRANSLATION_CACHE_MAX_ENTRIES', '1000')),
+    max_bytes=int(os.getenv('TRANSLATION_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+    ttl=MEMORY_TTL,
+)
+_counters = {'lookups': 0, 'db_hits': 0, 'db_misses': 0, 'db_errors': 0, 'stores': 0, 'invalidations': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+
+def source_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def cache_key(model, target_lang, prompt):
+    h = hashlib.sha256()
+    for part in (model, target_lang, prompt):
+        h.update((part or '').encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _db():
+    """Return (db, CachedTranslation) when the persistent tier is usable."""
+    if not PERSIST:
+        return None
+    from flask import has_app_context
+    if not has_app_context():
+        return None
+    from src.models.translation import CachedTranslation, db
+    return db, CachedTranslation
+
+
+def get(key):
+    """Return the cached translation for `key`, or None."""
+    _count('lookups')
+    entry = _memory.get(key)
+    if entry is not None:
+        return entry[1]
+
+    backend = _db()
+    if backend is None:
+        return None
+    db, CachedTranslation = backend
+    table = CachedTranslation.__table__
+    try:
+        # Core connection: never touches (or commits) the request's ORM session
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                table.select().where(table.c.key == key)
+            ).first()
+        if row is not None and row.created_at and row.created_at < datetime.utcnow() - timedelta(seconds=DB_TTL):
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.key == key))
+            row = None
+    except Exception as e:
+        _count('db_errors')
+        print(f'WARNING: translation cache lookup failed: {e}')
+        return None
+
+    if row is None:
+        _count('db_misses')
+        return None
+    _count('db_hits')
+    _memory.set(key, (row.source_hash, row.translated), size=sys.getsizeof(row.translated))
+    return row.translated
+
+
+def put(key, translated, source_text, model, target_lang):
+    """Store a translation in both tiers."""
+    shash = source_hash(source_text)
+    _memory.set(key, (shash, translated), size=sys.getsizeof(translated))
+    _count('stores')
+
+    backend = _db()
+    if backend is None:
+        return
+    db, CachedTranslation = backend
+    table = CachedTranslation.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.key == key))
+            conn.execute(table.insert().values(
+                key=key, source_hash=shash, model=model, target_lang=target_lang,
+                translated=translated, created_at=datetime.utcnow(),
+            ))
+    except Exception as e:
+        _count('db_errors')
+        print(f'WARNING: translation cache store failed: {e}')
+
+
+def _text_hashes(text):
+    """Hashes of `text` and of the chunks src/llm.py splits it into for
+    translation (those are cached per chunk, under the chunk's own hash)."""
+    from src.llm import split_into_chunks
+    chunks, _ = split_into_chunks(text or '')
+    return {source_hash(text)} | {source_hash(chunk) for chunk in chunks if chunk.strip()}
+
+
+def invalidate_text(old_text, new_text=''):
+    """Forget cached translations of the parts of `old_text` that are gone
+    from `new_text`: the whole text and any chunk that no longer appears.
+    Chunks the edit left alone keep their translations, so re-translating
+    the note only pays for the paragraphs that changed."""
+    hashes = _text_hashes(old_text) - _text_hashes(new_text)
+    if not hashes:
+        return 0
+    removed = _memory.delete_matching(lambda _key, entry: entry[0] in hashes)
+    backend = _db()
+    if backend is not None:
+        db, CachedTranslation = backend
+        table = CachedTranslation.__table__
+        try:
+            with db.engine.begin() as conn:
+                removed += conn.execute(table.delete().where(table.c.source_hash.in_(hashes))).rowcount or 0
+        except Exception as e:
+            _count('db_errors')
+            print(f'WARNING: translation cache invalidation failed: {e}')
+    _count('invalidations')
+    return removed
+
+
+def clear_memory():
+    _memory.clear()
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    memory = _memory.stats()
+    hits = memory['hits'] + counters['db_hits']
+    return {
+        'lookups': counters['lookups'],
+        'hits': hits,
+        'misses': counters['lookups'] - hits,
+        'hit_rate': round(hits / counters['lookups'], 4) if counters['lookups'] else None,
+        'memory': memory,
+        'db': {
+            'enabled': PERSIST,
+            'hits': counters['db_hits'],
+            'misses': counters['db_misses'],
+            'errors': counters['db_errors'],
+        },
+        'stores': counters['stores'],
+        'invalidations': counters['invalidations'],
+    }